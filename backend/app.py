@@ -1,109 +1,634 @@
+from startup import StartupProgress
 import os
 import json
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import tensorflow as tf
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
-from tensorflow.keras.preprocessing import image
-from PIL import Image
 import random
 
 # Import recommendation logic
-from recommendations import get_recommendations
+from recommendations import knowledge_base, UNKNOWN_DISEASE
+from knowledge_base import DEFAULT_LOCALE
+from recommendation_index import RecommendationIndex, encode_json, splice_json
+from batching import MicroBatcher
+from inference import load_backend, load_model_metadata, warmup_batch_sizes
+from prediction_cache import PredictionCache
+from postprocessing import Postprocessor, load_temperature
+from preprocessing import load_image, TARGET_SIZE
+from quality_gate import QualityGate
+from instrumentation import (
+    registry, RequestTrace, Gauge, REQUEST_SECONDS, STAGE_SECONDS, REQUESTS, ERRORS, IN_FLIGHT, QUALITY_REJECTIONS,
+)
+from config import (
+    CLASS_NAMES_PATH, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, INFERENCE_BACKEND,
+    INFERENCE_SERVER_ADDRESS, INFERENCE_SERVER_AUTHKEY, INFERENCE_SERVER_CONNECT_TIMEOUT,
+    TFLITE_MODEL_PATH, TFLITE_NUM_THREADS, MODEL_PATH,
+    PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS, PREDICTION_CACHE_DIR,
+    PREDICTION_CACHE_DISK_MAX_ENTRIES, BATCH_ENDPOINT_MAX_IMAGES, BATCH_ENDPOINT_MAX_IMAGE_MB,
+    BATCH_ENDPOINT_CHUNK_SIZE, MAX_UPLOAD_MB,
+    DECODE_WORKERS, IMAGE_EXTENSIONS, BACKGROUND_LOADING, RETRY_AFTER_SECONDS,
+    CALIBRATION_PATH, TOP_K, LOW_CONFIDENCE_THRESHOLD, RECOMMENDATIONS_STRICT, RECOMMENDATIONS_GZIP_LEVEL,
+    KNOWLEDGE_BASE_RELOAD_INTERVAL, SERVER_TIMING, STUB_BATCH_MS, STUB_IMAGE_MS, model_path_for,
+    QUALITY_GATE, QUALITY_MIN_SIDE, QUALITY_MIN_SHARPNESS, QUALITY_MIN_BRIGHTNESS, QUALITY_MAX_BRIGHTNESS,
+    QUALITY_MIN_CONTRAST, QUALITY_MIN_PLANT_FRACTION,
+)
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024)
 CORS(app)
 
-# --- CONFIGURATION ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+startup = StartupProgress()
+class_names = None
+inference_backend = None
+batcher = None
+prediction_cache = None
+postprocessor = None
+recommendation_index = None
+model_metadata = None
 
-MODEL_PATH = os.path.join(BASE_DIR, '..', 'ml', 'crop_disease_model_best_weights.h5')
-CLASS_NAMES_PATH = os.path.join(BASE_DIR, 'class_name.json')  # ✅ your file name
+def class_name_for(idx):
+    """
+    Maps a model output index to its class name from class_name.json.
+    """
+    if isinstance(class_names, list):
+        return class_names[idx]
+    return class_names.get(str(idx), "Unknown Disease")
 
-model = None
-class_names = None
+def model_input_shape():
+    """
+    (height, width, channels) to preprocess uploads to: the loaded model's own
+    input shape, else the saved architecture metadata, else TARGET_SIZE.
+    """
+    if inference_backend is not None:
+        return tuple(inference_backend.input_shape)
+    if model_metadata is not None:
+        return tuple(model_metadata['input_size'])
+    return (TARGET_SIZE[1], TARGET_SIZE[0], 3)
+
+def demo_probabilities():
+    """
+    Demo mode stand-in for a model output row: one random class at 80-98%.
+    """
+    row = np.zeros(len(class_names), dtype=np.float32)
+    row[random.randint(0, len(class_names) - 1)] = random.uniform(0.80, 0.98)
+    return row
 
 def load_ml_resources():
-    global model, class_names
+    """
+    Loads class names and the model in stages, recording progress in `startup`.
+    Runs on a background thread unless BACKGROUND_LOADING=0.
+    """
+    global class_names, inference_backend, batcher, prediction_cache, postprocessor, recommendation_index, model_metadata
     try:
+        # --- Load Class Names ---
+        with startup.stage_timer("class_names"):
+            if os.path.exists(CLASS_NAMES_PATH):
+                with open(CLASS_NAMES_PATH, 'r') as f:
+                    class_names = json.load(f)
+                print(f"✅ {len(class_names)} classes loaded")
+                labels = [class_name_for(i) for i in range(len(class_names))]
+                postprocessor = Postprocessor(
+                    labels,
+                    temperature=load_temperature(CALIBRATION_PATH),
+                    top_k=TOP_K,
+                    threshold=LOW_CONFIDENCE_THRESHOLD,
+                )
+                print(f"✅ Postprocessing: temperature {postprocessor.temperature:.3f}, "
+                      f"top-{postprocessor.top_k}, threshold {postprocessor.threshold:.2f}")
+            else:
+                print(f"❌ class_name.json not found")
+
+        # --- Build Recommendation Index ---
+        if class_names is not None:
+            with startup.stage_timer("recommendations"):
+                index = RecommendationIndex(labels, knowledge_base, gzip_level=RECOMMENDATIONS_GZIP_LEVEL)
+            if index.missing:
+                message = f"No recommendations for {len(index.missing)}/{len(labels)} classes: {index.missing}"
+                if RECOMMENDATIONS_STRICT:
+                    raise ValueError(message)
+                print(f"⚠️ {message} (they get the generic entry)")
+            else:
+                print(f"✅ Recommendations cover all {len(labels)} classes")
+            recommendation_index = index
+            knowledge_base.start_watching(KNOWLEDGE_BASE_RELOAD_INTERVAL)
+            print(f"✅ Knowledge base version {knowledge_base.version} "
+                  f"(hot reload every {KNOWLEDGE_BASE_RELOAD_INTERVAL:g}s)")
+
         # --- Load Model ---
-        if os.path.exists(MODEL_PATH):
-            model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-            print(f"✅ Model loaded from {MODEL_PATH}")
+        # Architecture metadata saved by ml/model_training.py (absent for older models).
+        model_metadata = load_model_metadata(model_path_for(INFERENCE_BACKEND))
+        if model_metadata is not None:
+            print(f"✅ Model architecture: {model_metadata['backbone']} alpha {model_metadata['alpha']}, "
+                  f"'{model_metadata['head']}' head, {model_metadata['input_size'][0]}px input, "
+                  f"{model_metadata['total_params']:,} parameters")
+        with startup.stage_timer("model"):
+            backend = load_backend(
+                INFERENCE_BACKEND,
+                model_path=MODEL_PATH,
+                tflite_model_path=TFLITE_MODEL_PATH,
+                tflite_num_threads=TFLITE_NUM_THREADS,
+                server_address=INFERENCE_SERVER_ADDRESS,
+                server_authkey=INFERENCE_SERVER_AUTHKEY,
+                max_batch_size=max(BATCH_MAX_SIZE, BATCH_ENDPOINT_CHUNK_SIZE),
+                connect_timeout=INFERENCE_SERVER_CONNECT_TIMEOUT,
+                num_classes=len(class_names) if class_names is not None else None,
+                stub_batch_ms=STUB_BATCH_MS,
+                stub_image_ms=STUB_IMAGE_MS,
+                input_shape=model_input_shape(),
+            )
+        if backend is None:
+            print(f"⚠️ Model not found at {model_path_for(INFERENCE_BACKEND)} (Demo mode active)")
+            startup.mark_ready("demo")
+            return
+        if INFERENCE_BACKEND == "remote":
+            print(f"✅ Connected to inference server at {INFERENCE_SERVER_ADDRESS}")
+        elif INFERENCE_BACKEND == "stub":
+            print("⚠️ Stub backend active: predictions are synthetic (benchmarking only)")
         else:
-            print(f"⚠️ Model not found (Demo mode active)")
+            print(f"✅ Model loaded from {model_path_for(INFERENCE_BACKEND)}")
 
-        # --- Load Class Names ---
-        if os.path.exists(CLASS_NAMES_PATH):
-            with open(CLASS_NAMES_PATH, 'r') as f:
-                class_names = json.load(f)
-            print(f"✅ {len(class_names)} classes loaded")
-        else:
-            print(f"❌ class_name.json not found")
+        if model_metadata is not None and tuple(model_metadata['input_size']) != tuple(backend.input_shape):
+            print(f"⚠️ Model metadata says {model_metadata['input_size']} inputs but the model takes "
+                  f"{list(backend.input_shape)}; using the model's")
+
+        with startup.stage_timer("warmup"):
+            warmup_seconds = backend.warmup(warmup_batch_sizes(BATCH_MAX_SIZE))
+        print(f"✅ '{backend.name}' backend warmed up in {warmup_seconds*1000:.0f} ms")
+
+        prediction_cache = PredictionCache(
+            [model_path_for(INFERENCE_BACKEND), CLASS_NAMES_PATH],
+            max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+            ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+            disk_dir=PREDICTION_CACHE_DIR,
+            disk_max_entries=PREDICTION_CACHE_DISK_MAX_ENTRIES,
+        )
+
+        def timed_predict(batch):
+            # Forward pass only (no queue wait), so the gate's saved-time estimate is the model's cost.
+            started = time.perf_counter()
+            predictions = backend.predict(batch)
+            if quality_gate is not None:
+                quality_gate.record_inference(time.perf_counter() - started, len(batch))
+            return predictions
+
+        batcher = MicroBatcher(
+            timed_predict,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+        )
+        print(f"✅ Micro-batching enabled (max {BATCH_MAX_SIZE} images / {BATCH_MAX_WAIT_MS} ms)")
+
+        # Publish the backend last: request handlers treat it as "model available".
+        inference_backend = backend
+        startup.mark_ready()
+        print(f"✅ Ready {startup.ready_seconds:.2f}s after start")
 
     except Exception as e:
         print(f"🚨 Error loading resources: {e}")
+        startup.mark_failed(e)
+
+def request_locale():
+    """
+    Locale for the recommendations: ?lang= (e.g. "hi" or "hi-IN") if given,
+    otherwise the best Accept-Language match; English when nothing matches.
+    """
+    available = knowledge_base.locales()
+    requested = request.args.get('lang')
+    if requested:
+        requested = requested.lower()
+        for code in (requested, requested.split('-')[0]):
+            if code in available:
+                return code
+        return DEFAULT_LOCALE
+    return request.accept_languages.best_match(available, default=DEFAULT_LOCALE)
+
+def recommendation_response(fields, class_index, locale):
+    """
+    JSON response of `fields` plus "recommendations" for `class_index` in
+    `locale`, spliced from the pre-encoded index (gzip when enabled and
+    accepted by the client).
+    """
+    trace = g.trace
+    use_gzip = recommendation_index.gzip_level is not None and 'gzip' in request.accept_encodings
+    with trace.stage("recommendations"):
+        encoded = recommendation_index.encoded(
+            class_index, recommendation_index.gzip_level if use_gzip else None, locale)
+    with trace.stage("serialize"):
+        if use_gzip:
+            response = Response(recommendation_index.gzip_response(fields, "recommendations", encoded),
+                                mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(splice_json(fields, "recommendations", encoded), mimetype='application/json')
+    response.headers['Content-Language'] = locale
+    response.headers['Vary'] = 'Accept-Encoding, Accept-Language'
+    return response
+
+def error_response(message, status, error_type):
+    ERRORS.inc(error_type)
+    return jsonify({"error": message}), status
+
+def not_ready_response():
+    """
+    503 returned by prediction endpoints while the model is loading (or failed to load).
+    """
+    ERRORS.inc("not_ready")
+    response = jsonify({"error": "Model is not ready yet, please retry shortly", "startup": startup.report()})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
 
-# Load resources at startup
-load_ml_resources()
+# Load resources at startup, in the background so the server can answer
+# health checks while TensorFlow and the model are loading.
+if BACKGROUND_LOADING:
+    threading.Thread(target=load_ml_resources, name="load-ml-resources", daemon=True).start()
+else:
+    load_ml_resources()
+
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+
+def preprocess_image(data, trace=None, info=None):
+    """
+    Decodes uploaded image bytes into a normalised array sized for the active model.
+    """
+    height, width = model_input_shape()[:2]
+    return load_image(data, target_size=(width, height), trace=trace, info=info)
+
+# --- QUALITY GATE ---
+quality_gate = QualityGate(
+    min_side=QUALITY_MIN_SIDE,
+    min_sharpness=QUALITY_MIN_SHARPNESS,
+    min_brightness=QUALITY_MIN_BRIGHTNESS,
+    max_brightness=QUALITY_MAX_BRIGHTNESS,
+    min_contrast=QUALITY_MIN_CONTRAST,
+    min_plant_fraction=QUALITY_MIN_PLANT_FRACTION,
+) if QUALITY_GATE else None
+
+def check_quality(image, info):
+    """
+    Runs the quality gate on a preprocessed upload; returns its rejection dict,
+    or None when the image may be scored (or the gate is disabled).
+    """
+    if quality_gate is None:
+        return None
+    rejection = quality_gate.check(image, info.get("source_size"))
+    if rejection is not None:
+        for failed in rejection["checks_failed"]:
+            QUALITY_REJECTIONS.inc(failed["check"])
+    return rejection
+
+def retake_message(rejection):
+    return "Please retake the photo (" + ", ".join(c["check"] for c in rejection["checks_failed"]) + ")"
+
+def retake_response(rejection):
+    """
+    422 for an upload the quality gate rejected; the model never saw it.
+    """
+    ERRORS.inc("retake_photo")
+    return jsonify({"error": retake_message(rejection), "retake_photo": True, **rejection}), 422
+
+# --- INSTRUMENTATION ---
+registry.register(Gauge(
+    "kisan_mitra_startup_stage_seconds", "Duration of each startup loading stage.", ("stage",),
+    value_fn=lambda: {(name,): seconds for name, seconds in startup.timings.items()}))
+registry.register(Gauge(
+    "kisan_mitra_ready", "1 once the model is loaded and predictions are served.",
+    value_fn=lambda: 1 if startup.is_ready else 0))
+registry.register(Gauge(
+    "kisan_mitra_batch_queue_depth", "Images waiting for the micro-batcher.",
+    value_fn=lambda: batcher.stats()["queue_depth"] if batcher is not None else None))
+registry.register(Gauge(
+    "kisan_mitra_quality_gate_seconds_saved", "Estimated inference time skipped by quality gate rejections.",
+    value_fn=lambda: quality_gate.stats()["estimated_seconds_saved"] if quality_gate is not None else None))
+
+@app.before_request
+def start_trace():
+    IN_FLIGHT.inc()
+    g.trace = RequestTrace()
+
+def record_request(trace, endpoint, status):
+    total = trace.finish(STAGE_SECONDS)
+    REQUEST_SECONDS.observe(total, endpoint)
+    REQUESTS.inc(endpoint, status)
+    return total
+
+@app.after_request
+def finish_trace(response):
+    trace = g.get('trace')
+    if trace is not None:
+        # The route pattern, not the path, so unknown URLs don't add series.
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        status = str(response.status_code)
+        if response.is_streamed:
+            # The body (e.g. /predict/batch) is generated after this hook returns;
+            # record the request once the server has sent it and closed the response.
+            response.call_on_close(lambda: record_request(trace, endpoint, status))
+            return response
+        total = record_request(trace, endpoint, status)
+        if SERVER_TIMING and trace.stages:
+            response.headers['Server-Timing'] = trace.server_timing(total)
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    # Runs after streamed bodies are fully sent, so in-flight covers them too.
+    if g.pop('trace', None) is not None:
+        IN_FLIGHT.dec()
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return error_response(f"Request body over {MAX_UPLOAD_MB:g} MB", 413, "request_too_large")
 
 @app.route('/')
 def home():
     return "Kisan Mitra Backend API is running!"
 
+@app.route('/healthz')
+def healthz():
+    return jsonify({"alive": True, "startup": startup.report()})
+
+@app.route('/readyz')
+def readyz():
+    if not startup.is_ready:
+        return not_ready_response()
+    return jsonify({"ready": True, "startup": startup.report()})
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    if class_names is None:
-        return jsonify({"error": "Class names not loaded"}), 500
+    if not startup.is_ready:
+        return not_ready_response()
 
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
+    if class_names is None:
+        return error_response("Class names not loaded", 500, "class_names_missing")
 
-    file = request.files['file']
+    trace = g.trace
+    with trace.stage("upload"):
+        file = request.files.get('file')
+        data = file.read() if file is not None else None
+    if file is None:
+        return error_response("No file uploaded", 400, "no_file")
 
     try:
-        # --- Image preprocessing ---
-        img = Image.open(file.stream).convert('RGB')
-        img = img.resize((224, 224))
-
-        img_array = image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = img_array / 255.0
-
         # --- Prediction ---
-        if model is not None:
-            predictions = model.predict(img_array)
-            predicted_class_idx = int(np.argmax(predictions[0]))
-            confidence = float(np.max(predictions[0]))
-            mode = "Real prediction"
+        if batcher is not None:
+            with trace.stage("cache"):
+                cache_key = prediction_cache.key(data)
+                predictions = prediction_cache.get(cache_key)
+            cached = predictions is not None
+            if not cached:
+                info = {}
+                image = preprocess_image(data, trace, info)
+                with trace.stage("quality_gate"):
+                    rejection = check_quality(image, info)
+                if rejection is not None:
+                    return retake_response(rejection)
+                with trace.stage("inference"):
+                    predictions = batcher.submit(image)
+                prediction_cache.put(cache_key, predictions)
+            mode = "Real prediction (cached)" if cached else "Real prediction"
         else:
-            predicted_class_idx = random.randint(0, len(class_names) - 1)
-            confidence = random.uniform(0.80, 0.98)
+            info = {}
+            image = preprocess_image(data, trace, info)
+            with trace.stage("quality_gate"):
+                rejection = check_quality(image, info)
+            if rejection is not None:
+                return retake_response(rejection)
+            predictions = demo_probabilities()
             mode = "Demo mode"
 
-        # --- Map class ---
-        if isinstance(class_names, list):
-            predicted_disease = class_names[predicted_class_idx]
-        else:
-            predicted_disease = class_names.get(str(predicted_class_idx), "Unknown Disease")
+        # --- Calibrate, rank and map classes ---
+        with trace.stage("postprocess"):
+            result = postprocessor.results(predictions)[0]
+        predicted_disease = result["disease"]
+        confidence = result["confidence_score"]
 
         print(f"Prediction: {predicted_disease} ({confidence*100:.2f}%) [{mode}]")
+        startup.record_prediction()
 
-        # --- Recommendations ---
-        recommendations = get_recommendations(predicted_disease)
-
-        return jsonify({
+        # --- Response with pre-encoded recommendations ---
+        locale = request_locale()
+        return recommendation_response({
             "disease": predicted_disease,
+            "class_index": result["class_index"],
             "confidence": f"{confidence*100:.2f}%",
-            "recommendations": recommendations,
+            "confidence_score": confidence,
+            "low_confidence": result["low_confidence"],
+            "top_k": result["top_k"],
+            "locale": locale,
             "mode": mode
-        })
+        }, result["class_index"], locale)
 
     except Exception as e:
         print(f"🚨 Prediction error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return error_response(str(e), 500, type(e).__name__)
+
+
+class BatchUploadError(Exception):
+    def __init__(self, message, status, error_type):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+def _collect_batch_uploads():
+    """
+    Returns (filename, bytes) pairs from the 'files' fields and/or a zip
+    uploaded as 'archive', skipping non-image archive members. The image
+    count and each member's decompressed size are checked before any image
+    bytes are read; violations raise BatchUploadError.
+    """
+    files = request.files.getlist('files')
+    archive = request.files.get('archive')
+    too_many = BatchUploadError(f"At most {BATCH_ENDPOINT_MAX_IMAGES} images per request", 413, "too_many_images")
+    if len(files) > BATCH_ENDPOINT_MAX_IMAGES:
+        raise too_many
+
+    if archive is None:
+        return [(f.filename, f.read()) for f in files]
+    with zipfile.ZipFile(archive.stream) as zf:
+        members = [info for info in zf.infolist()
+                   if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                   and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        if len(files) + len(members) > BATCH_ENDPOINT_MAX_IMAGES:
+            raise too_many
+        max_bytes = BATCH_ENDPOINT_MAX_IMAGE_MB * 1024 * 1024
+        oversized = [info.filename for info in members if info.file_size > max_bytes]
+        if oversized:
+            raise BatchUploadError(f"Archive members over {BATCH_ENDPOINT_MAX_IMAGE_MB:g} MB uncompressed: "
+                                   f"{oversized[:5]}", 413, "image_too_large")
+
+        uploads = [(f.filename, f.read()) for f in files]
+        # ZipExtFile stops at the declared file_size, so the check above bounds every read.
+        uploads.extend((info.filename, zf.read(info)) for info in members)
+    return uploads
+
+def _decode_upload(data):
+    """
+    (image, error, quality gate rejection) for one upload.
+    """
+    info = {}
+    try:
+        image = preprocess_image(data, info=info)
+    except Exception as e:
+        return None, str(e), None
+    return image, None, check_quality(image, info)
+
+def _predict_chunk(chunk):
+    """
+    Runs one chunk of (index, filename, bytes) uploads through the cache and a
+    single batched forward pass, yielding one result dict per image.
+    """
+    keys = [prediction_cache.key(data) for _, _, data in chunk] if batcher is not None else [None] * len(chunk)
+    rows = [prediction_cache.get(key) if key is not None else None for key in keys]
+
+    pending = [i for i, row in enumerate(rows) if row is None]
+    decoded = list(decode_pool.map(_decode_upload, [chunk[i][2] for i in pending]))
+    errors = {}
+    rejections = {}
+    to_infer = []
+    for i, (img_array, error, rejection) in zip(pending, decoded):
+        if error is not None:
+            errors[i] = error
+        elif rejection is not None:
+            rejections[i] = rejection
+        else:
+            to_infer.append((i, img_array))
+
+    if to_infer:
+        if inference_backend is not None:
+            started = time.perf_counter()
+            predictions = inference_backend.predict(np.stack([img_array for _, img_array in to_infer]))
+            if quality_gate is not None:
+                quality_gate.record_inference(time.perf_counter() - started, len(to_infer))
+            for (i, _), row in zip(to_infer, predictions):
+                rows[i] = row
+                prediction_cache.put(keys[i], row)
+        else:
+            for i, _ in to_infer:
+                rows[i] = demo_probabilities()
+
+    # One vectorised postprocessing pass over every row that was scored.
+    scored = [i for i in range(len(chunk)) if i not in errors and i not in rejections]
+    processed = dict(zip(scored, postprocessor.results(np.stack([rows[i] for i in scored])))) if scored else {}
+
+    for i, (index, filename, _) in enumerate(chunk):
+        result = {"type": "result", "index": index, "filename": filename}
+        if i in errors:
+            result["error"] = errors[i]
+        elif i in rejections:
+            result.update(error=retake_message(rejections[i]), retake_photo=True, **rejections[i])
+        else:
+            result.update(processed[i])
+            result["confidence"] = f"{processed[i]['confidence_score']*100:.2f}%"
+        yield result
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores many images (multipart 'files' and/or a zip 'archive') in one request.
+    Streams NDJSON: one "result" line per image as soon as its chunk is done,
+    then a final "summary" line with per-plot disease counts and the
+    recommendations for every disease found.
+    """
+    if not startup.is_ready:
+        return not_ready_response()
+
+    if class_names is None:
+        return error_response("Class names not loaded", 500, "class_names_missing")
+
+    try:
+        uploads = _collect_batch_uploads()
+    except zipfile.BadZipFile:
+        return error_response("Archive is not a valid zip file", 400, "bad_zip")
+    except BatchUploadError as e:
+        return error_response(str(e), e.status, e.error_type)
+    if not uploads:
+        return error_response("No files uploaded", 400, "no_file")
+
+    mode = "Real prediction" if inference_backend is not None else "Demo mode"
+    locale = request_locale()
+    items = [(index, filename, data) for index, (filename, data) in enumerate(uploads)]
+
+    def generate():
+        diseases = Counter()
+        errors = 0
+        retakes = 0
+        uncertain = 0
+        for start in range(0, len(items), BATCH_ENDPOINT_CHUNK_SIZE):
+            for result in _predict_chunk(items[start:start + BATCH_ENDPOINT_CHUNK_SIZE]):
+                if result.get("retake_photo"):
+                    retakes += 1
+                elif "error" in result:
+                    errors += 1
+                elif result["low_confidence"]:
+                    # Below the confidence threshold: neither healthy nor diseased.
+                    uncertain += 1
+                else:
+                    diseases[result["disease"]] += 1
+                yield encode_json(result) + b"\n"
+
+        classified = sum(diseases.values())
+        healthy = sum(count for name, count in diseases.items() if name.endswith("healthy"))
+        scored = classified + uncertain
+        print(f"Batch prediction: {scored} images scored ({uncertain} uncertain), {retakes} need a retake, "
+              f"{errors} failed [{mode}]")
+        startup.record_prediction()
+        names = list(diseases) + ([UNKNOWN_DISEASE] if uncertain else [])
+        recommendations = b'{' + b','.join(
+            encode_json(name) + b':' + recommendation_index.encoded_for_name(name, locale) for name in names
+        ) + b'}'
+        yield splice_json({
+            "type": "summary",
+            "images": len(items),
+            "scored": scored,
+            "errors": errors,
+            "retake_photo": retakes,
+            "uncertain": uncertain,
+            "healthy": healthy,
+            "diseased": classified - healthy,
+            "diseased_fraction": round((classified - healthy) / classified, 4) if classified else 0.0,
+            "disease_counts": dict(diseases.most_common()),
+            "locale": locale,
+            "mode": mode
+        }, "recommendations", recommendations) + b"\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Content-Language'] = locale
+    response.headers['Vary'] = 'Accept-Language'
+    return response
+
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        "startup": startup.report(),
+        "inference": inference_backend.stats() if inference_backend is not None else None,
+        "model": model_metadata,
+        "batching": batcher.stats() if batcher is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "quality_gate": quality_gate.stats() if quality_gate is not None else None,
+        "postprocessing": postprocessor.info() if postprocessor is not None else None,
+        "recommendations": recommendation_index.coverage() if recommendation_index is not None else None,
+        "knowledge_base": knowledge_base.stats()
+    })
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus scrape endpoint: request and per-stage latency histograms,
+    request/error counters and startup/readiness gauges for this process.
+    """
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 
+startup.mark_imported()
+print(f"⏱️ App imported in {startup.import_seconds:.2f}s")
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
-    app.run(host='0.0.0.0', port=port)
+    app.run(host='0.0.0.0', port=port, threaded=True)
@@ -0,0 +1,205 @@
+"""
+Asyncio serving mode for the Flask API.
+
+Request bodies are received on the event loop, so a slow upload only costs a
+coroutine instead of a whole worker (and its copy of the model). Once a body
+has fully arrived, the unchanged Flask app handles it on a small fixed pool of
+inference executor threads, where /predict calls still go through the
+micro-batcher. Health probes and /metrics get a separate pool of their own.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+or under gunicorn:
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+from config import BATCH_MAX_SIZE, MAX_UPLOAD_MB
+
+# Threads that run Flask handlers once a request body has been fully received.
+# Defaults to the micro-batch size so a full batch can form from concurrent requests.
+INFERENCE_EXECUTORS = int(os.environ.get("INFERENCE_EXECUTORS", BATCH_MAX_SIZE))
+# Liveness/readiness probes and metric scrapes run on their own small pool,
+# so long /predict/batch requests filling the inference executors cannot make
+# them time out.
+PROBE_PATHS = ('/healthz', '/readyz', '/metrics')
+PROBE_EXECUTORS = int(os.environ.get("PROBE_EXECUTORS", 2))
+# Bodies are buffered up to this size (Flask's own limit by default). Past it
+# the rest is not read and Flask answers with its usual JSON 413.
+MAX_BODY_BYTES = int(os.environ.get("MAX_BODY_BYTES", int(MAX_UPLOAD_MB * 1024 * 1024)))
+# Response chunks an executor thread may queue ahead of the client; a slow
+# reader on a streamed /predict/batch blocks the thread instead of growing memory.
+RESPONSE_QUEUE_SIZE = 8
+
+
+class AsyncUploadServer:
+    """
+    Minimal ASGI -> WSGI bridge: buffers the request body asynchronously, then
+    runs the WSGI app on a bounded thread pool and relays its response.
+    """
+
+    def __init__(self, wsgi_app, executors=INFERENCE_EXECUTORS, max_body_bytes=MAX_BODY_BYTES,
+                 probe_executors=PROBE_EXECUTORS):
+        self.wsgi_app = wsgi_app
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=executors, thread_name_prefix="inference")
+        self.probe_executor = ThreadPoolExecutor(max_workers=probe_executors, thread_name_prefix="probe")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                self.probe_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        """
+        (body, content_length), or None if the client went away. Over
+        max_body_bytes the body is dropped and only its size so far is kept,
+        so Flask (whose MAX_CONTENT_LENGTH it exceeds) rejects it with a 413.
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return b'', size
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks), size
+
+    @staticmethod
+    async def _watch_disconnect(receive, disconnected):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    async def _http(self, scope, receive, send):
+        received = await self._read_body(receive)
+        if received is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(maxsize=RESPONSE_QUEUE_SIZE)
+        disconnected = threading.Event()
+        environ = build_environ(scope, *received)
+        executor = self.probe_executor if scope['path'] in PROBE_PATHS else self.executor
+        executor.submit(self._run_wsgi, environ, loop, messages, disconnected)
+
+        watcher = asyncio.ensure_future(self._watch_disconnect(receive, disconnected))
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                if disconnected.is_set():
+                    continue  # keep draining so the executor thread is never left blocked
+                try:
+                    await send(message)
+                except OSError:
+                    disconnected.set()
+        finally:
+            watcher.cancel()
+
+    def _run_wsgi(self, environ, loop, messages, disconnected):
+        """
+        Runs on an executor thread: calls the WSGI app, iterates its response in
+        this same thread (Flask's streamed responses rely on that) and hands
+        ASGI messages back to the event loop, waiting while the queue is full.
+        Stops iterating (and closes the response) once the client disconnects.
+        """
+        put = lambda message: asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+        response_started = False
+        response = None
+        try:
+            status_headers = {}
+
+            def start_response(status, headers, exc_info=None):
+                status_headers['status'] = int(status.split(' ', 1)[0])
+                status_headers['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+                return lambda data: None
+
+            response = self.wsgi_app(environ, start_response)
+            for chunk in response:
+                if disconnected.is_set():
+                    break
+                if not response_started:
+                    put({'type': 'http.response.start', **status_headers})
+                    response_started = True
+                if chunk:
+                    put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not response_started:
+                put({'type': 'http.response.start', **status_headers})
+                response_started = True
+            put({'type': 'http.response.body', 'body': b''})
+        except Exception as e:
+            print(f"🚨 ASGI bridge error: {e}")
+            if not response_started:
+                put({'type': 'http.response.start', 'status': 500,
+                     'headers': [(b'content-type', b'text/plain')]})
+            put({'type': 'http.response.body', 'body': b'' if response_started else b'Internal Server Error'})
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+            put(None)
+
+
+def build_environ(scope, body, content_length=None):
+    """
+    Builds a PEP 3333 environ for a fully buffered ASGI HTTP request.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body) if content_length is None else content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            continue
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+app = AsyncUploadServer(flask_app)
@@ -0,0 +1,181 @@
+import threading
+import time
+import queue
+from collections import deque
+
+import numpy as np
+
+
+# --- LATENCY TRACKING ---
+class LatencyStats:
+    """
+    Keeps running totals plus a bounded window of recent samples (in seconds)
+    so percentiles can be reported without unbounded memory growth.
+    """
+
+    def __init__(self, window=1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+            count, total, peak = self.count, self.total, self.max
+        if count == 0:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000.0
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000.0, 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(peak * 1000.0, 3),
+        }
+
+
+class _PendingRequest:
+    __slots__ = ("array", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, array):
+        self.array = array
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# --- MICRO-BATCHING SCHEDULER ---
+class MicroBatcher:
+    """
+    Collects concurrent single-image requests into a shared queue and runs them
+    as one batched forward pass once `max_batch_size` images are waiting or the
+    oldest one has waited `max_wait_ms`. Each caller gets back its own row of
+    the model output.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10.0, timeout=30.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        self.batches = 0
+        self.images = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.queue_wait = LatencyStats()
+        self.inference = LatencyStats()
+        self.total = LatencyStats()
+
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, img_array):
+        """
+        Queues one preprocessed image of shape (H, W, 3) or (1, H, W, 3) and
+        blocks until its prediction row is available.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Micro-batcher has been stopped")
+        if img_array.ndim == 4:
+            img_array = img_array[0]
+
+        pending = _PendingRequest(img_array)
+        self._queue.put(pending)
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+        if not pending.done.wait(self.timeout):
+            raise TimeoutError(f"Prediction not ready after {self.timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        self.total.add(time.perf_counter() - pending.enqueued_at)
+        return pending.result
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            for pending in batch:
+                self.queue_wait.add(started - pending.enqueued_at)
+
+            try:
+                predictions = np.asarray(self.predict_fn(np.stack([p.array for p in batch])))
+                for row, pending in zip(predictions, batch):
+                    pending.result = row
+            except Exception as e:
+                self.errors += 1
+                for pending in batch:
+                    pending.error = e
+
+            self.inference.add(time.perf_counter() - started)
+            self.batches += 1
+            self.images += len(batch)
+            for pending in batch:
+                pending.done.set()
+
+            if self._stopped.is_set():
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+
+    def stats(self):
+        """
+        Returns queue depth, batch fill ratio and per-stage latency figures.
+        """
+        avg_batch = self.images / self.batches if self.batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "images": self.images,
+            "errors": self.errors,
+            "avg_batch_size": round(avg_batch, 3),
+            "batch_fill_ratio": round(avg_batch / self.max_batch_size, 3),
+            "latency": {
+                "queue_wait": self.queue_wait.summary(),
+                "inference": self.inference.summary(),
+                "total": self.total.summary(),
+            },
+        }
@@ -0,0 +1,559 @@
+"""
+Offline bulk scoring of archived field photos, without going through /predict.
+
+Walks image directories, zip archives and tar archives, decodes and resizes
+the images in a pool of worker processes, scores them in batches with the
+same backend, postprocessing, quality gate and recommendations as app.py,
+and streams one row per image to CSV, NDJSON or Parquet (which needs pyarrow,
+not part of requirements.txt since the server does not use it).
+
+Memory stays bounded however many images the inputs hold: inputs are listed
+lazily, at most 2 x --workers decode chunks are in flight, rows are written
+as soon as their batch is scored, and only per-disease totals are kept.
+
+Progress is checkpointed next to the output every --checkpoint-every images;
+an interrupted run continues from the last checkpoint with --resume. Inputs
+must be given in the same order, and must not have changed in between.
+
+Run from backend/:
+    python bulk_score.py /data/survey_2024 --output survey_2024.csv
+    python bulk_score.py photos.zip more_photos.tar.gz --output scores.parquet --workers 8
+    python bulk_score.py /data/survey_2024 --output survey_2024.csv --resume
+Besides the rows, <output>.summary.json holds the disease counts and the
+recommendations (in --locale) for every disease found.
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import (
+    CLASS_NAMES_PATH, INFERENCE_BACKEND, MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_NUM_THREADS,
+    INFERENCE_SERVER_ADDRESS, INFERENCE_SERVER_AUTHKEY, INFERENCE_SERVER_CONNECT_TIMEOUT,
+    STUB_BATCH_MS, STUB_IMAGE_MS, CALIBRATION_PATH, TOP_K, LOW_CONFIDENCE_THRESHOLD, DECODE_WORKERS,
+    IMAGE_EXTENSIONS, QUALITY_GATE, QUALITY_MIN_SIDE, QUALITY_MIN_SHARPNESS, QUALITY_MIN_BRIGHTNESS,
+    QUALITY_MAX_BRIGHTNESS, QUALITY_MIN_CONTRAST, QUALITY_MIN_PLANT_FRACTION, model_path_for,
+)
+from inference import load_backend, load_model_metadata
+from knowledge_base import DEFAULT_LOCALE
+from postprocessing import Postprocessor, load_temperature
+from preprocessing import load_pixels, normalize
+from quality_gate import QualityGate
+from recommendations import get_recommendations
+
+# Images per task sent to a decode worker.
+DECODE_CHUNK_SIZE = 8
+# Rows are written at the latest after this many batches' worth of input,
+# so runs of undecodable or rejected images do not pile up.
+MAX_PENDING_BATCHES = 4
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'}
+FIELDS = ['source', 'status', 'disease', 'class_index', 'confidence', 'low_confidence', 'top_k',
+          'width', 'height', 'error']
+
+
+# --- INPUTS ---
+def iter_sources(paths):
+    """
+    Yields (source, ref) for every image under `paths`, in a stable order:
+    directories are walked in sorted order, archive members in archive order.
+    `ref` is a file path, ('zip', archive, member) or ('tar', open tarfile, member).
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name), os.path.join(root, name)
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    yield f"{path}:{name}", ('zip', path, name)
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as tf:
+                for member in tf:
+                    if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield f"{path}:{member.name}", ('tar', tf, member)
+                    tf.members = []  # tarfile keeps every member it has seen otherwise
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            yield path, path
+        else:
+            raise ValueError(f"Not an image, directory, zip or tar archive: {path}")
+
+
+def portable(ref):
+    """
+    What a worker process gets for `ref`: tar members can only be read from
+    the archive open here (and, for .tar.gz, cheaply only in order, so each is
+    read as soon as it is reached), so their bytes are sent; files and zip
+    members are read by the worker itself.
+    """
+    if ref[0] == 'tar':
+        return ref[1].extractfile(ref[2]).read()
+    return ref
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- DECODING (worker processes) ---
+_open_archives = {}
+
+
+def _read(ref):
+    if isinstance(ref, bytes):
+        return ref
+    if isinstance(ref, tuple):
+        _, archive, member = ref
+        if archive not in _open_archives:
+            _open_archives[archive] = zipfile.ZipFile(archive)
+        return _open_archives[archive].read(member)
+    with open(ref, 'rb') as f:
+        return f.read()
+
+
+def decode_chunk(refs, target_size):
+    """
+    [(uint8 pixels, error, (width, height))] for a chunk of refs; failures are
+    reported, not raised, so one bad file does not lose the whole chunk.
+    """
+    results = []
+    for ref in refs:
+        info = {}
+        try:
+            results.append((load_pixels(_read(ref), target_size, info), None, info["source_size"]))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}", info.get("source_size")))
+    return results
+
+
+def decoded_in_order(executor, chunks, target_size, window):
+    """
+    Yields (sources, decoded chunk) in input order, keeping at most `window`
+    chunks submitted at a time (Executor.map would queue every input at once).
+    """
+    pending = deque()
+    for chunk in chunks:
+        sources = [source for source, _ in chunk]
+        pending.append((sources, executor.submit(decode_chunk, [ref for _, ref in chunk], target_size)))
+        if len(pending) >= window:
+            sources, future = pending.popleft()
+            yield sources, future.result()
+    while pending:
+        sources, future = pending.popleft()
+        yield sources, future.result()
+
+
+# --- OUTPUT ---
+def _flat(value):
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+
+
+class TextWriter:
+    """
+    Appends rows to one file. commit() makes everything written so far
+    durable and returns the file size, which resume() truncates back to, so
+    rows written after the last checkpoint are not duplicated.
+    """
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+        self.file = None
+
+    def start(self):
+        self.file = open(self.path, 'w', encoding='utf-8', newline='')
+
+    def resume(self, state):
+        self.file = open(self.path, 'r+', encoding='utf-8', newline='')
+        self.file.truncate(state["bytes"])
+        self.file.seek(state["bytes"])
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"bytes": os.fstat(self.file.fileno()).st_size}
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(TextWriter):
+    def start(self):
+        super().start()
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.fields)
+
+    def resume(self, state):
+        super().resume(state)
+        self.writer = csv.writer(self.file)
+
+    def write(self, rows):
+        self.writer.writerows([_flat(row.get(field)) for field in self.fields] for row in rows)
+
+
+class NdjsonWriter(TextWriter):
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+
+class ParquetWriter:
+    """
+    Writes a Parquet dataset: `path` is a directory of part-NNNNN.parquet
+    files, one per checkpoint (pandas.read_parquet and pyarrow.dataset read
+    the directory as one table). A part is only complete once its file is
+    closed, so parts beyond the checkpoint are deleted on resume.
+    Lists and dicts (top_k, recommendations) are stored as JSON strings.
+    """
+
+    def __init__(self, path, fields):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        types = {'class_index': pa.int32(), 'confidence': pa.float64(), 'low_confidence': pa.bool_(),
+                 'width': pa.int32(), 'height': pa.int32()}
+        self.schema = pa.schema([(field, types.get(field, pa.string())) for field in fields])
+        self.rows = []
+        self.parts = 0
+
+    def _part_path(self, index):
+        return os.path.join(self.path, f"part-{index:05d}.parquet")
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+
+    def resume(self, state):
+        self.parts = state["parts"]
+        for name in os.listdir(self.path):
+            if name.startswith('part-') and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(self.path, name))
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def commit(self):
+        if self.rows:
+            columns = {field: [_flat(row.get(field)) for row in self.rows] for field in self.schema.names}
+            table = self.pa.Table.from_pydict(columns, schema=self.schema)
+            self.pq.write_table(table, self._part_path(self.parts))
+            self.parts += 1
+            self.rows = []
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+WRITERS = {'csv': CsvWriter, 'ndjson': NdjsonWriter, 'parquet': ParquetWriter}
+
+
+# --- CHECKPOINT ---
+def checkpoint_path(output):
+    return output.rstrip(os.sep) + '.checkpoint.json'
+
+
+def save_json(path, data):
+    # Written to a temporary file first, so a crash never leaves half a checkpoint.
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(output, inputs, fmt):
+    path = checkpoint_path(output)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint["inputs"] != inputs or checkpoint["format"] != fmt:
+        sys.exit(f"🚨 {path} is for inputs {checkpoint['inputs']} ({checkpoint['format']}); "
+                 f"give the same inputs or use --overwrite")
+    return checkpoint
+
+
+def skip_completed(sources, checkpoint):
+    """
+    Drops the inputs a previous run already scored, checking that the last
+    one is still where the checkpoint says it was.
+    """
+    completed = checkpoint["completed"]
+    if not completed:
+        return sources
+    last = None
+    for last, _ in itertools.islice(sources, completed):
+        pass
+    if last != checkpoint["last_source"]:
+        sys.exit(f"🚨 Inputs changed since the checkpoint: image {completed} is {last}, "
+                 f"expected {checkpoint['last_source']}; rerun with --overwrite")
+    return sources
+
+
+# --- SCORING ---
+def class_labels():
+    with open(CLASS_NAMES_PATH, 'r') as f:
+        class_names = json.load(f)
+    if isinstance(class_names, list):
+        return class_names
+    return [class_names.get(str(i), "Unknown Disease") for i in range(len(class_names))]
+
+
+def load_scoring_backend(name, num_classes):
+    metadata = load_model_metadata(model_path_for(name)) or {}
+    backend = load_backend(
+        name,
+        model_path=MODEL_PATH,
+        tflite_model_path=TFLITE_MODEL_PATH,
+        tflite_num_threads=TFLITE_NUM_THREADS,
+        server_address=INFERENCE_SERVER_ADDRESS,
+        server_authkey=INFERENCE_SERVER_AUTHKEY,
+        connect_timeout=INFERENCE_SERVER_CONNECT_TIMEOUT,
+        num_classes=num_classes,
+        stub_batch_ms=STUB_BATCH_MS,
+        stub_image_ms=STUB_IMAGE_MS,
+        input_shape=tuple(metadata.get('input_size', (224, 224, 3))),
+    )
+    if backend is None:
+        sys.exit(f"🚨 Model not found at {model_path_for(name)}")
+    return backend
+
+
+class BulkScorer:
+    """
+    Collects decoded images into a preallocated batch, scores full batches
+    and hands the rows (in input order) to the writer, checkpointing as it goes.
+    """
+
+    def __init__(self, backend, postprocessor, writer, quality_gate, batch_size, locale,
+                 inline_recommendations, checkpoint, checkpoint_file, checkpoint_every, progress_interval):
+        self.backend = backend
+        self.postprocessor = postprocessor
+        self.writer = writer
+        self.quality_gate = quality_gate
+        self.batch_size = batch_size
+        self.locale = locale
+        self.inline_recommendations = inline_recommendations
+        self.checkpoint = checkpoint
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_every = checkpoint_every
+        self.progress_interval = progress_interval
+
+        self.batch = np.empty((batch_size,) + tuple(backend.input_shape), dtype=np.float32)
+        self.rows = []
+        self.to_score = []
+        self.statuses = Counter(checkpoint["statuses"])
+        self.diseases = Counter(checkpoint["diseases"])
+        self.checkpointed = checkpoint["completed"]
+        self.scored_this_run = 0
+        self.started = self.last_progress = time.perf_counter()
+
+    def add(self, source, pixels, error, source_size):
+        row = {"source": source}
+        if source_size is not None:
+            row["width"], row["height"] = source_size
+        if error is not None:
+            row.update(status="error", error=error)
+        else:
+            image = normalize(pixels, out=self.batch[len(self.to_score)])
+            rejection = self.quality_gate.check(image, source_size) if self.quality_gate is not None else None
+            if rejection is not None:
+                checks = ", ".join(c["check"] for c in rejection["checks_failed"])
+                row.update(status="retake_photo", error=f"Please retake the photo ({checks})")
+            else:
+                row["status"] = "ok"
+                self.to_score.append(row)
+        self.rows.append(row)
+        if len(self.to_score) == self.batch_size or len(self.rows) >= self.batch_size * MAX_PENDING_BATCHES:
+            self.flush()
+
+    def flush(self):
+        if self.to_score:
+            predictions = self.backend.predict(self.batch[:len(self.to_score)])
+            for row, result in zip(self.to_score, self.postprocessor.results(predictions)):
+                row.update(disease=result["disease"], class_index=result["class_index"],
+                           confidence=result["confidence_score"], low_confidence=result["low_confidence"],
+                           top_k=result["top_k"])
+                if self.inline_recommendations:
+                    row["recommendations"] = get_recommendations(result["disease"], self.locale)
+                self.diseases[result["disease"]] += 1
+            self.to_score = []
+        if not self.rows:
+            return
+        self.writer.write(self.rows)
+        self.statuses.update(row["status"] for row in self.rows)
+        self.checkpoint["completed"] += len(self.rows)
+        self.checkpoint["last_source"] = self.rows[-1]["source"]
+        self.scored_this_run += len(self.rows)
+        self.rows = []
+
+        if self.checkpoint["completed"] - self.checkpointed >= self.checkpoint_every:
+            self.save_checkpoint()
+        if time.perf_counter() - self.last_progress >= self.progress_interval:
+            self.print_progress()
+
+    def save_checkpoint(self, finished=False):
+        self.checkpoint.update(writer=self.writer.commit(), statuses=dict(self.statuses),
+                               diseases=dict(self.diseases), finished=finished)
+        save_json(self.checkpoint_file, self.checkpoint)
+        self.checkpointed = self.checkpoint["completed"]
+
+    def images_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.scored_this_run / elapsed if elapsed > 0 else 0.0
+
+    def print_progress(self):
+        self.last_progress = time.perf_counter()
+        print(f"{self.checkpoint['completed']:>10,} images  {self.images_per_sec():8.1f} images/s  "
+              f"({self.statuses['error']} errors, {self.statuses['retake_photo']} retakes)", flush=True)
+
+    def summary(self):
+        return {
+            "images": self.checkpoint["completed"],
+            "statuses": dict(self.statuses),
+            "disease_counts": dict(self.diseases.most_common()),
+            "locale": self.locale,
+            "recommendations": {name: get_recommendations(name, self.locale) for name in self.diseases},
+            "backend": self.backend.name,
+            "postprocessing": self.postprocessor.info(),
+            "quality_gate": self.quality_gate.stats() if self.quality_gate is not None else None,
+            "this_run": {
+                "images": self.scored_this_run,
+                "seconds": round(time.perf_counter() - self.started, 2),
+                "images_per_sec": round(self.images_per_sec(), 2),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='image directories, zip/tar archives or single images')
+    parser.add_argument('--output', required=True, help='.csv, .ndjson/.jsonl or .parquet (a directory of parts)')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='output format (default: from the extension)')
+    parser.add_argument('--backend', default=INFERENCE_BACKEND, help='inference backend (default: INFERENCE_BACKEND)')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=DECODE_WORKERS, help='decode processes')
+    parser.add_argument('--locale', default=DEFAULT_LOCALE, help='language of the recommendations')
+    parser.add_argument('--inline-recommendations', action='store_true',
+                        help='add each image\'s recommendations to its row, not only to the summary')
+    parser.add_argument('--no-quality-gate', action='store_true',
+                        help='score every image, even those the quality gate would reject')
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help='images between checkpoints')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='seconds between progress lines')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--resume', action='store_true', help='continue an interrupted run')
+    group.add_argument('--overwrite', action='store_true', help='replace an existing output')
+    args = parser.parse_args()
+
+    fmt = args.format or FORMATS.get(os.path.splitext(args.output.rstrip(os.sep))[1].lower())
+    if fmt is None:
+        parser.error(f"cannot tell the format of {args.output}; give --format")
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("🚨 Parquet output needs pyarrow (pip install pyarrow)")
+    inputs = [os.path.abspath(path) for path in args.inputs]
+    output = os.path.abspath(args.output)
+
+    checkpoint = load_checkpoint(output, inputs, fmt) if args.resume else None
+    if checkpoint is None and not args.overwrite and os.path.exists(output):
+        if args.resume:
+            sys.exit(f"🚨 {output} exists but has no checkpoint to resume from; use --overwrite to replace it")
+        sys.exit(f"🚨 {output} exists; use --resume to continue it or --overwrite to replace it")
+    if checkpoint is not None and checkpoint["finished"]:
+        print(f"✅ {output} is already complete ({checkpoint['completed']:,} images)")
+        return
+
+    fields = FIELDS + ['recommendations'] if args.inline_recommendations else FIELDS
+    writer = WRITERS[fmt](output, fields)
+    if checkpoint is not None:
+        writer.resume(checkpoint["writer"])
+        print(f"Resuming after {checkpoint['completed']:,} images")
+    else:
+        if args.overwrite and os.path.isdir(output):
+            for name in os.listdir(output):
+                if name.startswith('part-') and name.endswith('.parquet'):
+                    os.remove(os.path.join(output, name))
+        writer.start()
+        checkpoint = {"inputs": inputs, "format": fmt, "completed": 0, "last_source": None,
+                      "writer": writer.commit(), "statuses": {}, "diseases": {}, "finished": False}
+        save_json(checkpoint_path(output), checkpoint)
+
+    labels = class_labels()
+    backend = load_scoring_backend(args.backend, len(labels))
+    backend.warmup([args.batch_size])
+    height, width = backend.input_shape[:2]
+    print(f"✅ '{backend.name}' backend, {width}x{height} input, batches of {args.batch_size}, "
+          f"{args.workers} decode processes")
+
+    scorer = BulkScorer(
+        backend,
+        Postprocessor(labels, temperature=load_temperature(CALIBRATION_PATH), top_k=TOP_K,
+                      threshold=LOW_CONFIDENCE_THRESHOLD),
+        writer,
+        QualityGate(
+            min_side=QUALITY_MIN_SIDE,
+            min_sharpness=QUALITY_MIN_SHARPNESS,
+            min_brightness=QUALITY_MIN_BRIGHTNESS,
+            max_brightness=QUALITY_MAX_BRIGHTNESS,
+            min_contrast=QUALITY_MIN_CONTRAST,
+            min_plant_fraction=QUALITY_MIN_PLANT_FRACTION,
+        ) if QUALITY_GATE and not args.no_quality_gate else None,
+        args.batch_size,
+        args.locale,
+        args.inline_recommendations,
+        checkpoint,
+        checkpoint_path(output),
+        args.checkpoint_every,
+        args.progress_interval,
+    )
+
+    # Spawned, not forked: the parent may already be running TensorFlow threads.
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'))
+    sources = skip_completed(iter_sources(inputs), checkpoint)
+    try:
+        chunks = chunked(((source, portable(ref)) for source, ref in sources), DECODE_CHUNK_SIZE)
+        for chunk_sources, decoded in decoded_in_order(executor, chunks, (width, height), 2 * args.workers):
+            for source, (pixels, error, source_size) in zip(chunk_sources, decoded):
+                scorer.add(source, pixels, error, source_size)
+        scorer.flush()
+    except KeyboardInterrupt:
+        # The checkpoint is left as it was: rows written since then may be
+        # incomplete, and --resume drops them and scores those images again.
+        executor.shutdown(wait=False, cancel_futures=True)
+        sys.exit(f"\n⚠️ Interrupted; rerun with --resume to continue from image {scorer.checkpointed:,}")
+    executor.shutdown()
+
+    scorer.save_checkpoint(finished=True)
+    writer.close()
+    summary = scorer.summary()
+    summary_path = output.rstrip(os.sep) + '.summary.json'
+    save_json(summary_path, summary)
+    scorer.print_progress()
+    print(f"✅ {summary['images']:,} images scored into {output} ({summary['statuses']}); "
+          f"summary in {summary_path}")
+
+
+if __name__ == '__main__':
+    main()
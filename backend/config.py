@@ -0,0 +1,115 @@
+import os
+import tempfile
+
+# --- CONFIGURATION ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Keras model served by the "tf_function" and "keras" backends, e.g. the
+# distilled student written by ml/distill.py.
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(BASE_DIR, '..', 'ml', 'crop_disease_model_best_weights.h5'))
+CLASS_NAMES_PATH = os.path.join(BASE_DIR, 'class_name.json')  # ✅ your file name
+
+# Micro-batching: concurrent /predict calls are grouped into one forward pass
+# once BATCH_MAX_SIZE images are queued or the oldest has waited BATCH_MAX_WAIT_MS.
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 10))
+
+# Serving backend, see inference.BACKENDS ("tf_function", "keras", "tflite", "remote" or "stub").
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "tf_function")
+
+# "stub" backend (benchmarks and load tests without weights): simulated
+# forward-pass time per batch plus per image.
+STUB_BATCH_MS = float(os.environ.get("STUB_BATCH_MS", 0))
+STUB_IMAGE_MS = float(os.environ.get("STUB_IMAGE_MS", 0))
+
+# "remote" mode: one inference_server.py process owns the model and gunicorn
+# workers reach it over a local socket, exchanging tensors through shared memory.
+# INFERENCE_SERVER_BACKEND is the backend that process runs. The socket sits in
+# a directory only this user can enter (created with mode 0700). The authkey has
+# no default: gunicorn.conf.py generates a random one per instance when it is
+# unset; set it yourself when running inference_server.py by hand.
+INFERENCE_SERVER_DIR = os.environ.get("INFERENCE_SERVER_DIR", os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"kisan_mitra-{os.getuid()}"))
+INFERENCE_SERVER_ADDRESS = os.environ.get("INFERENCE_SERVER_ADDRESS", os.path.join(INFERENCE_SERVER_DIR, "inference.sock"))
+INFERENCE_SERVER_AUTHKEY = os.environ.get("INFERENCE_SERVER_AUTHKEY", "").encode()
+INFERENCE_SERVER_BACKEND = os.environ.get("INFERENCE_SERVER_BACKEND", "tf_function")
+INFERENCE_SERVER_CONNECT_TIMEOUT = float(os.environ.get("INFERENCE_SERVER_CONNECT_TIMEOUT", 120))
+
+# Used by the "tflite" backend only; produced by ml/export_tflite.py.
+TFLITE_MODEL_PATH = os.environ.get(
+    "TFLITE_MODEL_PATH", os.path.join(BASE_DIR, '..', 'ml', 'crop_disease_model_int8.tflite'))
+TFLITE_NUM_THREADS = int(os.environ.get("TFLITE_NUM_THREADS", os.cpu_count() or 1))
+
+# Prediction cache keyed by a hash of the uploaded bytes. The on-disk tier is
+# only enabled when PREDICTION_CACHE_DIR is set.
+PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 2048))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", 24 * 3600))
+PREDICTION_CACHE_DIR = os.environ.get("PREDICTION_CACHE_DIR")
+PREDICTION_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_DISK_MAX_ENTRIES", 100000))
+
+# /predict/batch: upper bound on images per request, images per forward pass,
+# and threads used to decode uploads in parallel. Zip members larger than
+# BATCH_ENDPOINT_MAX_IMAGE_MB once decompressed are refused before being read.
+BATCH_ENDPOINT_MAX_IMAGES = int(os.environ.get("BATCH_ENDPOINT_MAX_IMAGES", 256))
+BATCH_ENDPOINT_MAX_IMAGE_MB = float(os.environ.get("BATCH_ENDPOINT_MAX_IMAGE_MB", 20))
+BATCH_ENDPOINT_CHUNK_SIZE = int(os.environ.get("BATCH_ENDPOINT_CHUNK_SIZE", 32))
+DECODE_WORKERS = int(os.environ.get("DECODE_WORKERS", os.cpu_count() or 1))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Largest request body Flask accepts (uploads included); bigger requests get a 413.
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", 256))
+
+# Startup: load the model on a background thread so the server answers
+# immediately; /predict returns 503 with this Retry-After until it is ready.
+BACKGROUND_LOADING = os.environ.get("BACKGROUND_LOADING", "1") == "1"
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", 5))
+
+# Postprocessing: temperature from ml/calibrate.py, how many classes each
+# response lists, and the calibrated confidence below which the prediction is
+# reported as "Unknown Disease/Class Index Not Found".
+CALIBRATION_PATH = os.environ.get("CALIBRATION_PATH", os.path.join(BASE_DIR, 'calibration.json'))
+TOP_K = int(os.environ.get("TOP_K", 3))
+LOW_CONFIDENCE_THRESHOLD = float(os.environ.get("LOW_CONFIDENCE_THRESHOLD", 0.5))
+
+# Recommendation knowledge base (see knowledge_base.py): directory of per-disease
+# JSON files (translations in knowledge_base/locales/), rendered (disease, locale)
+# entries kept per worker, and how often (seconds) the files are checked for
+# edits; 0 disables hot reload.
+KNOWLEDGE_BASE_DIR = os.environ.get("KNOWLEDGE_BASE_DIR", os.path.join(BASE_DIR, 'knowledge_base'))
+KNOWLEDGE_BASE_CACHE_ENTRIES = int(os.environ.get("KNOWLEDGE_BASE_CACHE_ENTRIES", 128))
+KNOWLEDGE_BASE_RELOAD_INTERVAL = float(os.environ.get("KNOWLEDGE_BASE_RELOAD_INTERVAL", 2))
+
+# Recommendation index: RECOMMENDATIONS_STRICT=1 refuses to serve when a class
+# in class_name.json has no knowledge base entry (otherwise it is a
+# startup warning). RECOMMENDATIONS_GZIP_LEVEL (1-9) keeps every entry
+# pre-compressed and serves gzip to clients that accept it.
+RECOMMENDATIONS_STRICT = os.environ.get("RECOMMENDATIONS_STRICT", "0") == "1"
+RECOMMENDATIONS_GZIP_LEVEL = (int(os.environ["RECOMMENDATIONS_GZIP_LEVEL"])
+                              if os.environ.get("RECOMMENDATIONS_GZIP_LEVEL") else None)
+
+# Adds a Server-Timing header with the per-stage durations of each request
+# (visible in browser dev tools). Stage histograms are always served on /metrics.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+
+# Image quality gate (see quality_gate.py): uploads that are too small (shorter
+# side in pixels), blurred (Laplacian variance on 0-255 luminance), badly
+# exposed (mean luminance in [0, 1]), flat (luminance standard deviation) or
+# show too little foliage are answered with a "retake photo" 422 before
+# inference. Off by default so existing /predict clients keep getting a
+# prediction for every image; QUALITY_GATE=1 turns it on.
+QUALITY_GATE = os.environ.get("QUALITY_GATE", "0") == "1"
+QUALITY_MIN_SIDE = int(os.environ.get("QUALITY_MIN_SIDE", 128))
+QUALITY_MIN_SHARPNESS = float(os.environ.get("QUALITY_MIN_SHARPNESS", 15.0))
+QUALITY_MIN_BRIGHTNESS = float(os.environ.get("QUALITY_MIN_BRIGHTNESS", 0.12))
+QUALITY_MAX_BRIGHTNESS = float(os.environ.get("QUALITY_MAX_BRIGHTNESS", 0.92))
+QUALITY_MIN_CONTRAST = float(os.environ.get("QUALITY_MIN_CONTRAST", 0.05))
+QUALITY_MIN_PLANT_FRACTION = float(os.environ.get("QUALITY_MIN_PLANT_FRACTION", 0.10))
+
+def model_path_for(backend_name):
+    """
+    Model file read by `backend_name`; for "remote", the one the inference server loads.
+    """
+    if backend_name == "remote":
+        backend_name = INFERENCE_SERVER_BACKEND
+    return TFLITE_MODEL_PATH if backend_name == "tflite" else MODEL_PATH
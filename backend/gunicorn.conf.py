@@ -0,0 +1,30 @@
+# gunicorn reads this file automatically when started from backend/.
+#
+# With INFERENCE_BACKEND=remote the master starts inference_server.py before
+# forking workers, so the model is loaded once per instance instead of once
+# per worker; workers connect to it as they boot. Unless INFERENCE_SERVER_AUTHKEY
+# is set, the master generates a random authkey that the server and the workers
+# inherit through the environment.
+import os
+import secrets
+import subprocess
+import sys
+
+_inference_server = None
+
+
+def on_starting(server):
+    global _inference_server
+    if os.environ.get("INFERENCE_BACKEND") != "remote":
+        return
+    if not os.environ.get("INFERENCE_SERVER_AUTHKEY"):
+        os.environ["INFERENCE_SERVER_AUTHKEY"] = secrets.token_bytes(32).hex()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'inference_server.py')
+    _inference_server = subprocess.Popen([sys.executable, script], cwd=os.path.dirname(script))
+    server.log.info(f"Started inference server (pid {_inference_server.pid})")
+
+
+def on_exit(server):
+    if _inference_server is not None and _inference_server.poll() is None:
+        _inference_server.terminate()
+        _inference_server.wait(timeout=30)
@@ -0,0 +1,355 @@
+import atexit
+import json
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client
+
+import numpy as np
+
+from batching import LatencyStats
+
+# Architecture metadata ml/model_training.py writes next to each model file
+# (crop_disease_model_best_weights.h5 -> crop_disease_model_best_weights.meta.json).
+# ml/model_architecture.py imports the naming rule from here.
+METADATA_SUFFIX = '.meta.json'
+
+
+def model_metadata_path(model_path):
+    return os.path.splitext(model_path)[0] + METADATA_SUFFIX
+
+
+def load_model_metadata(model_path):
+    """
+    The metadata dict saved with `model_path` (backbone, head, input_size,
+    parameter and FLOP counts), or None for models trained before it existed.
+    """
+    path = model_metadata_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# --- BASE CLASS ---
+class InferenceBackend:
+    """
+    Common interface for everything that can turn a preprocessed batch of
+    shape (N, H, W, 3) into an (N, num_classes) array of probabilities.
+    Subclasses implement `_predict`; timing and warmup are handled here.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.latency = LatencyStats()
+        self.warmup_seconds = None
+
+    @property
+    def input_shape(self):
+        """(height, width, channels) expected by the model."""
+        raise NotImplementedError
+
+    def _predict(self, batch):
+        raise NotImplementedError
+
+    def predict(self, batch):
+        started = time.perf_counter()
+        predictions = self._predict(batch)
+        self.latency.add(time.perf_counter() - started)
+        return predictions
+
+    def warmup(self, batch_sizes):
+        """
+        Runs dummy inputs of every served batch size through the backend so the
+        first real request does not pay for tracing or buffer allocation.
+        """
+        started = time.perf_counter()
+        for size in sorted(set(batch_sizes)):
+            self._predict(np.zeros((size,) + tuple(self.input_shape), dtype=np.float32))
+        self.warmup_seconds = time.perf_counter() - started
+        return self.warmup_seconds
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "warmup_ms": round(self.warmup_seconds * 1000.0, 3) if self.warmup_seconds is not None else None,
+            "latency": self.latency.summary(),
+        }
+
+
+# --- KERAS BACKENDS ---
+class KerasPredictBackend(InferenceBackend):
+    """
+    Plain `model.predict`. Kept for comparison; it rebuilds its data pipeline
+    on every call, which dominates the cost of small batches.
+    """
+
+    name = "keras"
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    @property
+    def input_shape(self):
+        return tuple(self.model.input_shape[1:])
+
+    def _predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class TFFunctionBackend(InferenceBackend):
+    """
+    Calls the Keras model inside a `tf.function` with a fixed input signature,
+    so the forward pass runs as one traced graph instead of going through
+    `model.predict`.
+    """
+
+    name = "tf_function"
+
+    def __init__(self, model):
+        super().__init__()
+        import tensorflow as tf
+
+        self._tf = tf
+        self.model = model
+        spec = tf.TensorSpec((None,) + self.input_shape, tf.float32)
+        self._forward = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+
+    @property
+    def input_shape(self):
+        return tuple(self.model.input_shape[1:])
+
+    def _predict(self, batch):
+        return self._forward(self._tf.convert_to_tensor(batch, dtype=self._tf.float32)).numpy()
+
+
+# --- TFLITE BACKEND ---
+class TFLiteBackend(InferenceBackend):
+    """
+    Runs a converted .tflite model (float16 or full-int8, see ml/export_tflite.py)
+    with the TFLite interpreter. Uses `tflite_runtime` when it is installed and
+    falls back to `tf.lite` otherwise. A single interpreter (one tensor arena)
+    is kept; batches are zero-padded to the next power of two, so its input is
+    only resized when a batch falls in a different size bucket.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=None):
+        super().__init__()
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self._lock = threading.Lock()
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+    @property
+    def input_shape(self):
+        return tuple(int(d) for d in self._input['shape'][1:])
+
+    def _resize(self, batch_size):
+        """
+        Resizes the interpreter input to the power-of-two bucket holding
+        `batch_size`; returns the bucket size.
+        """
+        bucket = 1 << max(batch_size - 1, 0).bit_length()
+        if bucket != self._batch_size:
+            self._interpreter.resize_tensor_input(self._input['index'], [bucket] + list(self.input_shape))
+            self._interpreter.allocate_tensors()
+            self._batch_size = bucket
+        return bucket
+
+    @staticmethod
+    def _quantize(batch, detail):
+        dtype = detail['dtype']
+        if not np.issubdtype(dtype, np.integer):
+            return batch.astype(dtype, copy=False)
+        scale, zero_point = detail['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    @staticmethod
+    def _dequantize(values, detail):
+        if not np.issubdtype(detail['dtype'], np.integer):
+            return values.astype(np.float32, copy=False)
+        scale, zero_point = detail['quantization']
+        return (values.astype(np.float32) - zero_point) * scale
+
+    def _predict(self, batch):
+        n = len(batch)
+        with self._lock:
+            bucket = self._resize(n)
+            inputs = self._quantize(batch, self._input)
+            if bucket > n:
+                inputs = np.concatenate([inputs, np.zeros((bucket - n,) + inputs.shape[1:], dtype=inputs.dtype)])
+            self._interpreter.set_tensor(self._input['index'], inputs)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output['index'])[:n]
+        return self._dequantize(output, self._output)
+
+
+# --- REMOTE BACKEND ---
+class RemoteBackend(InferenceBackend):
+    """
+    Client for inference_server.py. The model lives only in the server process;
+    this backend writes each batch into a shared-memory block the server reads
+    in place, and reads predictions back from the same block, so only small
+    control messages travel over the socket.
+    """
+
+    name = "remote"
+
+    def __init__(self, address, authkey, max_batch_size=32, connect_timeout=120.0):
+        super().__init__()
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self._conn = Client(address, family='AF_UNIX', authkey=authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+        shape, self.num_classes = self._conn.recv()
+        self._input_shape = tuple(shape)
+        self.max_batch_size = max_batch_size
+
+        input_bytes = max_batch_size * int(np.prod(self._input_shape)) * 4
+        output_bytes = max_batch_size * self.num_classes * 4
+        self._shm = shared_memory.SharedMemory(create=True, size=input_bytes + output_bytes)
+        self._inputs = np.ndarray((max_batch_size,) + self._input_shape, dtype=np.float32, buffer=self._shm.buf)
+        self._outputs = np.ndarray((max_batch_size, self.num_classes), dtype=np.float32,
+                                   buffer=self._shm.buf, offset=input_bytes)
+        self._conn.send(('attach', self._shm.name, max_batch_size))
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def input_shape(self):
+        return self._input_shape
+
+    def _predict(self, batch):
+        results = []
+        with self._lock:
+            for start in range(0, len(batch), self.max_batch_size):
+                chunk = batch[start:start + self.max_batch_size]
+                self._inputs[:len(chunk)] = chunk
+                self._conn.send(('predict', len(chunk)))
+                status, message = self._conn.recv()
+                if status != 'ok':
+                    raise RuntimeError(f"Inference server error: {message}")
+                results.append(self._outputs[:len(chunk)].copy())
+        return np.concatenate(results)
+
+    def close(self):
+        try:
+            self._conn.close()
+            self._shm.close()
+            self._shm.unlink()
+        except (OSError, BufferError):
+            pass
+
+
+# --- STUB BACKEND ---
+class StubBackend(InferenceBackend):
+    """
+    Model-free stand-in for benchmarks and load tests on machines without
+    weights or TensorFlow. Each image is pooled to a 4x4 RGB grid and pushed
+    through a fixed random projection, so the output is a valid softmax row
+    that depends deterministically on the input. `batch_ms` + `image_ms` per
+    image of sleep simulates the forward pass (sleeping releases the GIL, as
+    TensorFlow does).
+    """
+
+    name = "stub"
+
+    def __init__(self, num_classes, input_shape=(224, 224, 3), batch_ms=0.0, image_ms=0.0, seed=0):
+        super().__init__()
+        self._input_shape = tuple(input_shape)
+        self.batch_seconds = batch_ms / 1000.0
+        self.image_seconds = image_ms / 1000.0
+        self._weights = np.random.default_rng(seed).normal(0.0, 8.0, size=(4 * 4 * 3, num_classes)).astype(np.float32)
+
+    @property
+    def input_shape(self):
+        return self._input_shape
+
+    def _predict(self, batch):
+        delay = self.batch_seconds + self.image_seconds * len(batch)
+        if delay > 0:
+            time.sleep(delay)
+        n, height, width, channels = batch.shape
+        grid = batch[:, :height - height % 4, :width - width % 4]
+        pooled = grid.reshape(n, 4, (height - height % 4) // 4, 4, (width - width % 4) // 4, channels).mean(axis=(2, 4))
+        logits = pooled.reshape(n, -1) @ self._weights
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+# --- REGISTRY ---
+BACKENDS = {
+    KerasPredictBackend.name: KerasPredictBackend,
+    TFFunctionBackend.name: TFFunctionBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    RemoteBackend.name: RemoteBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def create_backend(name, **kwargs):
+    """
+    Instantiates the backend registered under `name`.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name](**kwargs)
+
+
+def load_backend(name, model_path, tflite_model_path, tflite_num_threads=None,
+                 server_address=None, server_authkey=None, max_batch_size=32, connect_timeout=120.0,
+                 num_classes=None, stub_batch_ms=0.0, stub_image_ms=0.0, input_shape=(224, 224, 3)):
+    """
+    Loads whatever backend `name` needs (Keras model, TFLite file or a
+    connection to the inference server) and returns the backend, or None if
+    its model file does not exist. The "stub" backend needs only `num_classes`
+    and takes its `input_shape` from the caller.
+    """
+    if name == StubBackend.name:
+        return create_backend(name, num_classes=num_classes, input_shape=input_shape,
+                              batch_ms=stub_batch_ms, image_ms=stub_image_ms)
+    if name == RemoteBackend.name:
+        return create_backend(name, address=server_address, authkey=server_authkey,
+                              max_batch_size=max_batch_size, connect_timeout=connect_timeout)
+    if name == TFLiteBackend.name:
+        if not os.path.exists(tflite_model_path):
+            return None
+        return create_backend(name, model_path=tflite_model_path, num_threads=tflite_num_threads)
+    if not os.path.exists(model_path):
+        return None
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path, compile=False)
+    return create_backend(name, model=model)
+
+
+def warmup_batch_sizes(max_batch_size):
+    """
+    Batch sizes to warm up: powers of two up to the batcher limit, plus the limit itself.
+    """
+    sizes = {max_batch_size}
+    size = 1
+    while size < max_batch_size:
+        sizes.add(size)
+        size *= 2
+    return sorted(sizes)
@@ -0,0 +1,116 @@
+"""
+Dedicated inference process for INFERENCE_BACKEND=remote.
+
+Loads the model once (with INFERENCE_SERVER_BACKEND) and serves every gunicorn
+worker over a local Unix socket. Each worker allocates one shared-memory block
+and attaches it here; input batches and output probabilities are read and
+written in place, so tensors never travel over the socket.
+
+Started automatically by gunicorn.conf.py, or by hand with:
+    INFERENCE_SERVER_AUTHKEY=<secret> python inference_server.py
+"""
+import json
+import os
+import stat
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import AuthenticationError, Listener
+
+import numpy as np
+
+from config import (
+    MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_NUM_THREADS, BATCH_MAX_SIZE, CLASS_NAMES_PATH,
+    INFERENCE_SERVER_ADDRESS, INFERENCE_SERVER_AUTHKEY, INFERENCE_SERVER_BACKEND,
+    STUB_BATCH_MS, STUB_IMAGE_MS, model_path_for,
+)
+from inference import load_backend, load_model_metadata, warmup_batch_sizes
+
+
+def handle_client(conn, backend, num_classes):
+    """
+    Serves one worker connection until it disconnects.
+    """
+    conn.send((backend.input_shape, num_classes))
+    _, shm_name, max_batch_size = conn.recv()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The worker owns (and unlinks) the block; stop this process's tracker from doing it too.
+    resource_tracker.unregister(shm._name, 'shared_memory')
+
+    input_bytes = max_batch_size * int(np.prod(backend.input_shape)) * 4
+    inputs = np.ndarray((max_batch_size,) + tuple(backend.input_shape), dtype=np.float32, buffer=shm.buf)
+    outputs = np.ndarray((max_batch_size, num_classes), dtype=np.float32, buffer=shm.buf, offset=input_bytes)
+
+    try:
+        while True:
+            try:
+                _, n = conn.recv()
+            except EOFError:
+                break
+            try:
+                outputs[:n] = backend.predict(inputs[:n])
+                conn.send(('ok', None))
+            except Exception as e:
+                conn.send(('error', str(e)))
+    finally:
+        del inputs, outputs
+        shm.close()
+        conn.close()
+
+
+def private_socket_dir(path):
+    """
+    Creates the directory holding the socket with mode 0700, or checks that an
+    existing one belongs to this user and is not reachable by anyone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+def serve():
+    if not INFERENCE_SERVER_AUTHKEY:
+        print("🚨 Inference server: INFERENCE_SERVER_AUTHKEY is not set")
+        sys.exit(1)
+    started = time.perf_counter()
+    with open(CLASS_NAMES_PATH, 'r') as f:
+        num_classes = len(json.load(f))
+    metadata = load_model_metadata(model_path_for(INFERENCE_SERVER_BACKEND)) or {}
+    backend = load_backend(
+        INFERENCE_SERVER_BACKEND,
+        model_path=MODEL_PATH,
+        tflite_model_path=TFLITE_MODEL_PATH,
+        tflite_num_threads=TFLITE_NUM_THREADS,
+        num_classes=num_classes,
+        stub_batch_ms=STUB_BATCH_MS,
+        stub_image_ms=STUB_IMAGE_MS,
+        input_shape=tuple(metadata.get('input_size', (224, 224, 3))),
+    )
+    if backend is None:
+        print(f"🚨 Inference server: model not found at {model_path_for(INFERENCE_SERVER_BACKEND)}")
+        sys.exit(1)
+    backend.warmup(warmup_batch_sizes(BATCH_MAX_SIZE))
+    num_classes = int(backend.predict(np.zeros((1,) + tuple(backend.input_shape), dtype=np.float32)).shape[-1])
+
+    private_socket_dir(os.path.dirname(os.path.abspath(INFERENCE_SERVER_ADDRESS)))
+    if os.path.exists(INFERENCE_SERVER_ADDRESS):
+        os.remove(INFERENCE_SERVER_ADDRESS)
+    listener = Listener(INFERENCE_SERVER_ADDRESS, family='AF_UNIX', authkey=INFERENCE_SERVER_AUTHKEY)
+    print(f"✅ Inference server ({backend.name}) ready on {INFERENCE_SERVER_ADDRESS} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError, AuthenticationError) as e:
+            print(f"⚠️ Inference server: rejected connection ({e})")
+            continue
+        threading.Thread(target=handle_client, args=(conn, backend, num_classes), daemon=True).start()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,190 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) shared by every latency histogram: 0.5 ms to 10 s.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# --- METRICS ---
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """
+    Either set/inc/dec directly, or computed at scrape time by `value_fn`,
+    which returns a number or a {label values tuple: number} dict.
+    """
+
+    def __init__(self, name, help_text, label_names=(), value_fn=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.value_fn = value_fn
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self._value = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.value_fn() if self.value_fn is not None else self._value
+        values = value if isinstance(value, dict) else {(): value}
+        for label_values, v in sorted(values.items()):
+            if v is not None:
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(v)}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: memory per label combination is one list of
+    len(buckets) + 1 counts plus a sum, however many values are observed.
+    """
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.label_names, label_values, [("le", le)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- REQUEST TRACING ---
+class RequestTrace:
+    """
+    Per-request stage timings. `stage()` costs two perf_counter() calls; the
+    timings are only folded into the shared histograms once, in finish().
+    """
+    __slots__ = ('started', 'stages')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def finish(self, stage_histogram):
+        for name, seconds in self.stages:
+            stage_histogram.observe(seconds, name)
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total_seconds):
+        """
+        Server-Timing header value, e.g. "decode;dur=3.10, inference;dur=41.52, total;dur=47.80".
+        """
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages]
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# --- METRICS EXPOSED BY THE APP ---
+# One registry per process: behind gunicorn each worker reports its own values.
+registry = Registry()
+REQUEST_SECONDS = registry.register(Histogram(
+    "kisan_mitra_request_duration_seconds", "Time spent handling a request.", ("endpoint",)))
+STAGE_SECONDS = registry.register(Histogram(
+    "kisan_mitra_stage_duration_seconds", "Time spent in each stage of /predict.", ("stage",)))
+REQUESTS = registry.register(Counter(
+    "kisan_mitra_requests_total", "Requests handled, by endpoint and status code.", ("endpoint", "status")))
+ERRORS = registry.register(Counter(
+    "kisan_mitra_errors_total", "Failed requests, by error type.", ("type",)))
+IN_FLIGHT = registry.register(Gauge(
+    "kisan_mitra_requests_in_flight", "Requests currently being handled."))
+QUALITY_REJECTIONS = registry.register(Counter(
+    "kisan_mitra_quality_rejections_total", "Uploads rejected by the quality gate, by failed check.", ("check",)))
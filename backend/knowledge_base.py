@@ -0,0 +1,381 @@
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# --- KNOWLEDGE BASE FORMAT ---
+# knowledge_base/manifest.json lists every disease and the file holding its
+# advice; each disease file is one JSON object with the fields below.
+# Bump "version" in the manifest whenever the advice changes.
+MANIFEST_NAME = 'manifest.json'
+SCHEMA_VERSION = 1
+TEXT_FIELDS = ('symptoms',)
+LIST_FIELDS = ('prevention', 'treatment_organic', 'treatment_chemical', 'soil_health_tips')
+
+# Translations: locales/<code>.json maps disease names to any subset of the
+# fields above. Fields a table does not translate are served in English.
+LOCALES_DIR = 'locales'
+DEFAULT_LOCALE = 'en'
+
+
+def normalize_name(disease_name):
+    """
+    Lower-cases a class name and collapses every run of spaces, underscores
+    and punctuation to one underscore, so "Corn_(maize)___Common_rust_" and
+    "Corn_(maize)___Common_rust" compare equal.
+    """
+    return re.sub(r'[^a-z0-9]+', '_', disease_name.lower()).strip('_')
+
+
+# --- SCHEMA VALIDATION ---
+def validate_entry(entry):
+    """
+    Returns a list of problems with one disease entry (empty when valid).
+    """
+    if not isinstance(entry, dict):
+        return ["entry must be a JSON object"]
+    errors = []
+    for field in TEXT_FIELDS:
+        if not isinstance(entry.get(field), str) or not entry[field].strip():
+            errors.append(f"'{field}' must be a non-empty string")
+    for field in LIST_FIELDS:
+        value = entry.get(field)
+        if not isinstance(value, list) or not value or not all(isinstance(v, str) and v.strip() for v in value):
+            errors.append(f"'{field}' must be a non-empty list of strings")
+    unknown = sorted(set(entry) - set(TEXT_FIELDS) - set(LIST_FIELDS))
+    if unknown:
+        errors.append(f"unknown fields {unknown}")
+    return errors
+
+
+def validate_locale_table(table, disease_names):
+    """
+    Returns a list of problems with one translation table (empty when valid).
+    """
+    if not isinstance(table, dict) or not isinstance(table.get("diseases"), dict):
+        return ["table must be a JSON object with a 'diseases' object"]
+    errors = []
+    for name, fields in table["diseases"].items():
+        if name not in disease_names:
+            errors.append(f"{name}: not in the manifest")
+            continue
+        if not isinstance(fields, dict):
+            errors.append(f"{name}: must be a JSON object")
+            continue
+        # A translation may cover only some fields, so validate it as if the
+        # rest came from a complete entry.
+        placeholder = {field: "-" for field in TEXT_FIELDS}
+        placeholder.update({field: ["-"] for field in LIST_FIELDS})
+        errors.extend(f"{name}: {error}" for error in validate_entry({**placeholder, **fields}))
+    return errors
+
+
+def validate_manifest(manifest):
+    if not isinstance(manifest, dict):
+        return ["manifest must be a JSON object"]
+    errors = []
+    if manifest.get("schema_version") != SCHEMA_VERSION:
+        errors.append(f"schema_version must be {SCHEMA_VERSION}")
+    if not isinstance(manifest.get("version"), int):
+        errors.append("'version' must be an integer")
+    diseases = manifest.get("diseases")
+    if not isinstance(diseases, dict) or not diseases:
+        return errors + ["'diseases' must map disease names to .json file names"]
+    seen = {}
+    for name, file_name in diseases.items():
+        if not isinstance(file_name, str) or not file_name.endswith('.json') or os.path.basename(file_name) != file_name:
+            errors.append(f"{name}: file must be a .json file name in the knowledge base directory")
+        other = seen.setdefault(normalize_name(name), name)
+        if other != name:
+            errors.append(f"{name}: same normalised name as {other}")
+    return errors
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def validate_knowledge_base(directory):
+    """
+    Validates the manifest and every disease file; returns "file: problem" strings.
+    """
+    try:
+        manifest = read_json(os.path.join(directory, MANIFEST_NAME))
+    except (OSError, ValueError) as e:
+        return [f"{MANIFEST_NAME}: {e}"]
+    errors = [f"{MANIFEST_NAME}: {error}" for error in validate_manifest(manifest)]
+    if errors:
+        return errors
+    for file_name in manifest["diseases"].values():
+        try:
+            entry = read_json(os.path.join(directory, file_name))
+        except (OSError, ValueError) as e:
+            errors.append(f"{file_name}: {e}")
+            continue
+        errors.extend(f"{file_name}: {error}" for error in validate_entry(entry))
+    for locale in list_locales(directory):
+        file_name = os.path.join(LOCALES_DIR, f"{locale}.json")
+        try:
+            table = read_json(os.path.join(directory, file_name))
+        except (OSError, ValueError) as e:
+            errors.append(f"{file_name}: {e}")
+            continue
+        errors.extend(f"{file_name}: {error}" for error in validate_locale_table(table, manifest["diseases"]))
+    return errors
+
+
+def list_locales(directory):
+    """
+    Locale codes with a translation table (file names only; nothing is read).
+    """
+    locales_dir = os.path.join(directory, LOCALES_DIR)
+    if not os.path.isdir(locales_dir):
+        return []
+    return sorted(name[:-len('.json')] for name in os.listdir(locales_dir) if name.endswith('.json'))
+
+
+# --- SNAPSHOTS ---
+class KnowledgeBaseSnapshot:
+    """
+    One loaded version of the knowledge base: the manifest, the available
+    locales, the translation tables loaded so far, and a bounded LRU of the
+    rendered (disease, locale) entries. A reload builds a new snapshot and
+    swaps it in; requests holding the old one finish with it undisturbed.
+    """
+
+    def __init__(self, directory, manifest, fingerprint, max_entries):
+        self.directory = directory
+        self.version = manifest["version"]
+        self.files = manifest["diseases"]
+        self.normalized = {normalize_name(name): name for name in self.files}
+        self.locales = [DEFAULT_LOCALE] + [code for code in list_locales(directory) if code != DEFAULT_LOCALE]
+        self.locale_tables = {}
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def resolve(self, name):
+        """
+        Manifest name matching `name` exactly or after normalisation, or None.
+        """
+        if name in self.files:
+            return name
+        return self.normalized.get(normalize_name(name))
+
+
+# --- KNOWLEDGE BASE ---
+class KnowledgeBase:
+    """
+    Disease advice read lazily from `directory`, one file per disease, with at
+    most `max_entries` rendered entries kept in memory per process. Each cached
+    entry holds the parsed dict and its encoded JSON (and gzip) bytes for one
+    (disease, locale) pair; a translation table is only read the first time
+    its locale is requested.
+
+    start_watching() polls the files from a background thread and reloads
+    when they change. A new version is validated in full before it replaces
+    the current one, so a broken edit is reported and ignored instead of
+    being served; requests never wait on a reload.
+    """
+
+    def __init__(self, directory, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.reload_errors = []
+        self._rejected_fingerprint = None
+        self._watcher = None
+        self.snapshot = self._load_snapshot()
+
+    def _fingerprint(self):
+        files = []
+        for sub_dir in ('', LOCALES_DIR):
+            try:
+                files.extend(
+                    (os.path.join(sub_dir, entry.name), entry.stat().st_mtime_ns, entry.stat().st_size)
+                    for entry in os.scandir(os.path.join(self.directory, sub_dir)) if entry.name.endswith('.json')
+                )
+            except OSError:
+                pass
+        return tuple(sorted(files))
+
+    def _load_snapshot(self):
+        fingerprint = self._fingerprint()
+        manifest = read_json(os.path.join(self.directory, MANIFEST_NAME))
+        errors = validate_manifest(manifest)
+        if errors:
+            raise ValueError(f"Invalid knowledge base manifest: {errors}")
+        return KnowledgeBaseSnapshot(self.directory, manifest, fingerprint, self.max_entries)
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def names(self):
+        return list(self.snapshot.files)
+
+    def locales(self):
+        return list(self.snapshot.locales)
+
+    def resolve(self, name):
+        return self.snapshot.resolve(name)
+
+    # --- Lookups ---
+    def _locale_table(self, snapshot, locale):
+        """
+        Translations for `locale` ({} for English or an unknown locale), read on first use.
+        """
+        if locale == DEFAULT_LOCALE or locale not in snapshot.locales:
+            return {}
+        table = snapshot.locale_tables.get(locale)
+        if table is None:
+            try:
+                table = read_json(os.path.join(snapshot.directory, LOCALES_DIR, f"{locale}.json"))
+                errors = validate_locale_table(table, snapshot.files)
+            except (OSError, ValueError) as e:
+                errors = [str(e)]
+            if errors:
+                print(f"⚠️ Translations for '{locale}' ignored: {errors}")
+                table = {}
+            else:
+                table = table["diseases"]
+            snapshot.locale_tables[locale] = table
+        return table
+
+    def _read_entry(self, snapshot, key):
+        try:
+            record = read_json(os.path.join(snapshot.directory, snapshot.files[key]))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Knowledge base entry '{key}' unreadable: {e}")
+            return None
+        errors = validate_entry(record)
+        if errors:
+            print(f"⚠️ Knowledge base entry '{key}' invalid: {errors}")
+            return None
+        return record
+
+    def _entry(self, snapshot, name, locale=DEFAULT_LOCALE):
+        key = snapshot.resolve(name)
+        if key is None:
+            return None
+        cache_key = (key, locale if locale in snapshot.locales else DEFAULT_LOCALE)
+        with snapshot.lock:
+            entry = snapshot.entries.get(cache_key)
+            if entry is not None:
+                snapshot.entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+        self.misses += 1
+        if cache_key[1] == DEFAULT_LOCALE:
+            record = self._read_entry(snapshot, key)
+            if record is None:
+                return None
+        else:
+            english = self._entry(snapshot, key)
+            if english is None:
+                return None
+            # Field by field: anything the table does not translate stays English.
+            record = {**english["record"], **self._locale_table(snapshot, cache_key[1]).get(key, {})}
+        entry = {"record": record, "json": json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')}
+        with snapshot.lock:
+            snapshot.entries[cache_key] = entry
+            while len(snapshot.entries) > snapshot.max_entries:
+                snapshot.entries.popitem(last=False)
+        return entry
+
+    def get(self, name, locale=DEFAULT_LOCALE):
+        """
+        Advice dict for `name` (matched after normalisation) in `locale`, or None.
+        """
+        entry = self._entry(self.snapshot, name, locale)
+        return entry["record"] if entry is not None else None
+
+    def encoded(self, name, gzip_level=None, locale=DEFAULT_LOCALE):
+        """
+        The entry in `locale` as compact UTF-8 JSON bytes, or as a standalone
+        gzip member when `gzip_level` is given; None when there is no valid entry.
+        """
+        entry = self._entry(self.snapshot, name, locale)
+        if entry is None:
+            return None
+        if gzip_level is None:
+            return entry["json"]
+        cache_key = f"gzip{gzip_level}"
+        if cache_key not in entry:
+            entry[cache_key] = gzip.compress(entry["json"], compresslevel=gzip_level)
+        return entry[cache_key]
+
+    # --- Hot reload ---
+    def reload(self):
+        """
+        Swaps in the current files if they pass validation; returns True when swapped.
+        """
+        errors = validate_knowledge_base(self.directory)
+        if errors:
+            self.reload_errors = errors
+            print(f"⚠️ Knowledge base change rejected, still serving version {self.version}: {errors}")
+            return False
+        snapshot = self._load_snapshot()
+        self.snapshot = snapshot
+        self.reloads += 1
+        self.reload_errors = []
+        print(f"✅ Knowledge base reloaded (version {snapshot.version}, {len(snapshot.files)} diseases)")
+        return True
+
+    def check_for_changes(self):
+        fingerprint = self._fingerprint()
+        if fingerprint != self.snapshot.fingerprint and fingerprint != self._rejected_fingerprint:
+            if not self.reload():
+                # Do not re-validate the same broken files on every poll.
+                self._rejected_fingerprint = fingerprint
+
+    def start_watching(self, interval):
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"🚨 Knowledge base watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="knowledge-base-watcher", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version,
+            "diseases": len(snapshot.files),
+            "locales": snapshot.locales,
+            "loaded_locales": sorted(snapshot.locale_tables),
+            "cached_entries": len(snapshot.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "watching": self._watcher is not None,
+        }
+
+
+if __name__ == '__main__':
+    # python knowledge_base.py [directory]  -- validate before publishing an edit
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   'knowledge_base')
+    problems = validate_knowledge_base(directory)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ Knowledge base at {directory} is valid (version {read_json(os.path.join(directory, MANIFEST_NAME))['version']})")
@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+from recommendations import UNKNOWN_DISEASE
+
+# Probabilities are clipped to this before taking logs, so classes the model
+# gives exactly 0 (float32 underflow, demo vectors) stay finite.
+MIN_PROBABILITY = 1e-12
+
+
+def load_temperature(path):
+    """
+    Temperature fitted by ml/calibrate.py, or 1.0 (no scaling) when the file is missing.
+    """
+    if not os.path.exists(path):
+        return 1.0
+    with open(path, 'r') as f:
+        return float(json.load(f)["temperature"])
+
+
+# --- POSTPROCESSING ---
+class Postprocessor:
+    """
+    Turns raw softmax rows into calibrated top-k predictions. Everything works
+    on a (N, num_classes) array at once, so /predict (N=1) and /predict/batch
+    go through exactly the same code.
+
+    Temperature scaling divides the logits by `temperature` before the softmax;
+    since the model outputs probabilities, log-probabilities stand in for the
+    logits (they differ only by a per-row constant, which softmax ignores).
+    Rows whose calibrated top-1 probability is below `threshold` are reported
+    as UNKNOWN_DISEASE instead of their top class.
+    """
+
+    def __init__(self, labels, temperature=1.0, top_k=3, threshold=0.0):
+        self.labels = np.asarray(labels, dtype=object)
+        self.temperature = float(temperature)
+        self.top_k = max(1, min(int(top_k), len(self.labels)))
+        self.threshold = float(threshold)
+
+    def calibrate(self, probabilities):
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        if self.temperature == 1.0:
+            return probabilities
+        scaled = np.log(np.clip(probabilities, MIN_PROBABILITY, 1.0)) / self.temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        exp = np.exp(scaled)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def process(self, probabilities):
+        """
+        Returns (top_indices, top_scores, low_confidence) for a (N, C) array:
+        (N, k) class indices sorted by calibrated probability, their
+        probabilities, and a (N,) mask of rows below the threshold.
+        """
+        calibrated = self.calibrate(np.atleast_2d(probabilities))
+        k = self.top_k
+        # argpartition finds the k largest in O(C); only those k are then sorted.
+        top = np.argpartition(-calibrated, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(calibrated, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return top, top_scores, top_scores[:, 0] < self.threshold
+
+    def results(self, probabilities):
+        """
+        One dict per row: the reported disease and its class index
+        (UNKNOWN_DISEASE and None when below the threshold), its calibrated
+        confidence, and the top-k classes.
+        """
+        top, top_scores, low_confidence = self.process(probabilities)
+        names = self.labels[top]
+        return [
+            {
+                "disease": UNKNOWN_DISEASE if low else row_names[0],
+                "class_index": None if low else int(row_top[0]),
+                "confidence_score": round(float(row_scores[0]), 4),
+                "low_confidence": bool(low),
+                "top_k": [
+                    {"disease": name, "confidence": round(float(score), 4)}
+                    for name, score in zip(row_names, row_scores)
+                ],
+            }
+            for row_top, row_names, row_scores, low in zip(top, names, top_scores, low_confidence)
+        ]
+
+    def info(self):
+        return {"temperature": self.temperature, "top_k": self.top_k, "threshold": self.threshold}
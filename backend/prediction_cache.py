@@ -0,0 +1,252 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# --- PREDICTION CACHE ---
+class PredictionCache:
+    """
+    Content-addressed cache of model outputs, keyed by the SHA-256 of the
+    uploaded bytes. A bounded in-process LRU tier sits in front of an optional
+    on-disk tier that survives restarts. Both tiers expire entries after
+    `ttl_seconds` and are invalidated when any of `watched_paths` (model file,
+    class_name.json) changes on disk.
+
+    The lock only guards the memory tier and the counters; disk reads, writes
+    and eviction happen outside it. The disk directory may be shared by all
+    gunicorn workers, so each process re-counts it after every 10% of
+    `disk_max_entries` writes of its own; the limit can be overshot by up to
+    that much per worker between counts.
+    """
+
+    def __init__(self, watched_paths, max_entries=2048, ttl_seconds=86400.0,
+                 disk_dir=None, disk_max_entries=100000, check_interval=1.0):
+        self.watched_paths = list(watched_paths)
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.check_interval = check_interval
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._disk_entries = 0
+        self._uncounted_writes = 0
+        self._recount_every = max(1, disk_max_entries // 10)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self.fingerprint = self._compute_fingerprint()
+        if self.disk_dir:
+            self._prepare_disk_tier()
+
+    # --- Invalidation ---
+    def _compute_fingerprint(self):
+        digest = hashlib.sha256()
+        for path in self.watched_paths:
+            try:
+                st = os.stat(path)
+                digest.update(f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+            except OSError:
+                digest.update(f"{os.path.abspath(path)}:missing;".encode())
+        return digest.hexdigest()[:16]
+
+    def _check_fingerprint(self):
+        """
+        Called with the lock held. Returns True when the fingerprint changed
+        and the caller has to prepare the disk tier (after releasing the lock).
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        fingerprint = self._compute_fingerprint()
+        if fingerprint == self.fingerprint:
+            return False
+        print("♻️ Model or class names changed, invalidating prediction cache")
+        self.fingerprint = fingerprint
+        self._memory.clear()
+        self.invalidations += 1
+        return bool(self.disk_dir)
+
+    # --- Disk tier ---
+    def _disk_root(self, fingerprint=None):
+        return os.path.join(self.disk_dir, fingerprint or self.fingerprint)
+
+    @staticmethod
+    def _disk_path(root, key):
+        return os.path.join(root, key[:2], f"{key}.npy")
+
+    def _prepare_disk_tier(self):
+        """
+        Drops entries written for other model/class-name fingerprints and
+        counts what is left for the current one.
+        """
+        fingerprint = self.fingerprint
+        root = self._disk_root(fingerprint)
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(self.disk_dir):
+            if name != fingerprint:
+                shutil.rmtree(os.path.join(self.disk_dir, name), ignore_errors=True)
+        count = sum(len(files) for _, _, files in os.walk(root))
+        with self._lock:
+            self._disk_entries = count
+            self._uncounted_writes = 0
+
+    def _disk_get(self, root, key):
+        """
+        (predictions or None, whether an expired entry was removed).
+        """
+        path = self._disk_path(root, key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None, True
+            return np.load(path), False
+        except (OSError, ValueError):
+            return None, False
+
+    def _disk_put(self, root, key, predictions):
+        """
+        Writes one entry; returns True when it did not exist before.
+        """
+        path = self._disk_path(root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, predictions)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+        return not existed
+
+    def _evict_disk(self, root):
+        """
+        Re-counts the disk tier (other workers write to it too), removes
+        expired entries, then the oldest ones until it is back at 90% of its
+        limit. One thread per process at a time; others skip it.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            for dir_path, _, names in os.walk(root):
+                for name in names:
+                    path = os.path.join(dir_path, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+            files.sort()
+            cutoff = time.time() - self.ttl
+            target = int(self.disk_max_entries * 0.9)
+            remaining = len(files)
+            removed = 0
+            for mtime, path in files:
+                if mtime >= cutoff and remaining <= target:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+                remaining -= 1
+            with self._lock:
+                self._disk_entries = remaining
+                self._uncounted_writes = 0
+                self.evictions += removed
+        finally:
+            self._evict_lock.release()
+
+    # --- Public API ---
+    @staticmethod
+    def key(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached prediction row for `key`, or None on a miss.
+        """
+        with self._lock:
+            changed = self._check_fingerprint()
+            fingerprint = self.fingerprint
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, predictions = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return predictions
+                del self._memory[key]
+        if changed:
+            self._prepare_disk_tier()
+
+        predictions, expired = None, False
+        if self.disk_dir:
+            predictions, expired = self._disk_get(self._disk_root(fingerprint), key)
+        with self._lock:
+            if predictions is None:
+                if expired:
+                    self._disk_entries -= 1
+                self.misses += 1
+                return None
+            if fingerprint == self.fingerprint:
+                self._store_in_memory(key, predictions)
+            self.disk_hits += 1
+            return predictions
+
+    def put(self, key, predictions):
+        predictions = np.asarray(predictions)
+        with self._lock:
+            self._store_in_memory(key, predictions)
+            fingerprint = self.fingerprint
+        if not self.disk_dir:
+            return
+        root = self._disk_root(fingerprint)
+        try:
+            created = self._disk_put(root, key, predictions)
+        except OSError as e:
+            print(f"⚠️ Could not write prediction cache entry: {e}")
+            return
+        with self._lock:
+            if created:
+                self._disk_entries += 1
+                self._uncounted_writes += 1
+            evict = (self._disk_entries > self.disk_max_entries
+                     or self._uncounted_writes >= self._recount_every)
+        if evict:
+            self._evict_disk(root)
+
+    def _store_in_memory(self, key, predictions):
+        self._memory[key] = (time.monotonic(), predictions)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "fingerprint": self.fingerprint,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_entries": self._disk_entries if self.disk_dir else None,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
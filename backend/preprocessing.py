@@ -0,0 +1,75 @@
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+# Default (width, height) when neither a model nor its metadata says otherwise
+# (app.model_input_shape); matches the default IMG_SIZE in ml/data_preprocessing.py.
+TARGET_SIZE = (224, 224)
+
+_SCALE = np.float32(1.0 / 255.0)
+
+
+def _decode(data, target_size, info=None):
+    img = Image.open(io.BytesIO(data))
+    if info is not None:
+        info["source_size"] = img.size
+    if img.format == 'JPEG':
+        img.draft('RGB', target_size)
+    img.load()  # decode now (PIL is lazy) so it is timed separately from the resize
+    return img
+
+
+def _resize(img, target_size):
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if img.size != tuple(target_size):
+        img = img.resize(target_size, Image.BICUBIC, reducing_gap=3.0)
+    return img
+
+
+def load_image(data, target_size=TARGET_SIZE, out=None, trace=None, info=None):
+    """
+    Decodes uploaded image bytes into a float32 (height, width, 3) array in [0, 1].
+
+    JPEGs are decoded in draft mode, letting libjpeg downscale by 1/2, 1/4 or 1/8
+    during decoding as long as the result stays at least `target_size`. The
+    resized uint8 pixels are converted and normalised in a single pass into
+    `out` (allocated if not given), without intermediate float arrays.
+
+    With an instrumentation.RequestTrace as `trace`, the decode, resize and
+    normalize steps are recorded as separate stages. A dict passed as `info`
+    receives the upload's original (width, height) as "source_size".
+    """
+    started = time.perf_counter()
+    img = _decode(data, target_size, info)
+    decoded = time.perf_counter()
+    img = _resize(img, target_size)
+    resized = time.perf_counter()
+    out = normalize(np.asarray(img), out)
+
+    if trace is not None:
+        trace.add("decode", decoded - started)
+        trace.add("resize", resized - decoded)
+        trace.add("normalize", time.perf_counter() - resized)
+    return out
+
+
+def load_pixels(data, target_size=TARGET_SIZE, info=None):
+    """
+    load_image() without the normalisation: the resized uint8 (height, width, 3)
+    pixels, a quarter of the size of the float32 array. For decoding in other
+    processes (bulk_score.py), where the result has to be pickled back.
+    """
+    return np.asarray(_resize(_decode(data, target_size, info), target_size))
+
+
+def normalize(pixels, out=None):
+    """
+    uint8 pixels -> float32 in [0, 1], written into `out` (allocated if not given).
+    """
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    np.multiply(pixels, _SCALE, out=out)
+    return out
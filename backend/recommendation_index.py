@@ -0,0 +1,110 @@
+import gzip
+import json
+
+from knowledge_base import DEFAULT_LOCALE
+from recommendations import UNKNOWN_DISEASE
+
+
+def encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_prefix(fields, key):
+    """
+    `fields` as a JSON object left open after `"key":`, ready for a value.
+    """
+    head = encode_json(fields)
+    separator = b',' if len(head) > 2 else b''
+    return head[:-1] + separator + encode_json(key) + b':'
+
+
+def splice_json(fields, key, encoded_value):
+    """
+    Serialises `fields` plus one extra member whose value is already encoded
+    JSON, without decoding and re-encoding it.
+    """
+    return json_prefix(fields, key) + encoded_value + b'}'
+
+
+# --- RECOMMENDATION INDEX ---
+class RecommendationIndex:
+    """
+    Maps every model class index to its knowledge base entry, resolved once
+    per knowledge base version, and serves the entries as ready-to-send UTF-8
+    JSON bytes (cached by the knowledge base), so a request does a list lookup
+    and splices the bytes into its response instead of matching names and
+    re-serialising the nested dict.
+
+    Class names are matched to knowledge base names after normalisation (see
+    knowledge_base.normalize_name); classes that still have no entry use the
+    UNKNOWN_DISEASE entry and are listed in `missing`.
+
+    With `gzip_level`, entries are also served as standalone gzip members.
+    Gzip members can be concatenated (RFC 1952, section 2.2), so a gzip
+    response is built from the compressed dynamic fields plus the cached
+    member, without compressing the recommendation text per request.
+    """
+
+    def __init__(self, labels, knowledge_base, gzip_level=None):
+        self.labels = list(labels)
+        self.knowledge_base = knowledge_base
+        self.gzip_level = gzip_level
+        self._resolved = (None, [], [])
+        self._resolve()
+
+    def _resolve(self):
+        """
+        (snapshot, knowledge base name or None per class index, missing labels),
+        recomputed only after a hot reload swapped the snapshot.
+        """
+        snapshot = self.knowledge_base.snapshot
+        resolved = self._resolved
+        if resolved[0] is not snapshot:
+            keys = [snapshot.resolve(label) for label in self.labels]
+            keys = [None if key == UNKNOWN_DISEASE else key for key in keys]
+            missing = [label for label, key in zip(self.labels, keys) if key is None]
+            resolved = (snapshot, keys, missing)
+            self._resolved = resolved
+        return resolved
+
+    @property
+    def missing(self):
+        return self._resolve()[2]
+
+    def _encoded(self, name, gzip_level, locale):
+        encoded = self.knowledge_base.encoded(name, gzip_level, locale) if name is not None else None
+        if encoded is None:
+            encoded = self.knowledge_base.encoded(UNKNOWN_DISEASE, gzip_level, locale)
+        if encoded is None:
+            encoded = b'{}' if gzip_level is None else gzip.compress(b'{}', compresslevel=gzip_level)
+        return encoded
+
+    def encoded(self, class_index, gzip_level=None, locale=DEFAULT_LOCALE):
+        """
+        JSON bytes (or a gzip member) for a model class index in `locale`;
+        the generic entry for None.
+        """
+        name = None if class_index is None else self._resolve()[1][class_index]
+        return self._encoded(name, gzip_level, locale)
+
+    def encoded_for_name(self, name, locale=DEFAULT_LOCALE):
+        return self._encoded(name, None, locale)
+
+    def gzip_response(self, fields, key, member):
+        """
+        Gzip body equal to gzip(splice_json(fields, key, entry)) for the gzip
+        member of an entry (self.encoded(class_index, self.gzip_level)), made of
+        three members: the fields, the cached entry and the closing brace.
+        """
+        return (gzip.compress(json_prefix(fields, key), compresslevel=self.gzip_level)
+                + member
+                + gzip.compress(b'}', compresslevel=self.gzip_level))
+
+    def coverage(self):
+        missing = self.missing
+        return {
+            "classes": len(self.labels),
+            "covered": len(self.labels) - len(missing),
+            "missing": missing,
+            "gzip": self.gzip_level is not None,
+        }
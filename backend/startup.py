@@ -0,0 +1,78 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Taken when app.py starts importing (this is its first local import), so
+# timings below are relative to the start of the app's own import.
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupProgress:
+    """
+    Tracks staged background loading so /healthz and /readyz can report it:
+    the current stage, how long each finished stage took, and when the first
+    prediction was served.
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.stage = None
+        self.timings = {}
+        self.error = None
+        self.import_seconds = None
+        self.ready_seconds = None
+        self.first_prediction_seconds = None
+        self._ready = threading.Event()
+
+    @contextmanager
+    def stage_timer(self, name):
+        self.stage = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - started, 3)
+
+    def mark_imported(self):
+        self.import_seconds = round(time.perf_counter() - PROCESS_STARTED, 3)
+        if self.status == "starting":
+            self.status = "loading"
+
+    def mark_ready(self, status="ready"):
+        self.status = status
+        self.stage = None
+        self.ready_seconds = round(time.perf_counter() - PROCESS_STARTED, 3)
+        self._ready.set()
+
+    def mark_failed(self, error):
+        self.status = "failed"
+        self.error = str(error)
+        self._ready.set()
+
+    def record_prediction(self):
+        if self.first_prediction_seconds is None:
+            self.first_prediction_seconds = round(time.perf_counter() - PROCESS_STARTED, 3)
+            print(f"⏱️ First prediction served {self.first_prediction_seconds:.2f}s after start")
+
+    @property
+    def is_ready(self):
+        return self.status in ("ready", "demo")
+
+    def wait(self, timeout=None):
+        """
+        Blocks until loading has finished (successfully or not); returns is_ready.
+        """
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    def report(self):
+        return {
+            "status": self.status,
+            "stage": self.stage,
+            "stage_seconds": dict(self.timings),
+            "import_seconds": self.import_seconds,
+            "ready_seconds": self.ready_seconds,
+            "first_prediction_seconds": self.first_prediction_seconds,
+            "uptime_seconds": round(time.perf_counter() - PROCESS_STARTED, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,147 @@
+"""
+Shared helpers for the benchmark suite (bench_serving.py, load_test.py,
+compare.py): latency summaries, memory readings, run metadata and the JSON
+result files that compare.py diffs.
+"""
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, '..')
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Bumped when the layout of the result files changes.
+RESULTS_SCHEMA_VERSION = 1
+
+
+def latency_summary(seconds, items_per_call=1):
+    """
+    p50/p95/p99/mean/max in ms over per-call timings, plus throughput in
+    items per second (calls x items_per_call over the total measured time).
+    """
+    timings = np.asarray(seconds, dtype=np.float64)
+    if timings.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000.0
+    return {
+        "count": int(timings.size),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(timings.mean()) * 1000.0, 4),
+        "max_ms": round(float(timings.max()) * 1000.0, 4),
+        "throughput_per_sec": round(timings.size * items_per_call / float(timings.sum()), 2),
+    }
+
+
+def time_calls(fn, repeats, warmup=3, min_seconds=0.0):
+    """
+    Calls `fn` `warmup` times untimed, then at least `repeats` times (and for
+    at least `min_seconds`), returning the per-call durations in seconds.
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while len(timings) < repeats or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def process_peak_rss_mb(pid):
+    """
+    Peak RSS (VmHWM) of another process from /proc, or None where unavailable.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return None
+
+
+def process_tree(pid):
+    """
+    `pid` and all its descendants (Linux /proc), e.g. a gunicorn master and its workers.
+    """
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_metadata(**extra):
+    """
+    Where and on what a result was measured, so compare.py can warn when two
+    runs are not comparable (different machine, backend or settings).
+    """
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        "git_commit": _git('rev-parse', '--short', 'HEAD'),
+        "git_dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def save_results(suite, results, metadata, output=None):
+    """
+    Writes {"suite", "schema_version", "metadata", "results"} as JSON, by
+    default to benchmarks/results/<suite>-<UTC timestamp>.json, and returns the path.
+    """
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(RESULTS_DIR, f'{suite}-{stamp}.json')
+    with open(output, 'w') as f:
+        json.dump({
+            "suite": suite,
+            "schema_version": RESULTS_SCHEMA_VERSION,
+            "metadata": metadata,
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return output
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,78 @@
+"""
+Training input pipeline throughput (images/sec): ImageDataGenerator vs the
+tf.data pipeline in ml/tf_data_pipeline.py, on the same random subset of the
+training set. The tf.data pipeline is timed twice: the first epoch decodes
+and fills the on-disk cache, the second reads from it.
+
+Run from the repository root (needs the dataset under data/):
+    python benchmarks/bench_input_pipeline.py --images 4096
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+
+ML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml')
+sys.path.insert(0, ML_DIR)
+os.chdir(ML_DIR)  # DATASET_ROOT_DIR is relative to ml/
+
+import pandas as pd
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+import tf_data_pipeline
+from data_preprocessing import TRAIN_DIR, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE
+
+
+def time_epoch(iterable, num_batches):
+    started = time.perf_counter()
+    images = 0
+    for batch_idx, (x, _) in enumerate(iterable):
+        images += int(x.shape[0])
+        if batch_idx + 1 >= num_batches:
+            break
+    elapsed = time.perf_counter() - started
+    return {"images": images, "seconds": round(elapsed, 2), "images_per_sec": round(images / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=4096, help='size of the random training subset')
+    args = parser.parse_args()
+
+    paths, labels, class_indices = tf_data_pipeline.list_image_files(TRAIN_DIR)
+    subset = random.Random(0).sample(range(len(paths)), min(args.images, len(paths)))
+    paths = [paths[i] for i in subset]
+    labels = [labels[i] for i in subset]
+    num_batches = -(-len(paths) // BATCH_SIZE)
+    idx_to_class = {v: k for k, v in class_indices.items()}
+
+    generator = ImageDataGenerator(
+        rescale=1./255, rotation_range=20, width_shift_range=0.2, height_shift_range=0.2,
+        shear_range=0.2, zoom_range=0.2, horizontal_flip=True, fill_mode='nearest',
+    ).flow_from_dataframe(
+        pd.DataFrame({'filename': paths, 'class': [idx_to_class[l] for l in labels]}),
+        target_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE, class_mode='categorical',
+        classes=sorted(class_indices, key=class_indices.get),
+    )
+
+    tf_data_pipeline.CACHE_DIR = os.path.join(tf_data_pipeline.CACHE_DIR, 'bench')
+    shutil.rmtree(tf_data_pipeline.CACHE_DIR, ignore_errors=True)
+    dataset = tf_data_pipeline.build_dataset(paths, labels, len(class_indices), 'bench', training=True)
+
+    results = {
+        "subset_images": len(paths),
+        "generators": time_epoch(generator, num_batches),
+        "tf_data_first_epoch": time_epoch(dataset, num_batches),
+        "tf_data_cached_epoch": time_epoch(dataset, num_batches),
+    }
+    for name in ("generators", "tf_data_first_epoch", "tf_data_cached_epoch"):
+        print(f"{name:<22}{results[name]['images_per_sec']:>10.1f} images/sec")
+    print(json.dumps(results))
+    shutil.rmtree(tf_data_pipeline.CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
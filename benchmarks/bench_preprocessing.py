@@ -0,0 +1,83 @@
+"""
+Microbenchmark: current /predict preprocessing vs backend/preprocessing.load_image
+on large phone-sized JPEG and PNG uploads.
+
+Run from the repository root:
+    python benchmarks/bench_preprocessing.py
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from preprocessing import load_image, TARGET_SIZE
+
+# (width, height) of a 12 MP phone photo and a smaller 3 MP one.
+SIZES = [(4000, 3000), (2048, 1536)]
+REPEATS = 10
+
+
+def synthetic_photo(size, fmt, seed=0):
+    """
+    Builds a leaf-like test image (smooth green gradient plus texture noise) so
+    the encoders produce realistically sized files.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        60 + 40 * np.sin(x / 150.0),
+        140 + 60 * np.cos(y / 200.0),
+        50 + 30 * np.sin((x + y) / 300.0),
+    ], axis=-1)
+    noise = rng.normal(0, 12, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    buf = io.BytesIO()
+    options = {'quality': 92} if fmt == 'JPEG' else {}
+    Image.fromarray(pixels).save(buf, format=fmt, **options)
+    return buf.getvalue()
+
+
+def legacy_preprocess(data):
+    """
+    The original predict() path: full decode, resize, img_to_array, /255.0.
+    (keras img_to_array is np.asarray(img, dtype='float32'), inlined here so
+    the benchmark does not need TensorFlow.)
+    """
+    img = Image.open(io.BytesIO(data)).convert('RGB')
+    img = img.resize(TARGET_SIZE)
+    img_array = np.asarray(img, dtype='float32')
+    img_array = np.expand_dims(img_array, axis=0)
+    return img_array / 255.0
+
+
+def time_call(fn, data, repeats=REPEATS):
+    fn(data)  # warm up file-format plugins
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - started)
+    return np.median(timings) * 1000.0
+
+
+def main():
+    print(f"{'image':<18}{'bytes':>10}{'legacy ms':>12}{'fast ms':>10}{'speedup':>10}{'max abs diff':>15}")
+    out = np.empty((TARGET_SIZE[1], TARGET_SIZE[0], 3), dtype=np.float32)
+    for size in SIZES:
+        for fmt in ('JPEG', 'PNG'):
+            data = synthetic_photo(size, fmt)
+            legacy_ms = time_call(legacy_preprocess, data)
+            fast_ms = time_call(lambda d: load_image(d, out=out), data)
+            diff = float(np.max(np.abs(legacy_preprocess(data)[0] - load_image(data))))
+            label = f"{fmt} {size[0]}x{size[1]}"
+            print(f"{label:<18}{len(data):>10}{legacy_ms:>12.1f}{fast_ms:>10.1f}{legacy_ms / fast_ms:>9.1f}x{diff:>15.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Serving microbenchmarks: each step of /predict measured in isolation, in-process.
+
+    preprocess/*       decode + resize + normalise (preprocessing.load_image)
+    forward/batch_N    backend.predict on N preprocessed images
+    postprocess/*      calibration + top-k (postprocessing.Postprocessor)
+    recommendations/*  knowledge base lookup: pre-encoded bytes vs dict
+    serialize/*        response body: spliced bytes, gzip members, plain json.dumps
+
+Reports p50/p95/p99 latency, throughput and peak RSS, and writes the results
+to benchmarks/results/ for compare.py. Without model weights (or with
+--backend stub) the forward pass uses the stub backend from inference.py.
+
+Run from the repository root:
+    python benchmarks/bench_serving.py
+    python benchmarks/bench_serving.py --backend tflite --repeats 200 --output before.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from bench_common import (
+    BACKEND_DIR, latency_summary, time_calls, peak_rss_mb, run_metadata, save_results,
+)
+from bench_preprocessing import synthetic_photo
+
+sys.path.insert(0, BACKEND_DIR)
+from config import (
+    CLASS_NAMES_PATH, MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_NUM_THREADS, CALIBRATION_PATH,
+    TOP_K, LOW_CONFIDENCE_THRESHOLD, STUB_BATCH_MS, STUB_IMAGE_MS, model_path_for,
+)
+from inference import load_backend
+from postprocessing import Postprocessor, load_temperature
+from preprocessing import load_image, TARGET_SIZE
+from recommendation_index import RecommendationIndex, encode_json, splice_json
+from recommendations import knowledge_base
+
+# (label, (width, height), format): a 12 MP phone photo, a typical resized
+# upload and a PNG screenshot.
+IMAGES = [
+    ("jpeg_4000x3000", (4000, 3000), 'JPEG'),
+    ("jpeg_1600x1200", (1600, 1200), 'JPEG'),
+    ("png_1024x768", (1024, 768), 'PNG'),
+]
+FORWARD_BATCH_SIZES = (1, 8, 32)
+GZIP_LEVEL = 6
+
+
+def resolve_backend_name(name):
+    if name != 'auto':
+        return name
+    return 'tf_function' if os.path.exists(MODEL_PATH) else 'stub'
+
+
+def bench_preprocess(args):
+    results = {}
+    for label, size, fmt in IMAGES:
+        data = synthetic_photo(size, fmt)
+        out = np.empty((TARGET_SIZE[1], TARGET_SIZE[0], 3), dtype=np.float32)
+        timings = time_calls(lambda: load_image(data, out=out), args.repeats, min_seconds=args.min_seconds)
+        results[f"preprocess/{label}"] = dict(latency_summary(timings), bytes=len(data))
+    return results
+
+
+def bench_forward(args, backend):
+    results = {}
+    rng = np.random.default_rng(0)
+    for size in FORWARD_BATCH_SIZES:
+        batch = rng.random((size,) + tuple(backend.input_shape), dtype=np.float32)
+        timings = time_calls(lambda: backend.predict(batch), max(5, args.repeats // size),
+                             min_seconds=args.min_seconds)
+        results[f"forward/batch_{size}"] = dict(latency_summary(timings, items_per_call=size), batch_size=size)
+    return results
+
+
+def bench_postprocess(args, labels):
+    results = {}
+    postprocessor = Postprocessor(labels, temperature=load_temperature(CALIBRATION_PATH),
+                                  top_k=TOP_K, threshold=LOW_CONFIDENCE_THRESHOLD)
+    rng = np.random.default_rng(0)
+    for size in (1, 32):
+        logits = rng.normal(size=(size, len(labels)))
+        probabilities = (np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)).astype(np.float32)
+        timings = time_calls(lambda: postprocessor.results(probabilities), args.repeats,
+                             min_seconds=args.min_seconds)
+        results[f"postprocess/batch_{size}"] = latency_summary(timings, items_per_call=size)
+    return results
+
+
+def bench_recommendations(args, labels, index):
+    indices = itertools.cycle(range(len(labels)))
+    names = itertools.cycle(labels)
+    timings = time_calls(lambda: index.encoded(next(indices)), args.repeats, min_seconds=args.min_seconds)
+    results = {"recommendations/encoded_index": latency_summary(timings)}
+    timings = time_calls(lambda: knowledge_base.get(next(names)), args.repeats, min_seconds=args.min_seconds)
+    results["recommendations/dict_by_name"] = latency_summary(timings)
+    return results
+
+
+def bench_serialize(args, labels, index):
+    fields = {
+        "disease": labels[0],
+        "class_index": 0,
+        "confidence": "93.10%",
+        "confidence_score": 0.931,
+        "low_confidence": False,
+        "top_k": [{"disease": name, "confidence": 0.3} for name in labels[:TOP_K]],
+        "locale": "en",
+        "mode": "Real prediction",
+    }
+    encoded = index.encoded(0)
+    member = index.encoded(0, GZIP_LEVEL)
+    recommendations = knowledge_base.get(labels[0]) or {}
+
+    timings = time_calls(lambda: splice_json(fields, "recommendations", encoded), args.repeats,
+                         min_seconds=args.min_seconds)
+    results = {"serialize/spliced": dict(latency_summary(timings),
+                                         bytes=len(splice_json(fields, "recommendations", encoded)))}
+    timings = time_calls(lambda: index.gzip_response(fields, "recommendations", member), args.repeats,
+                         min_seconds=args.min_seconds)
+    results["serialize/gzip_members"] = dict(latency_summary(timings),
+                                             bytes=len(index.gzip_response(fields, "recommendations", member)))
+    full = dict(fields, recommendations=recommendations)
+    timings = time_calls(lambda: json.dumps(full).encode('utf-8'), args.repeats, min_seconds=args.min_seconds)
+    results["serialize/json_dumps"] = dict(latency_summary(timings), bytes=len(encode_json(full)))
+    return results
+
+
+def print_results(results):
+    print(f"{'benchmark':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per sec':>12}")
+    for name, result in results.items():
+        print(f"{name:<34}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+              f"{result['throughput_per_sec']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='auto',
+                        help="inference backend for the forward pass; 'auto' uses tf_function when "
+                             "the model file exists, otherwise 'stub'")
+    parser.add_argument('--repeats', type=int, default=100, help='minimum timed calls per benchmark')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='minimum timed duration per benchmark')
+    parser.add_argument('--stub-image-ms', type=float, default=STUB_IMAGE_MS,
+                        help='simulated per-image forward time of the stub backend')
+    parser.add_argument('--only', default=None, help='comma-separated groups, e.g. preprocess,forward')
+    parser.add_argument('--output', default=None, help='result file (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    with open(CLASS_NAMES_PATH, 'r') as f:
+        class_names = json.load(f)
+    labels = class_names if isinstance(class_names, list) else [
+        class_names.get(str(i), "Unknown Disease") for i in range(len(class_names))]
+
+    backend_name = resolve_backend_name(args.backend)
+    backend = load_backend(backend_name, model_path=MODEL_PATH, tflite_model_path=TFLITE_MODEL_PATH,
+                           tflite_num_threads=TFLITE_NUM_THREADS, num_classes=len(labels),
+                           stub_batch_ms=STUB_BATCH_MS, stub_image_ms=args.stub_image_ms)
+    if backend is None:
+        sys.exit(f"Model for backend '{backend_name}' not found at {model_path_for(backend_name)}")
+    index = RecommendationIndex(labels, knowledge_base, gzip_level=GZIP_LEVEL)
+
+    groups = {
+        'preprocess': lambda: bench_preprocess(args),
+        'forward': lambda: bench_forward(args, backend),
+        'postprocess': lambda: bench_postprocess(args, labels),
+        'recommendations': lambda: bench_recommendations(args, labels, index),
+        'serialize': lambda: bench_serialize(args, labels, index),
+    }
+    selected = args.only.split(',') if args.only else list(groups)
+    unknown = set(selected) - set(groups)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    print(f"Backend '{backend.name}', input {backend.input_shape}, {len(labels)} classes")
+    results = {}
+    for group in selected:
+        group_results = groups[group]()
+        for result in group_results.values():
+            result["peak_rss_mb"] = peak_rss_mb()
+        results.update(group_results)
+
+    print_results(results)
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    metadata = run_metadata(backend=backend.name, input_shape=list(backend.input_shape),
+                            pillow=Image.__version__, args=vars(args))
+    print(f"Results saved to {save_results('serving', results, metadata, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
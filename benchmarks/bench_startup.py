@@ -0,0 +1,89 @@
+"""
+Cold-start timings: how long until the server answers /healthz, until /readyz
+reports the model loaded, and until the first /predict succeeds, with
+background loading on (default) and off (BACKGROUND_LOADING=0, the old
+load-during-import behaviour).
+
+Run from the repository root:
+    python benchmarks/bench_startup.py
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from PIL import Image
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+BOUNDARY = 'kisanmitrastartup'
+
+
+def predict_request(port):
+    buf = io.BytesIO()
+    Image.new('RGB', (640, 480), (60, 140, 50)).save(buf, format='JPEG')
+    body = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="leaf.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + buf.getvalue() + f'\r\n--{BOUNDARY}--\r\n'.encode()
+    return urllib.request.Request(f'http://127.0.0.1:{port}/predict', data=body,
+                                  headers={'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'})
+
+
+def poll(make_request, started, timeout):
+    """
+    Retries until the request returns 200; returns seconds since `started`.
+    """
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(make_request(), timeout=2) as response:
+                if response.status == 200:
+                    return round(time.perf_counter() - started, 3), json.loads(response.read() or b'null')
+        except (urllib.error.HTTPError, OSError, ValueError):
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("Timed out waiting for the server")
+
+
+def measure(background, args):
+    env = dict(os.environ, BACKGROUND_LOADING='1' if background else '0', PORT=str(args.port))
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{args.port}'
+    try:
+        healthz_s, _ = poll(lambda: f'{url}/healthz', started, args.timeout)
+        readyz_s, ready = poll(lambda: f'{url}/readyz', started, args.timeout)
+        first_prediction_s, _ = poll(lambda: predict_request(args.port), started, args.timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "background_loading": background,
+        "first_healthz_s": healthz_s,
+        "ready_s": readyz_s,
+        "first_prediction_s": first_prediction_s,
+        "server_reported": ready["startup"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=5097)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    args = parser.parse_args()
+
+    for background in (False, True):
+        result = measure(background, args)
+        print(f"background_loading={str(background):<5}  /healthz {result['first_healthz_s']:>6.2f}s  "
+              f"/readyz {result['ready_s']:>6.2f}s  first prediction {result['first_prediction_s']:>6.2f}s  "
+              f"(app import {result['server_reported']['import_seconds']}s)")
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Per-worker memory and startup time: every gunicorn worker loading its own
+model (INFERENCE_BACKEND=tf_function) vs one shared inference server
+(INFERENCE_BACKEND=remote).
+
+Reports RSS and PSS (proportional set size, which splits shared pages between
+the processes mapping them) for the master, each worker and the inference
+server, plus the time until the server first answers a request.
+
+Run from the repository root (Linux only, reads /proc):
+    python benchmarks/bench_worker_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+MODES = {
+    'per-worker': {'INFERENCE_BACKEND': 'tf_function'},
+    'shared-server': {'INFERENCE_BACKEND': 'remote', 'INFERENCE_SERVER_BACKEND': 'tf_function'},
+}
+
+
+def memory_kb(pid):
+    """
+    (rss_kb, pss_kb) for a process, from /proc/<pid>/smaps_rollup.
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def command_line(pid):
+    with open(f'/proc/{pid}/cmdline', 'rb') as f:
+        return f.read().replace(b'\0', b' ').decode(errors='replace')
+
+
+def measure(mode, args):
+    env = dict(os.environ, **MODES[mode])
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}', 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{args.port}/', timeout=1)
+                break
+            except OSError:
+                if time.perf_counter() - started > args.timeout:
+                    raise RuntimeError(f"{mode}: server did not start within {args.timeout}s")
+                time.sleep(0.2)
+        first_response = time.perf_counter() - started
+        time.sleep(args.settle)
+
+        processes = []
+        for pid in children(master.pid):
+            role = 'inference-server' if 'inference_server.py' in command_line(pid) else 'worker'
+            rss, pss = memory_kb(pid)
+            processes.append({'pid': pid, 'role': role, 'rss_mb': round(rss / 1024, 1), 'pss_mb': round(pss / 1024, 1)})
+        rss, pss = memory_kb(master.pid)
+        processes.append({'pid': master.pid, 'role': 'master', 'rss_mb': round(rss / 1024, 1), 'pss_mb': round(pss / 1024, 1)})
+    finally:
+        master.terminate()
+        master.wait()
+
+    workers = [p for p in processes if p['role'] == 'worker']
+    return {
+        'mode': mode,
+        'workers': len(workers),
+        'first_response_s': round(first_response, 2),
+        'worker_rss_mb_avg': round(sum(p['rss_mb'] for p in workers) / max(1, len(workers)), 1),
+        'total_pss_mb': round(sum(p['pss_mb'] for p in processes), 1),
+        'processes': processes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--settle', type=float, default=10.0, help='seconds to wait for all workers to finish loading')
+    args = parser.parse_args()
+
+    for mode in MODES:
+        result = measure(mode, args)
+        print(f"{mode:<14} first response {result['first_response_s']:>6.2f}s  "
+              f"worker RSS avg {result['worker_rss_mb_avg']:>8.1f} MB  total PSS {result['total_pss_mb']:>8.1f} MB")
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
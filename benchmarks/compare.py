@@ -0,0 +1,92 @@
+"""
+Diffs two benchmark result files (from bench_serving.py or load_test.py):
+per benchmark, the change in p50/p95/p99 latency, throughput and peak RSS,
+flagging changes worse than --threshold percent.
+
+Run from the repository root:
+    python benchmarks/compare.py before.json after.json
+    python benchmarks/compare.py before.json after.json --threshold 5 --fail-on-regression
+Exits with status 1 on a regression when --fail-on-regression is given.
+"""
+import argparse
+import sys
+
+from bench_common import load_results
+
+# (metric, True if higher is better)
+METRICS = [
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("throughput_per_sec", True),
+    ("peak_rss_mb", False),
+    ("server_peak_rss_mb", False),
+]
+# Metadata that must match for the numbers to be comparable.
+COMPARABLE_KEYS = ("machine", "cpu_count", "backend", "server", "workers", "server_env")
+
+
+def percent_change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100.0
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Returns (rows, regressions): one row per benchmark and metric present in
+    both files, as (benchmark, metric, before, after, change %, flag).
+    """
+    rows, regressions = [], []
+    for name in sorted(set(baseline["results"]) & set(candidate["results"])):
+        before, after = baseline["results"][name], candidate["results"][name]
+        for metric, higher_is_better in METRICS:
+            if before.get(metric) is None or after.get(metric) is None:
+                continue
+            change = percent_change(before[metric], after[metric])
+            flag = ""
+            if change is not None:
+                worse = -change if higher_is_better else change
+                if worse > threshold:
+                    flag = "REGRESSION"
+                    regressions.append((name, metric, change))
+                elif worse < -threshold:
+                    flag = "improved"
+            rows.append((name, metric, before[metric], after[metric], change, flag))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change treated as significant')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+    if baseline.get("suite") != candidate.get("suite"):
+        print(f"Warning: comparing different suites: {baseline.get('suite')} vs {candidate.get('suite')}")
+    for key in COMPARABLE_KEYS:
+        before, after = baseline["metadata"].get(key), candidate["metadata"].get(key)
+        if before != after:
+            print(f"Warning: {key} differs: {before} vs {after}")
+    print(f"baseline  {baseline['metadata'].get('git_commit')}  {baseline['metadata'].get('timestamp')}")
+    print(f"candidate {candidate['metadata'].get('git_commit')}  {candidate['metadata'].get('timestamp')}")
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"\n{'benchmark':<34}{'metric':<20}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name, metric, before, after, change, flag in rows:
+        change_text = f"{change:+.1f}%" if change is not None else "n/a"
+        print(f"{name:<34}{metric:<20}{before:>12.3f}{after:>12.3f}{change_text:>10}  {flag}")
+
+    only = sorted(set(baseline["results"]) ^ set(candidate["results"]))
+    if only:
+        print(f"\nIn only one of the files: {', '.join(only)}")
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:g}%")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
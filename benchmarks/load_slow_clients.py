@@ -0,0 +1,162 @@
+"""
+Load test: /predict throughput for normal clients while other clients upload
+slowly (simulating rural 2G connections), comparing serving modes.
+
+Modes:
+    sync    gunicorn with synchronous workers (the original Procfile)
+    gthread gunicorn with threaded workers (the current Procfile)
+    asgi    uvicorn running backend/asgi.py
+
+Run from the repository root:
+    python benchmarks/load_slow_clients.py --modes sync,gthread,asgi --slow-clients 16
+Without model weights the backend runs in demo mode, which still exercises
+upload handling, decoding and the worker model; pass --env INFERENCE_BACKEND=...
+to measure a real backend.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+SERVER_COMMANDS = {
+    'sync': lambda port, workers: [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                                   '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'gthread': lambda port, workers: [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', '8',
+                                      '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'asgi': lambda port, workers: [sys.executable, '-m', 'uvicorn', '--workers', str(workers),
+                                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', 'asgi:app'],
+}
+
+BOUNDARY = 'kisanmitraloadtest'
+
+
+def make_upload(size=(1600, 1200)):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='JPEG', quality=85)
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="leaf.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + buf.getvalue() + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+async def post(port, body, bytes_per_second=None):
+    """
+    Sends one multipart POST to /predict, optionally trickling the body at
+    `bytes_per_second`, and returns the HTTP status code.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((
+        f'POST /predict HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+        f'Content-Type: multipart/form-data; boundary={BOUNDARY}\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'
+    ).encode())
+    if bytes_per_second is None:
+        writer.write(body)
+    else:
+        step = max(1, bytes_per_second // 10)
+        for start in range(0, len(body), step):
+            writer.write(body[start:start + step])
+            await writer.drain()
+            await asyncio.sleep(0.1)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1]) if response else 0
+
+
+async def run_load(port, body, duration, fast_clients, slow_clients, slow_rate):
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+
+    async def fast_client():
+        nonlocal failures
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await post(port, body)
+            except OSError:
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    async def slow_client():
+        while time.perf_counter() < deadline:
+            try:
+                await asyncio.wait_for(post(port, body, slow_rate), timeout=max(0.1, deadline - time.perf_counter()))
+            except (OSError, asyncio.TimeoutError):
+                pass
+
+    await asyncio.gather(*[slow_client() for _ in range(slow_clients)],
+                         *[fast_client() for _ in range(fast_clients)])
+    return latencies, failures
+
+
+def wait_until_up(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1)
+            return True
+        except OSError:
+            time.sleep(0.25)
+    return False
+
+
+def benchmark_mode(mode, args, body):
+    env = dict(os.environ, **dict(kv.split('=', 1) for kv in args.env))
+    server = subprocess.Popen(SERVER_COMMANDS[mode](args.port, args.workers), cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(args.port):
+            raise RuntimeError(f"{mode} server did not start")
+        latencies, failures = asyncio.run(run_load(
+            args.port, body, args.duration, args.fast_clients, args.slow_clients, args.slow_rate))
+    finally:
+        server.terminate()
+        server.wait()
+
+    result = {"mode": mode, "completed": len(latencies), "failures": failures,
+              "throughput_rps": round(len(latencies) / args.duration, 2)}
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0
+        result.update(p50_ms=round(p50, 1), p95_ms=round(p95, 1), p99_ms=round(p99, 1))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,gthread,asgi')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--fast-clients', type=int, default=4)
+    parser.add_argument('--slow-clients', type=int, default=16)
+    parser.add_argument('--slow-rate', type=int, default=20000, help='bytes/sec per slow client')
+    parser.add_argument('--env', action='append', default=[], help='KEY=VALUE passed to the server')
+    args = parser.parse_args()
+
+    body = make_upload()
+    print(f"Upload size {len(body)} bytes, {args.slow_clients} slow clients at {args.slow_rate} B/s, "
+          f"{args.fast_clients} fast clients, {args.duration:.0f}s per mode")
+    results = [benchmark_mode(mode, args, body) for mode in args.modes.split(',')]
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+End-to-end load test: starts a local instance of the backend, drives /predict
+with a synthetic image corpus at one or more concurrency levels, and reports
+client-side p50/p95/p99 latency, throughput, errors, the server's peak RSS and
+its own per-stage timings (scraped from /metrics).
+
+Without model weights the server runs INFERENCE_BACKEND=stub, so the whole
+request path (upload, decode, batching, postprocessing, recommendations,
+serialisation) is exercised with a simulated forward pass (--stub-image-ms).
+The prediction cache is disabled unless --cache is given, so every request
+pays for the full pipeline.
+
+Run from the repository root:
+    python benchmarks/load_test.py --concurrency 1,4,16 --duration 20
+    python benchmarks/load_test.py --env INFERENCE_BACKEND=tflite --output tflite.json
+Results go to benchmarks/results/ for compare.py.
+"""
+import argparse
+import http.client
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from bench_common import (
+    BACKEND_DIR, latency_summary, process_peak_rss_mb, process_tree, run_metadata, save_results,
+)
+from bench_preprocessing import synthetic_photo
+from load_slow_clients import SERVER_COMMANDS, wait_until_up
+
+sys.path.insert(0, BACKEND_DIR)
+from config import MODEL_PATH
+
+BOUNDARY = 'kisanmitrabench'
+# Upload sizes in the corpus, cycled: small, typical and full-resolution phone photos.
+CORPUS_SIZES = [(640, 480), (1280, 960), (2048, 1536), (4000, 3000)]
+STAGE_METRIC = re.compile(r'^kisan_mitra_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def build_corpus(count):
+    """
+    `count` distinct multipart /predict bodies (different seeds and sizes).
+    """
+    bodies = []
+    for i in range(count):
+        image = synthetic_photo(CORPUS_SIZES[i % len(CORPUS_SIZES)], 'JPEG', seed=i)
+        bodies.append((
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="leaf{i}.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode() + image + f'\r\n--{BOUNDARY}--\r\n'.encode())
+    return bodies
+
+
+def client(port, bodies, offset, warmup_until, deadline, latencies, errors):
+    """
+    One closed-loop client on a keep-alive connection: sends the next corpus
+    image as soon as the previous response arrives.
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}
+    i = offset
+    while True:
+        started = time.perf_counter()
+        if started >= deadline:
+            break
+        try:
+            conn.request('POST', '/predict', body=bodies[i % len(bodies)], headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            status = 0
+        finished = time.perf_counter()
+        if started >= warmup_until:
+            if status == 200:
+                latencies.append(finished - started)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+        i += 1
+    conn.close()
+
+
+def run_level(port, bodies, concurrency, duration, warmup):
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    warmup_until, deadline = started + warmup, started + warmup + duration
+    threads = [threading.Thread(target=client, args=(port, bodies, i * 7, warmup_until, deadline, latencies, errors))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = latency_summary(latencies)
+    # Closed loop: throughput is completed requests over wall time, not per-call.
+    result["throughput_per_sec"] = round(len(latencies) / duration, 2)
+    result["errors"] = {str(status): count for status, count in sorted(errors.items())}
+    result["concurrency"] = concurrency
+    return result
+
+
+def server_stage_means(port):
+    """
+    Mean ms per /predict stage from the server's /metrics (cumulative over the run).
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', '/metrics')
+        text = conn.getresponse().read().decode()
+    except (OSError, http.client.HTTPException):
+        return {}
+    finally:
+        conn.close()
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        match = STAGE_METRIC.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            (sums if kind == 'sum' else counts)[stage] = float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000.0, 3)
+            for stage in sorted(sums) if counts.get(stage)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='gthread', choices=sorted(SERVER_COMMANDS))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated client counts, one run each')
+    parser.add_argument('--duration', type=float, default=15.0, help='measured seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=3.0, help='unmeasured seconds before each level')
+    parser.add_argument('--corpus-size', type=int, default=32)
+    parser.add_argument('--stub-image-ms', type=float, default=20.0,
+                        help='simulated forward time per image when the stub backend is used')
+    parser.add_argument('--cache', action='store_true', help='keep the prediction cache enabled')
+    parser.add_argument('--env', action='append', default=[], help='KEY=VALUE passed to the server')
+    parser.add_argument('--output', default=None, help='result file (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    env = {
+        'INFERENCE_BACKEND': 'tf_function' if os.path.exists(MODEL_PATH) else 'stub',
+        'STUB_IMAGE_MS': str(args.stub_image_ms),
+        'BACKGROUND_LOADING': '0',
+    }
+    if not args.cache:
+        env['PREDICTION_CACHE_MAX_ENTRIES'] = '0'
+    env.update(kv.split('=', 1) for kv in args.env)
+
+    print(f"Building a corpus of {args.corpus_size} images...")
+    bodies = build_corpus(args.corpus_size)
+    print(f"Starting {args.server} server with {args.workers} worker(s), INFERENCE_BACKEND={env['INFERENCE_BACKEND']}")
+    server = subprocess.Popen(SERVER_COMMANDS[args.server](args.port, args.workers), cwd=BACKEND_DIR,
+                              env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = {}
+    try:
+        if not wait_until_up(args.port):
+            sys.exit("Server did not start")
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            result = run_level(args.port, bodies, concurrency, args.duration, args.warmup)
+            results[f"load/predict_c{concurrency}"] = result
+            print(f"c={concurrency:<4} p50 {result.get('p50_ms', 0):8.1f} ms  p95 {result.get('p95_ms', 0):8.1f} ms  "
+                  f"p99 {result.get('p99_ms', 0):8.1f} ms  {result['throughput_per_sec']:7.1f} req/s  "
+                  f"errors {result['errors'] or 0}")
+        stages = server_stage_means(args.port)
+        peaks = [process_peak_rss_mb(pid) for pid in process_tree(server.pid)]
+        peaks = [peak for peak in peaks if peak is not None]
+    finally:
+        server.terminate()
+        server.wait()
+
+    server_memory = {
+        "server_peak_rss_mb": round(sum(peaks), 1) if peaks else None,
+        "server_max_process_peak_rss_mb": max(peaks) if peaks else None,
+    }
+    for result in results.values():
+        result.update(server_memory)
+    print(f"Server peak RSS {server_memory['server_peak_rss_mb']} MB over {len(peaks)} process(es)")
+    if stages:
+        print("Server stage means (ms): " + ", ".join(f"{stage} {ms:.2f}" for stage, ms in stages.items()))
+
+    metadata = run_metadata(server=args.server, workers=args.workers, server_env=env,
+                            corpus_size=args.corpus_size, server_stage_means_ms=stages, args=vars(args))
+    print(f"Results saved to {save_results('load', results, metadata, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
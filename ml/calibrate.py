@@ -0,0 +1,132 @@
+import tensorflow as tf
+import numpy as np
+import argparse
+import json
+import os
+from data_preprocessing import get_data_generators
+
+# --- 1. PATHS ---
+KERAS_MODEL_PATH = 'crop_disease_model_best_weights.h5'
+# Read by backend/postprocessing.py at startup.
+CALIBRATION_OUTPUT_PATH = os.path.join('..', 'backend', 'calibration.json')
+
+# --- 2. CALIBRATION SETTINGS ---
+# Temperatures are searched on a log scale between these bounds.
+MIN_TEMPERATURE = 0.05
+MAX_TEMPERATURE = 20.0
+SEARCH_ITERATIONS = 60
+ECE_BINS = 15
+MIN_PROBABILITY = 1e-12  # same clipping as backend/postprocessing.py
+
+
+def collect_predictions(model, generator):
+    """
+    Softmax outputs and integer labels for every batch of `generator`.
+    """
+    probabilities, labels = [], []
+    for batch_idx in range(len(generator)):
+        images, one_hot = generator[batch_idx]
+        probabilities.append(model.predict_on_batch(images))
+        labels.append(np.argmax(one_hot, axis=1))
+    return np.concatenate(probabilities).astype(np.float64), np.concatenate(labels)
+
+
+def apply_temperature(log_probabilities, temperature):
+    scaled = log_probabilities / temperature
+    scaled -= scaled.max(axis=1, keepdims=True)
+    exp = np.exp(scaled)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def negative_log_likelihood(log_probabilities, labels, temperature):
+    calibrated = apply_temperature(log_probabilities, temperature)
+    return float(-np.mean(np.log(np.clip(calibrated[np.arange(len(labels)), labels], MIN_PROBABILITY, 1.0))))
+
+
+def expected_calibration_error(probabilities, labels, num_bins=ECE_BINS):
+    """
+    Mean |accuracy - confidence| over equal-width confidence bins, weighted by bin size.
+    """
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    bins = np.minimum((confidence * num_bins).astype(int), num_bins - 1)
+    # Per bin, |sum(correct) - sum(confidence)| / N is its weight times its gap.
+    gap = np.bincount(bins, weights=correct, minlength=num_bins) - np.bincount(bins, weights=confidence,
+                                                                               minlength=num_bins)
+    return float(np.abs(gap).sum() / len(labels))
+
+
+def fit_temperature(log_probabilities, labels):
+    """
+    Minimises validation NLL over a single temperature with a golden-section
+    search on log(T); the NLL is unimodal in T, so this finds the optimum.
+    """
+    ratio = (np.sqrt(5) - 1) / 2
+    low, high = np.log(MIN_TEMPERATURE), np.log(MAX_TEMPERATURE)
+    nll = lambda log_t: negative_log_likelihood(log_probabilities, labels, np.exp(log_t))
+    a, b = high - ratio * (high - low), low + ratio * (high - low)
+    nll_a, nll_b = nll(a), nll(b)
+    for _ in range(SEARCH_ITERATIONS):
+        if nll_a < nll_b:
+            high, b, nll_b = b, a, nll_a
+            a = high - ratio * (high - low)
+            nll_a = nll(a)
+        else:
+            low, a, nll_a = a, b, nll_b
+            b = low + ratio * (high - low)
+            nll_b = nll(b)
+    return float(np.exp((low + high) / 2))
+
+
+def threshold_report(probabilities, labels, thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8)):
+    """
+    For each low-confidence threshold: share of images still given a class,
+    and the accuracy on those images.
+    """
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    report = []
+    for threshold in thresholds:
+        accepted = confidence >= threshold
+        report.append({
+            "threshold": threshold,
+            "coverage": round(float(accepted.mean()), 4),
+            "accuracy": round(float(correct[accepted].mean()), 4) if accepted.any() else None,
+        })
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fit the temperature used to calibrate served confidences.")
+    parser.add_argument('--model', default=KERAS_MODEL_PATH)
+    parser.add_argument('--output', default=CALIBRATION_OUTPUT_PATH)
+    args = parser.parse_args()
+
+    print("--- Fitting Temperature Scaling on the Validation Set ---")
+    model = tf.keras.models.load_model(args.model, compile=False)
+    _, validation_generator, _, _ = get_data_generators()
+    probabilities, labels = collect_predictions(model, validation_generator)
+    log_probabilities = np.log(np.clip(probabilities, MIN_PROBABILITY, 1.0))
+
+    temperature = fit_temperature(log_probabilities, labels)
+    calibrated = apply_temperature(log_probabilities, temperature)
+    calibration = {
+        "temperature": round(temperature, 4),
+        "num_samples": int(len(labels)),
+        "nll_before": round(negative_log_likelihood(log_probabilities, labels, 1.0), 4),
+        "nll_after": round(negative_log_likelihood(log_probabilities, labels, temperature), 4),
+        "ece_before": round(expected_calibration_error(probabilities, labels), 4),
+        "ece_after": round(expected_calibration_error(calibrated, labels), 4),
+        "thresholds": threshold_report(calibrated, labels),
+    }
+
+    print(f"Temperature: {calibration['temperature']}")
+    print(f"NLL: {calibration['nll_before']} -> {calibration['nll_after']}")
+    print(f"ECE: {calibration['ece_before']} -> {calibration['ece_after']}")
+    for row in calibration["thresholds"]:
+        print(f"  threshold {row['threshold']:.2f}: coverage {row['coverage']:.2%}, accuracy {row['accuracy']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(calibration, f, indent=4)
+    print(f"Calibration saved to {os.path.abspath(args.output)}")
+    print("--- Calibration Complete ---")
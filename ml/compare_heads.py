@@ -0,0 +1,170 @@
+import tensorflow as tf
+import numpy as np
+from PIL import Image
+import argparse
+import json
+import os
+import tempfile
+import time
+from data_preprocessing import TRAIN_DIR, TEST_DIR, VALID_DIR
+from model_architecture import BACKBONE_ALPHAS, HEAD_TYPES, budget_report
+from tf_data_pipeline import list_image_files
+
+# --- 1. COMPARISON SETTINGS ---
+# Models are loaded LOAD_REPEATS times (median reported) and timed on
+# LATENCY_REPEATS single-image forward passes after LATENCY_WARMUP untimed ones.
+LOAD_REPEATS = 3
+LATENCY_WARMUP = 5
+LATENCY_REPEATS = 50
+EVAL_BATCH_SIZE = 32
+# Class mapping served by the backend; used for the output size of the untrained
+# --configs models when the training split is not available.
+CLASS_NAMES_PATH = os.path.join('..', 'backend', 'class_name.json')
+
+
+# --- 2. CANDIDATES ---
+def parse_config(spec):
+    """
+    'head:alpha:size[:head_units]', e.g. 'flatten:1.0:224' or 'gap:0.75:160:128'.
+    """
+    parts = spec.split(':')
+    if len(parts) not in (3, 4) or parts[0] not in HEAD_TYPES or float(parts[1]) not in BACKBONE_ALPHAS:
+        raise argparse.ArgumentTypeError(f"expected head:alpha:size[:head_units] with head in {HEAD_TYPES} "
+                                         f"and alpha in {BACKBONE_ALPHAS}, got '{spec}'")
+    return {"head": parts[0], "alpha": float(parts[1]), "image_size": int(parts[2]),
+            "head_units": int(parts[3]) if len(parts) == 4 else 0}
+
+
+def count_classes():
+    """
+    Number of classes as model_training.py sees them (one sub-folder per class
+    in the training split), else the number of entries in backend/class_name.json.
+    """
+    if os.path.isdir(TRAIN_DIR):
+        classes = [d for d in os.listdir(TRAIN_DIR) if os.path.isdir(os.path.join(TRAIN_DIR, d))]
+        if classes:
+            return len(classes)
+    with open(CLASS_NAMES_PATH) as f:
+        return len(json.load(f))
+
+
+def save_untrained(config, directory, num_classes):
+    """
+    Builds a fresh (ImageNet backbone, random head) model for `config` and saves it as .h5.
+    """
+    from model_training import build_model
+    model, _ = build_model(num_classes, head=config["head"], head_units=config["head_units"],
+                           alpha=config["alpha"], image_size=config["image_size"])
+    name = f"{config['head']}_a{config['alpha']:g}_{config['image_size']}"
+    if config["head_units"]:
+        name += f"_u{config['head_units']}"
+    path = os.path.join(directory, f"{name}.h5")
+    model.save(path)
+    tf.keras.backend.clear_session()
+    return name, path
+
+
+# --- 3. MEASUREMENTS ---
+def load_eval_images(model_input_size, max_images):
+    """
+    Test images (validation when there is no test split) resized to the
+    model's input size, as (images, labels) batches.
+    """
+    directory = TEST_DIR if os.path.isdir(TEST_DIR) and os.listdir(TEST_DIR) else VALID_DIR
+    paths, labels, _ = list_image_files(directory)
+    if max_images and len(paths) > max_images:
+        chosen = np.random.default_rng(0).choice(len(paths), max_images, replace=False)
+        paths, labels = [paths[i] for i in chosen], [labels[i] for i in chosen]
+    height, width = model_input_size
+    for start in range(0, len(paths), EVAL_BATCH_SIZE):
+        batch = [np.asarray(Image.open(path).convert('RGB').resize((width, height), Image.NEAREST), dtype=np.float32)
+                 for path in paths[start:start + EVAL_BATCH_SIZE]]
+        yield np.stack(batch) / 255.0, np.asarray(labels[start:start + EVAL_BATCH_SIZE])
+
+
+def accuracy(model, max_images):
+    correct = total = 0
+    for images, labels in load_eval_images(model.input_shape[1:3], max_images):
+        predictions = model.predict_on_batch(images)
+        correct += int(np.sum(np.argmax(predictions, axis=1) == labels))
+        total += len(labels)
+    return correct / total if total else None
+
+
+def measure(name, path, evaluate, max_images):
+    load_seconds = []
+    for _ in range(LOAD_REPEATS):
+        tf.keras.backend.clear_session()
+        started = time.perf_counter()
+        model = tf.keras.models.load_model(path, compile=False)
+        load_seconds.append(time.perf_counter() - started)
+
+    forward = tf.function(lambda x: model(x, training=False))
+    image = np.random.default_rng(0).random((1,) + tuple(model.input_shape[1:]), dtype=np.float32)
+    for _ in range(LATENCY_WARMUP):
+        forward(image).numpy()
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        started = time.perf_counter()
+        forward(image).numpy()
+        timings.append(time.perf_counter() - started)
+    p50, p95 = np.percentile(timings, [50, 95]) * 1000.0
+
+    report = budget_report(model)
+    return {
+        "name": name,
+        "input_size": list(model.input_shape[1:]),
+        "accuracy": accuracy(model, max_images) if evaluate else None,
+        "h5_mb": round(os.path.getsize(path) / 1e6, 2),
+        "load_s": round(float(np.median(load_seconds)), 3),
+        "latency_p50_ms": round(float(p50), 2),
+        "latency_p95_ms": round(float(p95), 2),
+        "total_params": report["total_params"],
+        "head_params": report["head_params"],
+        "mflops": round(report["backbone_mflops"] + report["head_mflops"], 1),
+    }
+
+
+def print_table(results):
+    print(f"\n{'model':<28}{'input':>8}{'accuracy':>10}{'h5 MB':>9}{'load s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'params':>13}{'head params':>13}{'MFLOPs':>9}")
+    for r in results:
+        acc = f"{r['accuracy']:.4f}" if r['accuracy'] is not None else "n/a"
+        print(f"{r['name']:<28}{r['input_size'][0]:>8}{acc:>10}{r['h5_mb']:>9.1f}{r['load_s']:>9.2f}"
+              f"{r['latency_p50_ms']:>9.2f}{r['latency_p95_ms']:>9.2f}{r['total_params']:>13,}"
+              f"{r['head_params']:>13,}{r['mflops']:>9.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Compare head/backbone configurations: accuracy, .h5 size, load time, "
+                    "single-image latency, parameters and FLOPs.",
+        epilog="Trained models: --models a.h5 b.h5 (accuracy on the test split, or valid without one). "
+               "Untrained architectures: --configs flatten:1.0:224 gap:1.0:224 gap:0.75:160 "
+               "(everything but accuracy).")
+    parser.add_argument('--models', nargs='*', default=[], help="trained .h5 models to compare")
+    parser.add_argument('--configs', nargs='*', type=parse_config, default=[],
+                        help="head:alpha:size[:head_units] architectures to build and compare untrained")
+    parser.add_argument('--max-eval-images', type=int, default=2000,
+                        help="evaluate accuracy on a fixed random subset of this many images (0: all)")
+    parser.add_argument('--output', default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+    if not args.models and not args.configs:
+        parser.error("give --models and/or --configs")
+
+    results = []
+    for path in args.models:
+        print(f"\n--- Measuring {path} ---")
+        results.append(measure(os.path.basename(path), path, evaluate=True, max_images=args.max_eval_images))
+    num_classes = count_classes() if args.configs else None
+    with tempfile.TemporaryDirectory() as directory:
+        for config in args.configs:
+            print(f"\n--- Building {config} ({num_classes} classes) ---")
+            name, path = save_untrained(config, directory, num_classes)
+            results.append(measure(name, path, evaluate=False, max_images=0))
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults saved to {os.path.abspath(args.output)}")
@@ -15,12 +15,16 @@ VALID_DIR = os.path.join(DATASET_ROOT_DIR, 'valid')
 TEST_DIR = os.path.join(DATASET_ROOT_DIR, 'test')
 
 # --- 3. DEFINE MODEL PARAMETERS ---
-IMG_HEIGHT = 224
-IMG_WIDTH = 224
+# Input resolution of the model and every input pipeline. MobileNetV2 has
+# ImageNet weights for 96, 128, 160, 192 and 224; set IMG_SIZE=160 (say) to
+# train a smaller, faster model.
+IMG_SIZE = int(os.environ.get("IMG_SIZE", 224))
+IMG_HEIGHT = IMG_SIZE
+IMG_WIDTH = IMG_SIZE
 BATCH_SIZE = 32
 
 # --- 4. DEFINE A FUNCTION TO CREATE DATA GENERATORS ---
-def get_data_generators():
+def get_data_generators(batch_size=BATCH_SIZE):
     """
     Creates and returns data generators for training, validation, and testing.
     """
@@ -41,7 +45,7 @@ def get_data_generators():
     train_generator = train_datagen.flow_from_directory(
         TRAIN_DIR,
         target_size=(IMG_HEIGHT, IMG_WIDTH),
-        batch_size=BATCH_SIZE,
+        batch_size=batch_size,
         class_mode='categorical'
     )
 
@@ -49,7 +53,7 @@ def get_data_generators():
     validation_generator = validation_datagen.flow_from_directory(
         VALID_DIR,
         target_size=(IMG_HEIGHT, IMG_WIDTH),
-        batch_size=BATCH_SIZE,
+        batch_size=batch_size,
         class_mode='categorical'
     )
 
@@ -59,7 +63,7 @@ def get_data_generators():
         test_generator = test_datagen.flow_from_directory(
             TEST_DIR,
             target_size=(IMG_HEIGHT, IMG_WIDTH),
-            batch_size=BATCH_SIZE,
+            batch_size=batch_size,
             class_mode='categorical',
             shuffle=False
         )
@@ -0,0 +1,221 @@
+import tensorflow as tf
+import numpy as np
+from PIL import Image
+from multiprocessing import Pool
+import argparse
+import hashlib
+import json
+import os
+import random
+from data_preprocessing import DATASET_ROOT_DIR, TRAIN_DIR, VALID_DIR, TEST_DIR, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE
+from tf_data_pipeline import list_image_files, normalize, augment_batch, SHUFFLE_BUFFER
+
+# --- 1. SHARD SETTINGS ---
+# Packed shards live next to the image folders. Each shard is a pair of .npy
+# files (uint8 images already resized to IMG_HEIGHT x IMG_WIDTH, and labels)
+# that can be memory-mapped, so training and evaluation never open individual JPEGs.
+SHARD_DIR = os.path.join(os.path.dirname(DATASET_ROOT_DIR), 'shards')
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 1
+SHARD_SIZE = 2048  # images per shard (~300 MB at 224x224)
+
+SPLITS = {'train': TRAIN_DIR, 'valid': VALID_DIR, 'test': TEST_DIR}
+
+
+# --- 2. PACKING ---
+def load_resized(path):
+    """
+    Decodes and resizes one image the way flow_from_directory does (nearest neighbour).
+    """
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB').resize((IMG_WIDTH, IMG_HEIGHT), Image.NEAREST), dtype=np.uint8)
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pack_split(split, paths, labels, output_dir, pool, shard_size=SHARD_SIZE):
+    """
+    Writes one split as numbered shards and returns its manifest entry.
+    """
+    shards = []
+    for shard_idx, start in enumerate(range(0, len(paths), shard_size)):
+        shard_paths = paths[start:start + shard_size]
+        base = f"{split}-{shard_idx:05d}"
+        images_file, labels_file = f"{base}.images.npy", f"{base}.labels.npy"
+
+        images = np.lib.format.open_memmap(os.path.join(output_dir, images_file), mode='w+', dtype=np.uint8,
+                                           shape=(len(shard_paths), IMG_HEIGHT, IMG_WIDTH, 3))
+        for i, pixels in enumerate(pool.imap(load_resized, shard_paths, chunksize=32)):
+            images[i] = pixels
+        images.flush()
+        del images
+        np.save(os.path.join(output_dir, labels_file), np.asarray(labels[start:start + shard_size], dtype=np.int16))
+
+        shards.append({
+            "images": images_file,
+            "labels": labels_file,
+            "num_images": len(shard_paths),
+            "sha256": {
+                images_file: sha256_file(os.path.join(output_dir, images_file)),
+                labels_file: sha256_file(os.path.join(output_dir, labels_file)),
+            },
+        })
+        print(f"  {split}: shard {shard_idx} written ({start + len(shard_paths)}/{len(paths)} images)")
+    return {"num_images": len(paths), "shards": shards}
+
+
+def pack_dataset(output_dir=SHARD_DIR, shard_size=SHARD_SIZE, workers=None):
+    """
+    One-shot conversion of the train/valid/test folders into shards plus a
+    manifest holding the class index mapping and per-shard checksums.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "image_size": [IMG_HEIGHT, IMG_WIDTH],
+        "class_indices": None,
+        "splits": {},
+    }
+    class_indices = None
+    with Pool(workers) as pool:
+        for split, directory in SPLITS.items():
+            if not os.path.isdir(directory):
+                print(f"Skipping {split}: {os.path.abspath(directory)} not found.")
+                continue
+            paths, labels, found_indices = list_image_files(directory, class_indices)
+            if not paths:
+                print(f"Skipping {split}: no images in class sub-folders.")
+                continue
+            if class_indices is None:
+                class_indices = found_indices
+            if split == 'train':
+                # Store training images in random order so sequential reads are already shuffled.
+                order = random.Random(42).sample(range(len(paths)), len(paths))
+                paths = [paths[i] for i in order]
+                labels = [labels[i] for i in order]
+            print(f"Packing {len(paths)} {split} images from {os.path.abspath(directory)}")
+            manifest["splits"][split] = pack_split(split, paths, labels, output_dir, pool, shard_size)
+
+    manifest["class_indices"] = class_indices
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Manifest saved to {os.path.abspath(os.path.join(output_dir, MANIFEST_NAME))}")
+    return manifest
+
+
+# --- 3. READING ---
+def load_manifest(shard_dir=SHARD_DIR):
+    with open(os.path.join(shard_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard format version {manifest.get('format_version')}")
+    if tuple(manifest["image_size"]) != (IMG_HEIGHT, IMG_WIDTH):
+        raise ValueError(f"Shards were packed at {manifest['image_size']}, expected {[IMG_HEIGHT, IMG_WIDTH]}")
+    return manifest
+
+
+def verify_shards(shard_dir=SHARD_DIR):
+    """
+    Recomputes every shard checksum; returns the list of files that do not match.
+    """
+    manifest = load_manifest(shard_dir)
+    bad = []
+    for split in manifest["splits"].values():
+        for shard in split["shards"]:
+            for file_name, expected in shard["sha256"].items():
+                if sha256_file(os.path.join(shard_dir, file_name)) != expected:
+                    bad.append(file_name)
+    return bad
+
+
+def open_split(split, shard_dir=SHARD_DIR, manifest=None):
+    """
+    Memory-maps every shard of `split`; returns a list of (images, labels) arrays.
+    """
+    manifest = manifest or load_manifest(shard_dir)
+    return [
+        (np.load(os.path.join(shard_dir, shard["images"]), mmap_mode='r'),
+         np.load(os.path.join(shard_dir, shard["labels"])))
+        for shard in manifest["splits"][split]["shards"]
+    ]
+
+
+def build_shard_dataset(shards, num_classes, training, batch_size=BATCH_SIZE):
+    """
+    tf.data pipeline over memory-mapped shards. Evaluation reads them strictly
+    sequentially; training visits shards and the images inside each shard in a
+    new random order every epoch, then applies the usual augmentation.
+    """
+    num_images = sum(len(labels) for _, labels in shards)
+
+    def generate():
+        order = list(range(len(shards)))
+        if training:
+            random.shuffle(order)
+        for shard_idx in order:
+            images, labels = shards[shard_idx]
+            indices = np.random.permutation(len(labels)) if training else range(len(labels))
+            for i in indices:
+                yield images[i], labels[i]
+
+    ds = tf.data.Dataset.from_generator(generate, output_signature=(
+        tf.TensorSpec((IMG_HEIGHT, IMG_WIDTH, 3), tf.uint8),
+        tf.TensorSpec((), tf.int16),
+    ))
+    ds = ds.apply(tf.data.experimental.assert_cardinality(num_images))
+    ds = ds.map(lambda img, label: (img, tf.one_hot(tf.cast(label, tf.int32), num_classes)))
+    if training:
+        ds = ds.shuffle(SHUFFLE_BUFFER)
+    ds = ds.batch(batch_size)
+    ds = ds.map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+    if training:
+        ds = ds.map(augment_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def get_shard_datasets(shard_dir=SHARD_DIR, batch_size=BATCH_SIZE):
+    """
+    Shard counterpart of data_preprocessing.get_data_generators(): returns
+    (train_ds, validation_ds, test_ds or None, class_indices).
+    """
+    manifest = load_manifest(shard_dir)
+    class_indices = manifest["class_indices"]
+    num_classes = len(class_indices)
+    print(f"Reading packed shards from: {os.path.abspath(shard_dir)}")
+
+    datasets = {}
+    for split in ('train', 'valid', 'test'):
+        if split in manifest["splits"]:
+            shards = open_split(split, shard_dir, manifest)
+            datasets[split] = build_shard_dataset(shards, num_classes, training=(split == 'train'), batch_size=batch_size)
+            print(f"  {split}: {manifest['splits'][split]['num_images']} images in {len(shards)} shards")
+    return datasets['train'], datasets['valid'], datasets.get('test'), class_indices
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pack the image folders into memory-mappable shards.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help='convert train/valid/test folders into shards')
+    pack_parser.add_argument('--output', default=SHARD_DIR)
+    pack_parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    pack_parser.add_argument('--workers', type=int, default=None, help='decode processes (default: all cores)')
+    verify_parser = subparsers.add_parser('verify', help='check shard checksums against the manifest')
+    verify_parser.add_argument('--shards', default=SHARD_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        print("--- Packing Dataset Shards ---")
+        pack_dataset(args.output, args.shard_size, args.workers)
+        print("--- Packing Complete ---")
+    else:
+        bad_files = verify_shards(args.shards)
+        if bad_files:
+            print(f"{len(bad_files)} shard files failed checksum verification: {bad_files}")
+            raise SystemExit(1)
+        print("All shard checksums match the manifest.")
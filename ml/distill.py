@@ -0,0 +1,245 @@
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Input, Dense, Activation, Rescaling
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
+from data_preprocessing import IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE
+from model_architecture import (DEFAULT_HEAD, BACKBONE_ALPHAS, BACKBONE_IMAGE_SIZES, budget_report, print_budget_report,
+                                architecture_metadata, save_metadata, load_metadata)
+import argparse
+import json
+import os
+
+# --- 1. PATHS ---
+# The fine-tuned model from model_training.py is the teacher. The student is
+# written with its architecture metadata next to it; serve it with
+#   MODEL_PATH=../ml/crop_disease_student.h5 (backend/config.py)
+# or export it to TFLite with --tflite.
+TEACHER_MODEL_PATH = 'crop_disease_model_best_weights.h5'
+STUDENT_MODEL_PATH = 'crop_disease_student.h5'
+STUDENT_TFLITE_PATH = 'crop_disease_student_float16.tflite'
+STUDENT_WEIGHTS_PATH = 'crop_disease_student_best.weights.h5'
+REPORT_PATH = 'distillation_report.json'
+
+# --- 2. DISTILLATION SETTINGS ---
+# 'mobilenet_v3_small': MobileNetV3-Small (alpha 0.75 or 1.0), ~1M parameters.
+# 'mobilenet_v2':       a thinner and/or lower-resolution MobileNetV2.
+STUDENT_BACKBONES = ('mobilenet_v3_small', 'mobilenet_v2')
+# Softmax temperature for the soft targets, and the weight of the ordinary
+# cross-entropy on the true labels (the rest goes to matching the teacher).
+TEMPERATURE = 4.0
+HARD_LABEL_WEIGHT = 0.1
+EPOCHS = 15
+LEARNING_RATE = 0.0005
+# Teacher probabilities are clipped to this before taking logs (see backend/postprocessing.py).
+MIN_PROBABILITY = 1e-7
+
+
+# --- 3. STUDENT MODEL ---
+def build_student_backbone(name, alpha, image_size):
+    """
+    ImageNet-pretrained backbone taking [0, 1] images, like the teacher's inputs.
+    """
+    input_shape = (image_size, image_size, 3)
+    if name == 'mobilenet_v2':
+        return tf.keras.applications.MobileNetV2(input_shape=input_shape, alpha=alpha, include_top=False,
+                                                 weights='imagenet')
+    if name == 'mobilenet_v3_small':
+        # MobileNetV3 expects [-1, 1] once its own preprocessing is turned off.
+        return Sequential([
+            Input(shape=input_shape),
+            Rescaling(2.0, offset=-1.0),
+            tf.keras.applications.MobileNetV3Small(input_shape=input_shape, alpha=alpha, include_top=False,
+                                                   weights='imagenet', include_preprocessing=False),
+        ], name='mobilenet_v3_small_backbone')
+    raise ValueError(f"Unknown student backbone '{name}'. Choose from {STUDENT_BACKBONES}")
+
+
+def build_student(num_classes, backbone_name, alpha, image_size, head_units=0):
+    """
+    Returns (logits model used for training, softmax model that is saved and
+    served). Both share the same layers; the student is trained end to end.
+    """
+    from model_training import build_head_layers
+    backbone = build_student_backbone(backbone_name, alpha, image_size)
+    # The pooled head without its softmax: distillation needs the logits.
+    head = build_head_layers(num_classes, DEFAULT_HEAD, head_units)[:-1]
+    logits_model = Sequential([backbone] + head + [Dense(num_classes, dtype='float32', name='logits')])
+    serving_model = Sequential(logits_model.layers + [Activation('softmax', dtype='float32')])
+    return logits_model, serving_model
+
+
+# --- 4. DISTILLATION ---
+class Distiller(tf.keras.Model):
+    """
+    Trains `student` (logits) to match the temperature-softened predictions of
+    a frozen `teacher`, plus a small weight on the true labels:
+
+        loss = w * CE(labels, student) + (1 - w) * T^2 * KL(teacher_T || student_T)
+
+    The teacher outputs probabilities, so its log-probabilities stand in for
+    logits. Batches arrive at the teacher's resolution and are resized on the
+    fly for the student.
+    """
+
+    def __init__(self, student, teacher, student_size, temperature=TEMPERATURE, hard_label_weight=HARD_LABEL_WEIGHT):
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.student_size = student_size
+        self.temperature = temperature
+        self.hard_label_weight = hard_label_weight
+        self.loss_tracker = tf.keras.metrics.Mean(name='loss')
+        self.accuracy_tracker = tf.keras.metrics.CategoricalAccuracy(name='accuracy')
+
+    @property
+    def metrics(self):
+        return [self.loss_tracker, self.accuracy_tracker]
+
+    def call(self, images, training=False):
+        return self.student(tf.image.resize(images, self.student_size), training=training)
+
+    def _loss(self, images, labels, training):
+        t = self.temperature
+        teacher_probabilities = self.teacher(images, training=False)
+        soft_targets = tf.nn.softmax(tf.math.log(tf.clip_by_value(teacher_probabilities, MIN_PROBABILITY, 1.0)) / t)
+        logits = self(images, training=training)
+        soft_loss = tf.reduce_mean(tf.keras.losses.kl_divergence(soft_targets, tf.nn.softmax(logits / t))) * t * t
+        hard_loss = tf.reduce_mean(tf.keras.losses.categorical_crossentropy(labels, logits, from_logits=True))
+        return self.hard_label_weight * hard_loss + (1.0 - self.hard_label_weight) * soft_loss, logits
+
+    def _update_metrics(self, loss, labels, logits):
+        self.loss_tracker.update_state(loss)
+        self.accuracy_tracker.update_state(labels, logits)
+        return {metric.name: metric.result() for metric in self.metrics}
+
+    def train_step(self, data):
+        images, labels = data[0], data[1]
+        with tf.GradientTape() as tape:
+            loss, logits = self._loss(images, labels, training=True)
+        variables = self.student.trainable_variables
+        self.optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+        return self._update_metrics(loss, labels, logits)
+
+    def test_step(self, data):
+        images, labels = data[0], data[1]
+        loss, logits = self._loss(images, labels, training=False)
+        return self._update_metrics(loss, labels, logits)
+
+
+def distill(input_pipeline='generators', backbone_name='mobilenet_v3_small', alpha=1.0, image_size=160, head_units=0,
+            temperature=TEMPERATURE, hard_label_weight=HARD_LABEL_WEIGHT, epochs=EPOCHS, learning_rate=LEARNING_RATE,
+            batch_size=BATCH_SIZE, export_tflite=False, max_eval_images=2000):
+    """
+    Distils the teacher into a student, saves it (plus metadata and optionally
+    a float16 TFLite file) and writes the teacher-vs-student report.
+    """
+    from model_training import load_input_data
+
+    print(f"\n--- Loading Teacher from {os.path.abspath(TEACHER_MODEL_PATH)} ---")
+    teacher = tf.keras.models.load_model(TEACHER_MODEL_PATH, compile=False)
+    teacher.trainable = False
+    if tuple(teacher.input_shape[1:3]) != (IMG_HEIGHT, IMG_WIDTH):
+        raise ValueError(f"Teacher expects {teacher.input_shape[1:3]} inputs; set IMG_SIZE={teacher.input_shape[1]} "
+                         f"so the input pipeline feeds it at its own resolution")
+
+    print(f"\n--- Preparing Input Pipeline ({input_pipeline}) ---")
+    train_data, validation_data, _, class_indices = load_input_data(input_pipeline, batch_size)
+    num_classes = len(class_indices)
+
+    print(f"\n--- Building Student ({backbone_name}, alpha {alpha:g}, {image_size}px) ---")
+    logits_model, student = build_student(num_classes, backbone_name, alpha, image_size, head_units)
+    report = budget_report(student)
+    print_budget_report(report)
+
+    distiller = Distiller(logits_model, teacher, (image_size, image_size), temperature, hard_label_weight)
+    distiller.compile(optimizer=Adam(learning_rate=learning_rate))
+    print(f"\n--- Distilling (T={temperature:g}, hard label weight {hard_label_weight:g}) ---")
+    distiller.fit(
+        train_data,
+        epochs=epochs,
+        validation_data=validation_data,
+        callbacks=[
+            EarlyStopping(monitor='val_accuracy', mode='max', patience=4, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=2, min_lr=0.000001, verbose=1),
+            ModelCheckpoint(STUDENT_WEIGHTS_PATH, save_weights_only=True, save_best_only=True,
+                            monitor='val_accuracy', mode='max', verbose=1),
+        ],
+    )
+    distiller.load_weights(STUDENT_WEIGHTS_PATH)
+
+    student.save(STUDENT_MODEL_PATH)
+    metadata = architecture_metadata(DEFAULT_HEAD, head_units, alpha, image_size, num_classes, report,
+                                     backbone=backbone_name)
+    metadata.update(distilled_from=TEACHER_MODEL_PATH, temperature=temperature, hard_label_weight=hard_label_weight)
+    save_metadata(STUDENT_MODEL_PATH, metadata)
+    print(f"Student saved to {os.path.abspath(STUDENT_MODEL_PATH)}")
+    if export_tflite:
+        from export_tflite import export_float16
+        with open(STUDENT_TFLITE_PATH, 'wb') as f:
+            f.write(export_float16(student))
+        save_metadata(STUDENT_TFLITE_PATH, metadata)
+        print(f"Student TFLite (float16) saved to {os.path.abspath(STUDENT_TFLITE_PATH)}")
+
+    write_report(max_eval_images)
+
+
+# --- 5. TEACHER VS STUDENT REPORT ---
+def write_report(max_eval_images=2000):
+    """
+    Accuracy, file size, load time, single-image latency, parameters and FLOPs
+    of teacher and student (measured as in compare_heads.py), saved as JSON.
+    """
+    from compare_heads import measure, print_table
+    tf.keras.backend.clear_session()
+    print("\n--- Teacher vs Student ---")
+    results = [measure(os.path.basename(path), path, evaluate=True, max_images=max_eval_images)
+               for path in (TEACHER_MODEL_PATH, STUDENT_MODEL_PATH)]
+    print_table(results)
+    teacher, student = results
+    speedup = teacher['latency_p50_ms'] / student['latency_p50_ms'] if student['latency_p50_ms'] else None
+    summary = {
+        "teacher": teacher,
+        "student": student,
+        "student_metadata": load_metadata(STUDENT_MODEL_PATH),
+        "accuracy_delta": (round(student['accuracy'] - teacher['accuracy'], 4)
+                           if None not in (student['accuracy'], teacher['accuracy']) else None),
+        "latency_speedup": round(speedup, 2) if speedup else None,
+        "size_ratio": round(student['h5_mb'] / teacher['h5_mb'], 3) if teacher['h5_mb'] else None,
+    }
+    print(f"\nAccuracy delta {summary['accuracy_delta']}, {summary['latency_speedup']}x faster, "
+          f"{summary['size_ratio']}x the file size")
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(summary, f, indent=4)
+    print(f"Report saved to {os.path.abspath(REPORT_PATH)}")
+
+
+if __name__ == '__main__':
+    from model_training import INPUT_PIPELINES
+    parser = argparse.ArgumentParser(description="Distil the trained model into a compact student for CPU/edge serving.")
+    parser.add_argument('--input-pipeline', choices=INPUT_PIPELINES, default='generators')
+    parser.add_argument('--student', choices=STUDENT_BACKBONES, default='mobilenet_v3_small')
+    parser.add_argument('--alpha', type=float, default=1.0,
+                        help=f"width multiplier: 0.75 or 1.0 for MobileNetV3-Small, one of {BACKBONE_ALPHAS} "
+                             f"for MobileNetV2")
+    parser.add_argument('--image-size', type=int, choices=BACKBONE_IMAGE_SIZES, default=160,
+                        help="student input resolution (the teacher keeps IMG_SIZE)")
+    parser.add_argument('--head-units', type=int, default=0)
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE)
+    parser.add_argument('--hard-label-weight', type=float, default=HARD_LABEL_WEIGHT)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--tflite', action='store_true', help="also export the student as float16 TFLite")
+    parser.add_argument('--max-eval-images', type=int, default=2000,
+                        help="images used for the accuracy comparison (0: the whole split)")
+    parser.add_argument('--report-only', action='store_true',
+                        help="skip training and only compare the existing teacher and student")
+    args = parser.parse_args()
+    if args.report_only:
+        write_report(args.max_eval_images)
+    else:
+        distill(input_pipeline=args.input_pipeline, backbone_name=args.student, alpha=args.alpha,
+                image_size=args.image_size, head_units=args.head_units, temperature=args.temperature,
+                hard_label_weight=args.hard_label_weight, epochs=args.epochs, learning_rate=args.learning_rate,
+                batch_size=args.batch_size, export_tflite=args.tflite, max_eval_images=args.max_eval_images)
@@ -0,0 +1,409 @@
+import tensorflow as tf
+import numpy as np
+import argparse
+import html
+import json
+import os
+import platform
+import sys
+import time
+from calibrate import (
+    CALIBRATION_OUTPUT_PATH, ECE_BINS, MIN_PROBABILITY, apply_temperature, expected_calibration_error,
+)
+from data_preprocessing import BATCH_SIZE, TEST_DIR, VALID_DIR
+from tf_data_pipeline import list_image_files
+
+# The serving backends and image preprocessing (backend/inference.py and
+# backend/preprocessing.py), so a model is scored exactly as the server would run it.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from inference import load_backend
+from preprocessing import load_image
+
+# --- 1. PATHS ---
+KERAS_MODEL_PATH = 'crop_disease_model_best_weights.h5'
+REPORT_JSON_PATH = 'evaluation_report.json'
+
+# --- 2. EVALUATION SETTINGS ---
+TOP_K = (1, 3, 5)
+# Batches timed but left out of the latency statistics (graph tracing,
+# interpreter allocation); reported separately as the first-batch time.
+WARMUP_BATCHES = 1
+# Most frequent (true, predicted) pairs listed in the report.
+TOP_CONFUSIONS = 15
+EVAL_BACKENDS = ('keras', 'tf_function', 'tflite')
+
+
+# --- 3. PREDICTIONS ---
+class ServingImageSequence:
+    """
+    Unshuffled batches of (images, integer labels) over one split directory,
+    each image decoded and resized by the server's load_image() (JPEG draft
+    decoding, then BICUBIC) into a float32 batch in [0, 1].
+    """
+
+    def __init__(self, directory, image_size, batch_size):
+        paths, labels, self.class_indices = list_image_files(directory)
+        self.paths = paths
+        self.classes = np.asarray(labels, dtype=np.int64)
+        self.samples = len(paths)
+        self.height, self.width = image_size
+        self.batch_size = batch_size
+        print(f"Found {self.samples} images belonging to {len(self.class_indices)} classes.")
+
+    def __len__(self):
+        return -(-self.samples // self.batch_size)
+
+    def __getitem__(self, idx):
+        paths = self.paths[idx * self.batch_size:(idx + 1) * self.batch_size]
+        images = np.empty((len(paths), self.height, self.width, 3), dtype=np.float32)
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                load_image(f.read(), target_size=(self.width, self.height), out=images[i])
+        return images, self.classes[idx * self.batch_size:idx * self.batch_size + len(paths)]
+
+
+def eval_generator(split, image_size, batch_size):
+    """
+    Batches over the test split (or valid), preprocessed as the server does,
+    at the model's (height, width).
+    """
+    if split == 'test' and not (os.path.isdir(TEST_DIR) and os.listdir(TEST_DIR)):
+        print("Test directory not found or is empty; evaluating on the validation split.")
+        split = 'valid'
+    directory = TEST_DIR if split == 'test' else VALID_DIR
+    return ServingImageSequence(directory, image_size, batch_size), split
+
+
+def collect_predictions(backend, generator, num_classes):
+    """
+    One pass over `generator`: probabilities in a preallocated (N, num_classes)
+    float32 array, integer labels, and the seconds each batch spent in the
+    backend (data loading is timed separately).
+    """
+    probabilities = np.empty((generator.samples, num_classes), dtype=np.float32)
+    batch_seconds, batch_sizes = [], []
+    load_seconds = 0.0
+    offset = 0
+    for batch_idx in range(len(generator)):
+        started = time.perf_counter()
+        images, _ = generator[batch_idx]
+        loaded = time.perf_counter()
+        output = backend.predict(images.astype(np.float32, copy=False))
+        batch_seconds.append(time.perf_counter() - loaded)
+        load_seconds += loaded - started
+        batch_sizes.append(len(images))
+        probabilities[offset:offset + len(images)] = output
+        offset += len(images)
+    labels = generator.classes.astype(np.int64)
+    return probabilities, labels, np.asarray(batch_seconds), np.asarray(batch_sizes), load_seconds
+
+
+# --- 4. METRICS ---
+def confusion_matrix(labels, predictions, num_classes):
+    """
+    (true, predicted) counts with one bincount over label * C + prediction.
+    """
+    counts = np.bincount(labels * num_classes + predictions, minlength=num_classes * num_classes)
+    return counts.reshape(num_classes, num_classes)
+
+
+def per_class_metrics(confusion):
+    """
+    Precision, recall, F1 and support per class, plus macro and
+    support-weighted averages. Classes never predicted (or absent) get 0.
+    """
+    tp = np.diag(confusion).astype(np.float64)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp),
+                   where=(precision + recall) > 0)
+    present = support > 0
+    weights = support / support.sum()
+    averages = {
+        "macro": {name: float(values[present].mean()) for name, values in
+                  (("precision", precision), ("recall", recall), ("f1", f1))},
+        "weighted": {name: float((values * weights).sum()) for name, values in
+                     (("precision", precision), ("recall", recall), ("f1", f1))},
+    }
+    return precision, recall, f1, support, averages
+
+
+def top_k_accuracy(probabilities, labels, ks=TOP_K):
+    """
+    The true class is in the top k when fewer than k classes score higher
+    than it; its rank is computed once for every k.
+    """
+    true_scores = probabilities[np.arange(len(labels)), labels]
+    rank = (probabilities > true_scores[:, None]).sum(axis=1)
+    return {f"top_{k}": float(np.mean(rank < k)) for k in ks if k <= probabilities.shape[1]}
+
+
+def reliability_bins(probabilities, labels, num_bins=ECE_BINS):
+    """
+    Count, mean confidence and accuracy per equal-width confidence bin.
+    """
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    bins = np.minimum((confidence * num_bins).astype(int), num_bins - 1)
+    counts = np.bincount(bins, minlength=num_bins)
+    confidence_sums = np.bincount(bins, weights=confidence, minlength=num_bins)
+    correct_sums = np.bincount(bins, weights=correct, minlength=num_bins)
+    return [
+        {
+            "range": [round(b / num_bins, 4), round((b + 1) / num_bins, 4)],
+            "count": int(counts[b]),
+            "confidence": round(float(confidence_sums[b] / counts[b]), 4),
+            "accuracy": round(float(correct_sums[b] / counts[b]), 4),
+        }
+        for b in range(num_bins) if counts[b]
+    ]
+
+
+def calibration_metrics(probabilities, labels):
+    log_probabilities = np.log(np.clip(probabilities.astype(np.float64), MIN_PROBABILITY, 1.0))
+    true_probabilities = probabilities[np.arange(len(labels)), labels].astype(np.float64)
+    one_hot = np.zeros_like(probabilities, dtype=np.float64)
+    one_hot[np.arange(len(labels)), labels] = 1.0
+    return {
+        "ece": round(expected_calibration_error(probabilities, labels), 4),
+        "nll": round(float(-np.mean(log_probabilities[np.arange(len(labels)), labels])), 4),
+        "brier": round(float(np.mean(np.sum((probabilities - one_hot) ** 2, axis=1))), 4),
+        "mean_confidence": round(float(probabilities.max(axis=1).mean()), 4),
+        "mean_true_class_probability": round(float(true_probabilities.mean()), 4),
+    }, log_probabilities
+
+
+def top_confusions(confusion, class_names, limit=TOP_CONFUSIONS):
+    off_diagonal = confusion.copy()
+    np.fill_diagonal(off_diagonal, 0)
+    flat = np.argsort(off_diagonal, axis=None)[::-1][:limit]
+    rows, cols = np.unravel_index(flat, confusion.shape)
+    support = confusion.sum(axis=1)
+    return [
+        {"true": class_names[t], "predicted": class_names[p], "count": int(confusion[t, p]),
+         "share_of_true_class": round(float(confusion[t, p] / support[t]), 4)}
+        for t, p in zip(rows, cols) if off_diagonal[t, p] > 0
+    ]
+
+
+def latency_profile(batch_seconds, batch_sizes, load_seconds, warmup_batches=WARMUP_BATCHES):
+    """
+    Inference latency over full batches (first `warmup_batches` reported
+    separately): per-batch percentiles, per-image time as total time / images
+    and throughput. A short final batch is left out, since its new input shape
+    can pay for graph tracing. Data loading is reported apart from the backend time.
+    """
+    timed = batch_seconds[warmup_batches:] if len(batch_seconds) > warmup_batches else batch_seconds
+    sizes = batch_sizes[warmup_batches:] if len(batch_sizes) > warmup_batches else batch_sizes
+    is_full = sizes == sizes.max()
+    full, full_images = timed[is_full], int(sizes[is_full].sum())
+    p50, p95, p99 = np.percentile(full, [50, 95, 99]) * 1000.0
+    return {
+        "batches": int(len(batch_seconds)),
+        "first_batch_ms": round(float(batch_seconds[0]) * 1000.0, 2),
+        "batch_mean_ms": round(float(full.mean()) * 1000.0, 2),
+        "batch_p50_ms": round(float(p50), 2),
+        "batch_p95_ms": round(float(p95), 2),
+        "batch_p99_ms": round(float(p99), 2),
+        "per_image_mean_ms": round(float(full.sum() / full_images) * 1000.0, 3),
+        "images_per_sec": round(float(full_images / full.sum()), 1),
+        "inference_seconds": round(float(batch_seconds.sum()), 2),
+        "data_loading_seconds": round(load_seconds, 2),
+    }
+
+
+def evaluate(probabilities, labels, class_names, temperature=None):
+    num_classes = len(class_names)
+    predictions = probabilities.argmax(axis=1)
+    confusion = confusion_matrix(labels, predictions, num_classes)
+    precision, recall, f1, support, averages = per_class_metrics(confusion)
+    calibration, log_probabilities = calibration_metrics(probabilities, labels)
+    report = {
+        "num_images": int(len(labels)),
+        "accuracy": round(float(np.mean(predictions == labels)), 4),
+        "top_k_accuracy": {k: round(v, 4) for k, v in top_k_accuracy(probabilities, labels).items()},
+        "averages": {kind: {k: round(v, 4) for k, v in values.items()} for kind, values in averages.items()},
+        "calibration": calibration,
+        "reliability": reliability_bins(probabilities, labels),
+        "per_class": [
+            {"class": class_names[i], "precision": round(float(precision[i]), 4),
+             "recall": round(float(recall[i]), 4), "f1": round(float(f1[i]), 4), "support": int(support[i])}
+            for i in range(num_classes)
+        ],
+        "top_confusions": top_confusions(confusion, class_names),
+        "confusion_matrix": confusion.tolist(),
+    }
+    if temperature is not None:
+        # The temperature backend/postprocessing.py applies before serving confidences.
+        calibrated = apply_temperature(log_probabilities, temperature)
+        report["calibration"]["temperature"] = temperature
+        report["calibration"]["ece_calibrated"] = round(expected_calibration_error(calibrated, labels), 4)
+    return report
+
+
+# --- 5. REPORT ---
+def _cell_color(fraction):
+    # White to dark red as the share of the true class grows.
+    shade = int(255 - 200 * min(1.0, fraction))
+    return f"rgb(255,{shade},{shade})"
+
+
+def render_html(report):
+    """
+    Self-contained HTML page: summary, latency, per-class table (worst F1
+    first), top confusions and a row-normalised confusion matrix heatmap.
+    """
+    esc = lambda value: html.escape(str(value))
+    meta = report["metadata"]
+    rows = []
+    rows.append(f"<h1>Evaluation: {esc(os.path.basename(meta['model']))} ({esc(meta['backend'])})</h1>")
+    rows.append(f"<p>{esc(meta['split'])} split, {report['num_images']} images, {len(meta['class_names'])} classes, "
+                f"batch size {meta['batch_size']}, input {meta['input_shape']}, {esc(meta['machine'])}, "
+                f"TensorFlow {esc(meta['tensorflow'])}</p>")
+
+    summary = {"accuracy": report["accuracy"], **report["top_k_accuracy"],
+               "macro F1": report["averages"]["macro"]["f1"], "weighted F1": report["averages"]["weighted"]["f1"],
+               **report["calibration"]}
+    rows.append("<h2>Summary</h2><table>" + "".join(
+        f"<tr><th>{esc(k)}</th><td>{esc(v)}</td></tr>" for k, v in summary.items()) + "</table>")
+    rows.append("<h2>Latency</h2><table>" + "".join(
+        f"<tr><th>{esc(k)}</th><td>{esc(v)}</td></tr>" for k, v in report["latency"].items()) + "</table>")
+
+    rows.append("<h2>Per class (worst F1 first)</h2><table><tr><th>class</th><th>precision</th><th>recall</th>"
+                "<th>F1</th><th>support</th></tr>")
+    for row in sorted(report["per_class"], key=lambda r: r["f1"]):
+        rows.append(f"<tr><td>{esc(row['class'])}</td><td>{row['precision']}</td><td>{row['recall']}</td>"
+                    f"<td style='background:{_cell_color(1 - row['f1'])}'>{row['f1']}</td><td>{row['support']}</td></tr>")
+    rows.append("</table>")
+
+    rows.append("<h2>Most confused</h2><table><tr><th>true</th><th>predicted</th><th>count</th>"
+                "<th>share of true class</th></tr>")
+    for row in report["top_confusions"]:
+        rows.append(f"<tr><td>{esc(row['true'])}</td><td>{esc(row['predicted'])}</td><td>{row['count']}</td>"
+                    f"<td>{row['share_of_true_class']:.2%}</td></tr>")
+    rows.append("</table>")
+
+    names = meta["class_names"]
+    rows.append("<h2>Confusion matrix</h2><p>Rows: true class, columns: predicted class index; "
+                "shading is the share of the row.</p><table class='cm'><tr><th></th>" +
+                "".join(f"<th title='{esc(name)}'>{i}</th>" for i, name in enumerate(names)) + "</tr>")
+    for i, counts in enumerate(report["confusion_matrix"]):
+        total = sum(counts) or 1
+        cells = "".join(
+            f"<td title='{esc(names[i])} &rarr; {esc(names[j])}: {c}' "
+            f"style='background:{_cell_color(c / total)}'>{c or ''}</td>" for j, c in enumerate(counts))
+        rows.append(f"<tr><th>{i} {esc(names[i])}</th>{cells}</tr>")
+    rows.append("</table>")
+
+    style = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+             "td,th{border:1px solid #ccc;padding:3px 6px;text-align:left;font-size:13px}"
+             ".cm td{text-align:center;min-width:1.6em;font-size:11px}.cm th{font-size:11px}")
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Evaluation report</title>"
+            f"<style>{style}</style></head><body>" + "\n".join(rows) + "</body></html>")
+
+
+def compare_to_baseline(report, baseline):
+    """
+    Accuracy and speed deltas against an earlier report (candidate - baseline).
+    """
+    pairs = {
+        "accuracy": lambda r: r["accuracy"],
+        "macro_f1": lambda r: r["averages"]["macro"]["f1"],
+        "ece": lambda r: r["calibration"]["ece"],
+        "per_image_mean_ms": lambda r: r["latency"]["per_image_mean_ms"],
+        "images_per_sec": lambda r: r["latency"]["images_per_sec"],
+    }
+    return {
+        "baseline": f"{baseline['metadata']['model']} ({baseline['metadata']['backend']})",
+        **{name: round(get(report) - get(baseline), 4) for name, get in pairs.items()},
+    }
+
+
+def print_summary(report):
+    latency = report["latency"]
+    print(f"\nAccuracy {report['accuracy']:.4f}  " +
+          "  ".join(f"{k} {v:.4f}" for k, v in report["top_k_accuracy"].items()) +
+          f"  macro F1 {report['averages']['macro']['f1']:.4f}  ECE {report['calibration']['ece']:.4f}")
+    print(f"Latency: batch p50 {latency['batch_p50_ms']:.1f} ms, p95 {latency['batch_p95_ms']:.1f} ms, "
+          f"{latency['per_image_mean_ms']:.2f} ms/image, {latency['images_per_sec']:.1f} images/s "
+          f"(first batch {latency['first_batch_ms']:.0f} ms)")
+    print("Worst classes by F1:")
+    for row in sorted(report["per_class"], key=lambda r: r["f1"])[:5]:
+        print(f"  {row['class']:<50} F1 {row['f1']:.4f}  precision {row['precision']:.4f}  "
+              f"recall {row['recall']:.4f}  ({row['support']} images)")
+    print("Most confused:")
+    for row in report["top_confusions"][:5]:
+        print(f"  {row['true']} -> {row['predicted']}: {row['count']} ({row['share_of_true_class']:.1%})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Evaluate a model on the test (or valid) split: confusion matrix, per-class "
+                    "precision/recall/F1, top-k accuracy, calibration error and per-batch latency.",
+        epilog="Compare serving backends on the same weights: --backend tflite --model crop_disease_model_int8.tflite "
+               "--baseline evaluation_report.json")
+    parser.add_argument('--model', default=KERAS_MODEL_PATH, help=".h5 model, or .tflite with --backend tflite")
+    parser.add_argument('--backend', choices=EVAL_BACKENDS, default='tf_function',
+                        help="backend/inference.py backend that runs the model")
+    parser.add_argument('--split', choices=('test', 'valid'), default='test',
+                        help="falls back to valid when there is no test split")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--num-threads', type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument('--calibration', default=CALIBRATION_OUTPUT_PATH,
+                        help="also report the ECE after the served temperature scaling (skipped if missing)")
+    parser.add_argument('--output', default=REPORT_JSON_PATH, help="JSON report; the HTML report goes next to it")
+    parser.add_argument('--save-predictions', default=None,
+                        help="also save probabilities and labels as .npz for later analysis")
+    parser.add_argument('--baseline', default=None, help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    print(f"--- Evaluating {args.model} ({args.backend} backend) ---")
+    backend = load_backend(args.backend, model_path=args.model, tflite_model_path=args.model,
+                           tflite_num_threads=args.num_threads)
+    if backend is None:
+        sys.exit(f"Model not found: {args.model}")
+    height, width = backend.input_shape[:2]
+    generator, split = eval_generator(args.split, (height, width), args.batch_size)
+    class_names = [name for name, _ in sorted(generator.class_indices.items(), key=lambda item: item[1])]
+
+    probabilities, labels, batch_seconds, batch_sizes, load_seconds = collect_predictions(
+        backend, generator, len(class_names))
+    temperature = None
+    if args.calibration and os.path.exists(args.calibration):
+        with open(args.calibration) as f:
+            temperature = float(json.load(f)["temperature"])
+
+    report = evaluate(probabilities, labels, class_names, temperature)
+    report["latency"] = latency_profile(batch_seconds, batch_sizes, load_seconds)
+    report["metadata"] = {
+        "model": os.path.abspath(args.model),
+        "backend": backend.name,
+        "split": split,
+        "batch_size": args.batch_size,
+        "input_shape": list(backend.input_shape),
+        "machine": f"{platform.machine()} {platform.processor() or platform.system()}, {os.cpu_count()} CPUs",
+        "tensorflow": tf.__version__,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "class_names": class_names,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline_delta"] = compare_to_baseline(report, json.load(f))
+
+    print_summary(report)
+    if "baseline_delta" in report:
+        print(f"Versus {report['baseline_delta']['baseline']}: " + ", ".join(
+            f"{k} {v:+g}" for k, v in report["baseline_delta"].items() if k != "baseline"))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    html_path = os.path.splitext(args.output)[0] + '.html'
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(render_html(report))
+    if args.save_predictions:
+        np.savez_compressed(args.save_predictions, probabilities=probabilities, labels=labels,
+                            class_names=np.asarray(class_names))
+    print(f"\nReport saved to {os.path.abspath(args.output)} and {os.path.abspath(html_path)}")
+    print("--- Evaluation Complete ---")
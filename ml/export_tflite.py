@@ -0,0 +1,146 @@
+import tensorflow as tf
+import numpy as np
+import os
+from data_preprocessing import get_data_generators, IMG_HEIGHT, IMG_WIDTH
+from model_architecture import load_metadata, save_metadata
+
+# --- 1. PATHS ---
+# The Keras model written by model_training.py and the TFLite files served by
+# the "tflite" backend in backend/inference.py.
+KERAS_MODEL_PATH = 'crop_disease_model_best_weights.h5'
+FLOAT16_MODEL_PATH = 'crop_disease_model_float16.tflite'
+INT8_MODEL_PATH = 'crop_disease_model_int8.tflite'
+
+# --- 2. CALIBRATION / EVALUATION SETTINGS ---
+# Number of validation batches fed to the int8 converter to pick quantization ranges.
+NUM_CALIBRATION_BATCHES = 10
+# Batch size used when running the TFLite interpreter during evaluation.
+EVAL_BATCH_SIZE = 32
+
+
+def representative_dataset(generator, num_batches=NUM_CALIBRATION_BATCHES):
+    """
+    Yields single images from the first `num_batches` batches of the validation
+    generator, in the format expected by TFLiteConverter.representative_dataset.
+    """
+    for batch_idx in range(min(num_batches, len(generator))):
+        images, _ = generator[batch_idx]
+        for img in images:
+            yield [np.expand_dims(img, axis=0).astype(np.float32)]
+
+
+def export_float16(model):
+    """
+    Converts the model to TFLite with float16 weights (activations stay float32).
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export_int8(model, calibration_generator):
+    """
+    Converts the model to full-integer TFLite (int8 weights, activations, input
+    and output), calibrated on a sample of the validation generator.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: representative_dataset(calibration_generator)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def tflite_accuracy(model_path, generator):
+    """
+    Top-1 accuracy of a .tflite model over every batch of `generator`.
+    Quantized inputs/outputs are scaled with the interpreter's own parameters.
+    """
+    interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=os.cpu_count())
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[0]
+    allocated_batch = None
+    correct = 0
+    total = 0
+
+    for batch_idx in range(len(generator)):
+        images, labels = generator[batch_idx]
+        if len(images) != allocated_batch:
+            interpreter.resize_tensor_input(input_detail['index'], [len(images)] + list(images.shape[1:]))
+            interpreter.allocate_tensors()
+            allocated_batch = len(images)
+
+        if np.issubdtype(input_detail['dtype'], np.integer):
+            scale, zero_point = input_detail['quantization']
+            info = np.iinfo(input_detail['dtype'])
+            images = np.clip(np.round(images / scale + zero_point), info.min, info.max)
+        interpreter.set_tensor(input_detail['index'], images.astype(input_detail['dtype']))
+        interpreter.invoke()
+        predictions = interpreter.get_tensor(output_detail['index'])
+
+        correct += int(np.sum(np.argmax(predictions, axis=1) == np.argmax(labels, axis=1)))
+        total += len(images)
+
+    return correct / total if total else 0.0
+
+
+def keras_accuracy(model, generator):
+    """
+    Top-1 accuracy of the Keras model over every batch of `generator`.
+    """
+    correct = 0
+    total = 0
+    for batch_idx in range(len(generator)):
+        images, labels = generator[batch_idx]
+        predictions = model.predict_on_batch(images)
+        correct += int(np.sum(np.argmax(predictions, axis=1) == np.argmax(labels, axis=1)))
+        total += len(images)
+    return correct / total if total else 0.0
+
+
+def export_models():
+    """
+    Exports float16 and int8 TFLite versions of the trained model and prints
+    their size and accuracy against the Keras original.
+    """
+    print(f"\n--- Loading Keras model from {os.path.abspath(KERAS_MODEL_PATH)} ---")
+    model = tf.keras.models.load_model(KERAS_MODEL_PATH, compile=False)
+    if tuple(model.input_shape[1:3]) != (IMG_HEIGHT, IMG_WIDTH):
+        raise ValueError(f"Model expects {model.input_shape[1:3]} inputs; set IMG_SIZE={model.input_shape[1]} "
+                         f"so the calibration and evaluation data match")
+    metadata = load_metadata(KERAS_MODEL_PATH)
+
+    _, validation_generator, test_generator, _ = get_data_generators()
+    eval_generator = test_generator if test_generator is not None else validation_generator
+    eval_split = "test" if test_generator is not None else "validation"
+
+    print("\n--- Converting to float16 TFLite ---")
+    with open(FLOAT16_MODEL_PATH, 'wb') as f:
+        f.write(export_float16(model))
+    print(f"Saved {os.path.abspath(FLOAT16_MODEL_PATH)}")
+
+    print("\n--- Converting to int8 TFLite (calibrating on validation data) ---")
+    with open(INT8_MODEL_PATH, 'wb') as f:
+        f.write(export_int8(model, validation_generator))
+    print(f"Saved {os.path.abspath(INT8_MODEL_PATH)}")
+
+    if metadata is not None: # Same architecture; the backend reads it next to whichever file it serves
+        for path in (FLOAT16_MODEL_PATH, INT8_MODEL_PATH):
+            save_metadata(path, metadata)
+
+    print(f"\n--- Evaluating on the {eval_split} split ---")
+    baseline = keras_accuracy(model, eval_generator)
+    keras_size = os.path.getsize(KERAS_MODEL_PATH) / 1e6
+    print(f"  Keras float32 : accuracy {baseline:.4f}, size {keras_size:.1f} MB")
+    for label, path in (("TFLite float16", FLOAT16_MODEL_PATH), ("TFLite int8   ", INT8_MODEL_PATH)):
+        accuracy = tflite_accuracy(path, eval_generator)
+        size = os.path.getsize(path) / 1e6
+        print(f"  {label}: accuracy {accuracy:.4f} (delta {accuracy - baseline:+.4f}), "
+              f"size {size:.1f} MB ({size / keras_size:.0%} of Keras)")
+    print("--- TFLite Export Complete ---")
+
+
+if __name__ == '__main__':
+    export_models()
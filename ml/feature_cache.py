@@ -0,0 +1,148 @@
+import tensorflow as tf
+import numpy as np
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Input
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import ModelCheckpoint
+import json
+import math
+import os
+from data_preprocessing import TRAIN_DIR, VALID_DIR, BATCH_SIZE
+from tf_data_pipeline import list_image_files, build_dataset
+from model_architecture import DEFAULT_HEAD
+
+# --- 1. CACHE SETTINGS ---
+# Frozen-backbone feature maps (7x7x1280 per image for MobileNetV2 at 224x224)
+# are stored here as float16 .npy files and memory-mapped while the head trains.
+FEATURE_CACHE_DIR = 'backbone_features'
+HEAD_WEIGHTS_PATH = os.path.join(FEATURE_CACHE_DIR, 'head_best.weights.h5')
+# Extra passes over the training set with the usual random augmentation. With 0
+# the head only sees un-augmented images; each extra copy adds one full set of features.
+AUGMENTED_COPIES = 0
+HEAD_EPOCHS = 10
+
+
+# --- 2. FEATURE EXTRACTION ---
+def extract_split(backbone, paths, labels, num_classes, name, augmented_copies=0):
+    """
+    Runs the frozen backbone once over a split (plus `augmented_copies`
+    augmented passes) and writes features/labels to memory-mappable .npy files.
+    Reuses existing files when they were built from the same inputs.
+    """
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    features_path = os.path.join(FEATURE_CACHE_DIR, f'{name}_features.npy')
+    labels_path = os.path.join(FEATURE_CACHE_DIR, f'{name}_labels.npy')
+    meta_path = os.path.join(FEATURE_CACHE_DIR, f'{name}_meta.json')
+
+    feature_shape = tuple(int(d) for d in backbone.output_shape[1:])
+    meta = {
+        "backbone": backbone.name,
+        "num_images": len(paths),
+        "augmented_copies": augmented_copies,
+        "feature_shape": list(feature_shape),
+    }
+    if os.path.exists(meta_path) and os.path.exists(features_path):
+        with open(meta_path) as f:
+            if json.load(f) == meta:
+                print(f"Reusing cached {name} features from {os.path.abspath(features_path)}")
+                return np.load(features_path, mmap_mode='r'), np.load(labels_path)
+
+    total = len(paths) * (1 + augmented_copies)
+    print(f"Extracting {name} features for {total} images into {os.path.abspath(features_path)}")
+    features = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float16, shape=(total,) + feature_shape)
+    all_labels = np.empty(total, dtype=np.int16)
+
+    forward = tf.function(lambda x: backbone(x, training=False))
+    offset = 0
+    for copy_idx in range(1 + augmented_copies):
+        # Pass 0 is un-augmented; later passes apply the training augmentation.
+        ds = build_dataset(paths, labels, num_classes, cache_name=None, training=False, augment=copy_idx > 0)
+        for images, one_hot in ds:
+            n = int(images.shape[0])
+            features[offset:offset + n] = forward(images).numpy().astype(np.float16)
+            all_labels[offset:offset + n] = np.argmax(one_hot.numpy(), axis=1)
+            offset += n
+        print(f"  {name}: pass {copy_idx + 1}/{1 + augmented_copies} done")
+
+    features.flush()
+    del features
+    np.save(labels_path, all_labels)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=4)
+    return np.load(features_path, mmap_mode='r'), all_labels
+
+
+class FeatureSequence(tf.keras.utils.Sequence):
+    """
+    Batches cached float16 features (memory-mapped) with one-hot labels.
+    The cache is stored in class order, so shuffling permutes the samples
+    themselves each epoch; each batch reads its slice of the permutation in
+    sorted order so the memory map is still read front to back.
+    """
+
+    def __init__(self, features, labels, num_classes, batch_size=BATCH_SIZE, shuffle=False):
+        super().__init__()
+        self.features = features
+        self.labels = labels
+        self.num_classes = num_classes
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.order = np.arange(len(self.labels))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(len(self.labels) / self.batch_size)
+
+    def __getitem__(self, idx):
+        start = idx * self.batch_size
+        if self.shuffle:
+            rows = np.sort(self.order[start:start + self.batch_size])
+        else:
+            rows = slice(start, start + self.batch_size)
+        x = np.asarray(self.features[rows], dtype=np.float32)
+        y = np.eye(self.num_classes, dtype=np.float32)[self.labels[rows]]
+        return x, y
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.order)
+
+
+# --- 3. HEAD TRAINING ---
+def train_head_from_cache(model, num_classes, class_indices, callbacks=(), augmented_copies=AUGMENTED_COPIES,
+                          epochs=HEAD_EPOCHS, head=DEFAULT_HEAD, head_units=0, learning_rate=0.0001,
+                          batch_size=BATCH_SIZE):
+    """
+    Phase one of train_model() without per-epoch backbone passes: extracts
+    frozen-backbone features once, trains a standalone copy of the head on
+    them, and copies the trained head weights back into `model`
+    (layers[0] is the backbone, the rest is the head, built by
+    build_head_layers() with the same `head` and `head_units`).
+    `learning_rate` and `batch_size` are train_model()'s, after scaling.
+    """
+    from model_training import build_head_layers
+
+    backbone = model.layers[0]
+    train_paths, train_labels, _ = list_image_files(TRAIN_DIR, class_indices)
+    valid_paths, valid_labels, _ = list_image_files(VALID_DIR, class_indices)
+    train_features, train_feature_labels = extract_split(
+        backbone, train_paths, train_labels, num_classes, 'train', augmented_copies)
+    valid_features, valid_feature_labels = extract_split(
+        backbone, valid_paths, valid_labels, num_classes, 'valid')
+
+    head = Sequential([Input(shape=train_features.shape[1:])] + build_head_layers(num_classes, head, head_units))
+    head.compile(optimizer=Adam(learning_rate=learning_rate), loss='categorical_crossentropy', metrics=['accuracy'])
+
+    head_checkpoint = ModelCheckpoint(HEAD_WEIGHTS_PATH, save_weights_only=True, save_best_only=True,
+                                      monitor='val_accuracy', mode='max', verbose=1)
+    history = head.fit(
+        FeatureSequence(train_features, train_feature_labels, num_classes, batch_size, shuffle=True),
+        epochs=epochs,
+        validation_data=FeatureSequence(valid_features, valid_feature_labels, num_classes, batch_size),
+        callbacks=[head_checkpoint] + list(callbacks),
+    )
+    head.load_weights(HEAD_WEIGHTS_PATH)
+
+    for head_layer, model_layer in zip(head.layers, model.layers[1:]):
+        model_layer.set_weights(head_layer.get_weights())
+    return history
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+
+# The metadata file naming rule and reader live in backend/inference.py, shared with the
+# backend; load_metadata is used by distill.py and export_tflite.py.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from inference import model_metadata_path as metadata_path, load_model_metadata as load_metadata
+
+# --- 1. ARCHITECTURE OPTIONS ---
+# Classification heads build_model() can put on the MobileNetV2 feature maps:
+# 'flatten': the original Flatten -> Dense(512) head. On 7x7x1280 maps the
+#            Dense layer alone holds ~32M parameters, >10x the whole backbone.
+# 'gap':     GlobalAveragePooling2D -> (optional Dense(head_units)) -> softmax,
+#            a few tens of thousands of parameters at any input resolution.
+HEAD_TYPES = ('gap', 'flatten')
+DEFAULT_HEAD = 'gap'
+# MobileNetV2 width multipliers and input sizes that have ImageNet weights.
+BACKBONE_ALPHAS = (0.35, 0.5, 0.75, 1.0, 1.3, 1.4)
+BACKBONE_IMAGE_SIZES = (96, 128, 160, 192, 224)
+
+
+# --- 2. PARAMETER AND FLOP COUNTS ---
+def _count_params(weights):
+    total = 0
+    for weight in weights:
+        count = 1
+        for dim in weight.shape:
+            count *= int(dim)
+        total += count
+    return total
+
+
+def _spatial(shape):
+    return int(shape[1]) * int(shape[2])
+
+
+def layer_macs(layer):
+    """
+    Multiply-accumulates of one forward pass of `layer` for a single image;
+    only convolutions and dense layers are counted (everything else is
+    elementwise and negligible next to them).
+    """
+    kind = type(layer).__name__
+    try:
+        input_shape, output_shape = layer.input.shape, layer.output.shape
+    except (AttributeError, ValueError):
+        return 0
+    if kind == 'Conv2D':
+        kh, kw = layer.kernel_size
+        return _spatial(output_shape) * kh * kw * int(input_shape[-1]) // layer.groups * int(output_shape[-1])
+    if kind == 'DepthwiseConv2D':
+        kh, kw = layer.kernel_size
+        return _spatial(output_shape) * kh * kw * int(output_shape[-1])
+    if kind == 'Dense':
+        return int(input_shape[-1]) * int(output_shape[-1])
+    return 0
+
+
+def model_macs(model):
+    """
+    MACs for a single image, recursing into nested models (the backbone).
+    """
+    total = 0
+    for layer in model.layers:
+        if hasattr(layer, 'layers'):
+            total += model_macs(layer)
+        else:
+            total += layer_macs(layer)
+    return total
+
+
+def budget_report(model):
+    """
+    Parameter, size and FLOP figures for a Sequential([backbone] + head) model.
+    FLOPs are counted as 2 x MACs per image.
+    """
+    backbone, head = model.layers[0], model.layers[1:]
+    backbone_params = _count_params(backbone.weights)
+    head_params = sum(_count_params(layer.weights) for layer in head)
+    total_params = backbone_params + head_params
+    return {
+        "total_params": total_params,
+        "trainable_params": _count_params(model.trainable_weights),
+        "backbone_params": backbone_params,
+        "head_params": head_params,
+        "float32_weights_mb": round(total_params * 4 / 1e6, 2),
+        "backbone_mflops": round(2 * model_macs(backbone) / 1e6, 1),
+        "head_mflops": round(2 * sum(layer_macs(layer) for layer in head) / 1e6, 2),
+    }
+
+
+def print_budget_report(report):
+    print("\n--- Parameter / FLOP Budget ---")
+    print(f"Backbone: {report['backbone_params']:>12,} params  {report['backbone_mflops']:>10.1f} MFLOPs/image")
+    print(f"Head:     {report['head_params']:>12,} params  {report['head_mflops']:>10.2f} MFLOPs/image")
+    print(f"Total:    {report['total_params']:>12,} params  ({report['float32_weights_mb']:.1f} MB of float32 weights, "
+          f"{report['trainable_params']:,} trainable)")
+
+
+def check_budget(report, max_params=None, max_mflops=None):
+    """
+    Raises ValueError when the model exceeds the given budget.
+    """
+    mflops = report['backbone_mflops'] + report['head_mflops']
+    if max_params is not None and report['total_params'] > max_params:
+        raise ValueError(f"Model has {report['total_params']:,} parameters, over the budget of {max_params:,}")
+    if max_mflops is not None and mflops > max_mflops:
+        raise ValueError(f"Model needs {mflops:.1f} MFLOPs per image, over the budget of {max_mflops:g}")
+
+
+# --- 3. METADATA ---
+def architecture_metadata(head, head_units, alpha, image_size, num_classes, report, backbone="MobileNetV2"):
+    return {
+        "backbone": backbone,
+        "alpha": alpha,
+        "input_size": [image_size, image_size, 3],
+        "head": head,
+        "head_units": head_units,
+        "num_classes": num_classes,
+        **report,
+    }
+
+
+def save_metadata(model_path, metadata):
+    path = metadata_path(model_path)
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=4)
+    return path
@@ -1,20 +1,100 @@
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Flatten, Dropout, BatchNormalization
+from tensorflow.keras.layers import Dense, Flatten, Dropout, BatchNormalization, GlobalAveragePooling2D
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.applications import MobileNetV2 # Using MobileNetV2 for efficiency
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
-from data_preprocessing import get_data_generators, IMG_HEIGHT, IMG_WIDTH
+from data_preprocessing import get_data_generators, IMG_HEIGHT, BATCH_SIZE
+from model_architecture import (HEAD_TYPES, DEFAULT_HEAD, BACKBONE_ALPHAS, BACKBONE_IMAGE_SIZES, budget_report,
+                                print_budget_report, check_budget, architecture_metadata, save_metadata)
+from training_checkpoints import TrainingCheckpoints, CHECKPOINT_DIR, MAX_TO_KEEP
+from training_setup import (PRECISION_POLICIES, STRATEGIES, LR_SCALING_RULES, configure_precision, create_strategy,
+                            scale_batch_and_lr, output_path, is_chief, launch_local_workers, ThroughputLogger)
+import argparse
 import json
 import os
 
-def build_model(num_classes):
+# Input pipelines train_model() can use: the original Keras ImageDataGenerator
+# ('generators'), the cached, parallel tf.data pipeline ('tf_data'), or the
+# memory-mapped shards written by `python dataset_shards.py pack` ('shards').
+INPUT_PIPELINES = ('generators', 'tf_data', 'shards')
+
+# How the head is trained while the backbone is frozen: on images every epoch
+# ('end_to_end'), or once-extracted backbone features from feature_cache.py ('feature_cache').
+HEAD_TRAINING_MODES = ('end_to_end', 'feature_cache')
+
+
+def load_input_data(input_pipeline, batch_size=BATCH_SIZE):
+    """
+    Returns (train, validation, test or None, class_indices) from the selected pipeline.
+    """
+    if input_pipeline == 'generators':
+        train_data, validation_data, test_data, class_indices = get_data_generators(batch_size)
+        if test_data is not None and test_data.samples == 0:
+            test_data = None
+        return train_data, validation_data, test_data, class_indices
+    if input_pipeline == 'tf_data':
+        from tf_data_pipeline import get_tf_datasets
+        return get_tf_datasets(batch_size=batch_size)
+    if input_pipeline == 'shards':
+        from dataset_shards import get_shard_datasets
+        return get_shard_datasets(batch_size=batch_size)
+    raise ValueError(f"Unknown input pipeline '{input_pipeline}'. Choose from {INPUT_PIPELINES}")
+
+def build_head_layers(num_classes, head=DEFAULT_HEAD, head_units=0):
+    """
+    Classification head placed on top of the MobileNetV2 feature maps (see
+    model_architecture.HEAD_TYPES). `head_units` adds a hidden Dense layer to
+    the 'gap' head; the 'flatten' head always has Dense(512).
+    Also used on its own by feature_cache.py to train from cached features.
+    """
+    if head == 'flatten':
+        layers = [
+            Flatten(),  # Flatten the 3D output of the base model into 1D
+            Dense(512, activation='relu'), # A dense layer with ReLU activation
+            BatchNormalization(),         # Improves training stability and performance
+            Dropout(0.5),                 # Dropout for regularization to prevent overfitting
+        ]
+    elif head == 'gap':
+        layers = [GlobalAveragePooling2D()] # One 1280-value vector per image, whatever the input size
+        if head_units:
+            layers += [Dense(head_units, activation='relu'), BatchNormalization()]
+        layers.append(Dropout(0.2))
+    else:
+        raise ValueError(f"Unknown head '{head}'. Choose from {HEAD_TYPES}")
+    # Output layer: one neuron per class, softmax for probabilities. Kept in float32
+    # under mixed precision so the softmax and the loss stay numerically stable.
+    return layers + [Dense(num_classes, activation='softmax', dtype='float32')]
+
+def _leaf_layers(model):
+    for layer in model.layers:
+        if hasattr(layer, 'layers'):
+            yield from _leaf_layers(layer)
+        else:
+            yield layer
+
+def load_best_weights(model, path):
     """
-    Builds a deep learning model using transfer learning with MobileNetV2.
+    model.load_weights() for the best-weights .h5. HDF5 stores a nested model's
+    weights trainable ones first, so a file written while the backbone was frozen
+    does not load into the partly unfrozen fine-tuning model (or the other way
+    round); copying layer by layer from the saved model works for both phases.
+    """
+    saved = tf.keras.models.load_model(path, compile=False)
+    for saved_layer, layer in zip(_leaf_layers(saved), _leaf_layers(model)):
+        layer.set_weights(saved_layer.get_weights())
+
+def build_model(num_classes, learning_rate=0.0001, head=DEFAULT_HEAD, head_units=0, alpha=1.0,
+                max_params=None, max_mflops=None, image_size=IMG_HEIGHT):
+    """
+    Builds a deep learning model using transfer learning with MobileNetV2,
+    prints its parameter/FLOP budget and returns (model, budget report).
+    Raises ValueError when the model is over `max_params` or `max_mflops`.
     """
     # Load the pre-trained MobileNetV2 model (without its top classification layer)
     base_model = MobileNetV2(
-        input_shape=(IMG_HEIGHT, IMG_WIDTH, 3),
+        input_shape=(image_size, image_size, 3), # IMG_HEIGHT x IMG_WIDTH unless comparing sizes
+        alpha=alpha, # Width multiplier: < 1.0 thins every layer of the backbone
         include_top=False, # We'll add our own classification head
         weights='imagenet' # Use weights pre-trained on ImageNet dataset
     )
@@ -23,48 +103,99 @@ def build_model(num_classes):
     # This allows us to train only the new classification layers quickly.
     base_model.trainable = False
 
-    model = Sequential([
-        base_model, # The frozen pre-trained CNN
-        Flatten(),  # Flatten the 3D output of the base model into 1D
-        Dense(512, activation='relu'), # A dense layer with ReLU activation
-        BatchNormalization(),         # Improves training stability and performance
-        Dropout(0.5),                 # Dropout for regularization to prevent overfitting
-        Dense(num_classes, activation='softmax') # Output layer: one neuron per class, softmax for probabilities
-    ])
+    model = Sequential([base_model] + build_head_layers(num_classes, head, head_units)) # The frozen pre-trained CNN plus our head
 
     # Compile the model
-    model.compile(optimizer=Adam(learning_rate=0.0001), # Adam optimizer with a small learning rate
+    model.compile(optimizer=Adam(learning_rate=learning_rate), # Adam optimizer with a small learning rate
                   loss='categorical_crossentropy',       # Appropriate loss for multi-class classification
                   metrics=['accuracy'])                  # Track accuracy during training
     model.summary()
-    return model
+    report = budget_report(model)
+    print_budget_report(report)
+    check_budget(report, max_params, max_mflops)
+    return model, report
 
-def train_model():
+def train_model(input_pipeline='generators', head_training='end_to_end', precision='float32', strategy_name='none',
+                replicas=None, per_replica_batch_size=BATCH_SIZE, lr_scaling='linear', resume=True,
+                max_to_keep=MAX_TO_KEEP, head=DEFAULT_HEAD, head_units=0, alpha=1.0, max_params=None, max_mflops=None):
     """
-    Loads data, builds, trains, and saves the ML model.
+    Loads data, builds, trains, and saves the ML model, with its architecture
+    metadata (see model_architecture.py) next to each saved .h5 file.
     """
-    print("\n--- Preparing Data Generators ---")
-    train_generator, validation_generator, test_generator, class_indices = get_data_generators()
+    if IMG_HEIGHT not in BACKBONE_IMAGE_SIZES or alpha not in BACKBONE_ALPHAS:
+        raise ValueError(f"MobileNetV2 has ImageNet weights for IMG_SIZE in {BACKBONE_IMAGE_SIZES} "
+                         f"and alpha in {BACKBONE_ALPHAS}, not {IMG_HEIGHT} / {alpha}")
+    if head_training == 'feature_cache' and strategy_name == 'multi_worker':
+        raise ValueError("feature_cache head training runs on a single worker; use 'none' or 'mirrored'")
+
+    # Devices and the dtype policy have to be set before any TensorFlow op runs.
+    print("\n--- Configuring Training Mode ---")
+    strategy = create_strategy(strategy_name, replicas)
+    configure_precision(precision)
+    batch_size, learning_rate = scale_batch_and_lr(strategy, per_replica_batch_size, 0.0001, lr_scaling)
+    fine_tune_learning_rate = learning_rate / 10
+    print(f"Strategy: {strategy_name} ({strategy.num_replicas_in_sync} replicas), "
+          f"global batch {batch_size}, learning rate {learning_rate:g}")
+
+    print(f"\n--- Preparing Input Pipeline ({input_pipeline}) ---")
+    train_generator, validation_generator, test_generator, class_indices = load_input_data(input_pipeline, batch_size)
     num_classes = len(class_indices)
-    model = build_model(num_classes)
+    with strategy.scope():
+        model, report = build_model(num_classes, learning_rate, head, head_units, alpha, max_params, max_mflops)
+    metadata = architecture_metadata(head, head_units, alpha, IMG_HEIGHT, num_classes, report)
 
     # Callbacks for better training
+    best_weights_path = output_path('crop_disease_model_best_weights.h5')
+    if is_chief(): # The backend serves the best-weights file and reads its metadata
+        save_metadata(best_weights_path, metadata)
     early_stopping = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=1)
-    model_checkpoint = ModelCheckpoint('crop_disease_model_best_weights.h5',
+    model_checkpoint = ModelCheckpoint(best_weights_path,
                                         save_best_only=True, monitor='val_accuracy', mode='max', verbose=1)
     reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=3, min_lr=0.000001, verbose=1)
+    throughput = ThroughputLogger(batch_size)
+    tracked_callbacks = [early_stopping, model_checkpoint, reduce_lr]
 
-    print("\n--- Training Model (Initial Layers) ---")
-    history = model.fit(
-        train_generator,
-        epochs=10, # Number of epochs for initial training (adjust as needed, 5-10 usually good)
-        validation_data=validation_generator,
-        callbacks=[early_stopping, model_checkpoint, reduce_lr]
-    )
+    # Full-state checkpoints for resuming an interrupted run (see training_checkpoints.py).
+    checkpoints = TrainingCheckpoints(output_path(CHECKPOINT_DIR), max_to_keep)
+    completed = checkpoints.completed_phases()
+    if not resume or 'fine_tune' in completed:
+        checkpoints.clear() # Start over: resuming is off or the previous run finished
+        completed = {}
+
+    if 'head' in completed:
+        print("\n--- Initial Layers Already Trained; Resuming at Fine-tuning ---")
+        checkpoints.apply_completed_state('head', tracked_callbacks)
+    elif head_training == 'feature_cache':
+        print("\n--- Training Model (Initial Layers) from Cached Backbone Features ---")
+        from feature_cache import train_head_from_cache
+        history = train_head_from_cache(model, num_classes, class_indices, callbacks=[
+            EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=3, min_lr=0.000001, verbose=1),
+        ], head=head, head_units=head_units, learning_rate=learning_rate, batch_size=batch_size)
+        model.save(best_weights_path) # Fine-tuning below starts from these weights
+        # The head was trained outside model_checkpoint; give it the head's score to beat,
+        # as after end-to-end training, so fine-tuning only overwrites the file if it improves.
+        head_scores = model.evaluate(validation_generator, return_dict=True)
+        model_checkpoint.best = head_scores['accuracy']
+        print(f"Head validation accuracy: {model_checkpoint.best:.4f}")
+        checkpoints.mark_complete('head', tracked_callbacks)
+    else:
+        print("\n--- Training Model (Initial Layers) ---")
+        head_checkpoint = checkpoints.phase_callback('head', model, tracked_callbacks)
+        with strategy.scope():
+            initial_epoch = head_checkpoint.restore()
+        history = model.fit(
+            train_generator,
+            epochs=10, # Number of epochs for initial training (adjust as needed, 5-10 usually good)
+            initial_epoch=initial_epoch,
+            validation_data=validation_generator,
+            callbacks=tracked_callbacks + [throughput, head_checkpoint] # head_checkpoint must stay last
+        )
+        checkpoints.mark_complete('head', tracked_callbacks)
 
     # Optional: Fine-tune the base model (unfreeze some layers) for better accuracy
     print("\n--- Fine-tuning (Unfreezing some base model layers) ---")
-    model.load_weights('crop_disease_model_best_weights.h5')
+    load_best_weights(model, best_weights_path)
 
     base_model = model.layers[0] # Get the MobileNetV2 layer
     base_model.trainable = True  # Unfreeze the entire base model
@@ -73,36 +204,90 @@ def train_model():
         if not isinstance(layer, tf.keras.layers.BatchNormalization):
             layer.trainable = False
 
-    model.compile(optimizer=Adam(learning_rate=0.00001), # Lower learning rate for fine-tuning
-                  loss='categorical_crossentropy',
-                  metrics=['accuracy'])
+    with strategy.scope():
+        model.compile(optimizer=Adam(learning_rate=fine_tune_learning_rate), # Lower learning rate for fine-tuning
+                      loss='categorical_crossentropy',
+                      metrics=['accuracy'])
     model.summary() # Check trainable parameters again
 
+    fine_tune_checkpoint = checkpoints.phase_callback('fine_tune', model, tracked_callbacks)
+    with strategy.scope():
+        initial_epoch = fine_tune_checkpoint.restore()
     history_fine_tune = model.fit(
         train_generator,
         epochs=10, # Additional epochs for fine-tuning (adjust as needed)
+        initial_epoch=initial_epoch,
         validation_data=validation_generator,
-        callbacks=[early_stopping, model_checkpoint, reduce_lr]
+        callbacks=tracked_callbacks + [throughput, fine_tune_checkpoint] # fine_tune_checkpoint must stay last
     )
+    checkpoints.mark_complete('fine_tune', tracked_callbacks)
 
-    model.load_weights('crop_disease_model_best_weights.h5')
+    load_best_weights(model, best_weights_path)
 
-    model_path = 'crop_disease_model.h5'
+    model_path = output_path('crop_disease_model.h5')
     model.save(model_path)
     print(f"\nModel saved to {os.path.abspath(model_path)}")
+    if is_chief():
+        print(f"Architecture metadata saved to {os.path.abspath(save_metadata(model_path, metadata))}")
 
-    if test_generator and test_generator.samples > 0:
+    if test_generator is not None:
         print("\n--- Evaluating on Test Set ---")
         loss, accuracy = model.evaluate(test_generator)
         print(f"Test Loss: {loss:.4f}, Test Accuracy: {accuracy:.4f}")
+        print("Per-class metrics, confusion matrix and latency: python evaluate.py --model crop_disease_model.h5")
     else:
         print("\nNo test data available for final evaluation.")
 
-    idx_to_class = {str(v): k for k, v in class_indices.items()}
-    with open('class_names.json', 'w') as f:
-        json.dump(idx_to_class, f, indent=4)
-    print(f"Class names mapping saved to {os.path.abspath('class_names.json')}")
+    if is_chief():
+        idx_to_class = {str(v): k for k, v in class_indices.items()}
+        with open('class_names.json', 'w') as f:
+            json.dump(idx_to_class, f, indent=4)
+        print(f"Class names mapping saved to {os.path.abspath('class_names.json')}")
     print("--- Model Training Complete ---")
 
 if __name__ == '__main__':
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the crop disease model.",
+                                     epilog="The input resolution comes from the IMG_SIZE environment variable "
+                                            f"(default 224; one of {BACKBONE_IMAGE_SIZES}).")
+    parser.add_argument('--input-pipeline', choices=INPUT_PIPELINES, default='generators',
+                        help="'generators' (ImageDataGenerator), 'tf_data' (parallel decode, disk cache, prefetch) "
+                             "or 'shards' (packed, memory-mapped shards)")
+    parser.add_argument('--head-training', choices=HEAD_TRAINING_MODES, default='end_to_end',
+                        help="'feature_cache' trains the head on cached frozen-backbone features "
+                             "instead of running the backbone every epoch")
+    parser.add_argument('--head', choices=HEAD_TYPES, default=DEFAULT_HEAD,
+                        help="'gap' (global average pooling, ~50K parameters) or 'flatten' "
+                             "(the original Flatten -> Dense(512) head, ~32M parameters at 224x224)")
+    parser.add_argument('--head-units', type=int, default=0,
+                        help="hidden Dense units in the 'gap' head (0: pooled features straight to softmax)")
+    parser.add_argument('--alpha', type=float, choices=BACKBONE_ALPHAS, default=1.0,
+                        help="MobileNetV2 width multiplier")
+    parser.add_argument('--max-params', type=int, default=None,
+                        help="fail at build time if the model has more parameters than this")
+    parser.add_argument('--max-mflops', type=float, default=None,
+                        help="fail at build time if one image needs more MFLOPs than this")
+    parser.add_argument('--no-resume', dest='resume', action='store_false',
+                        help=f"ignore and delete the checkpoints in {CHECKPOINT_DIR}/ instead of resuming from them")
+    parser.add_argument('--max-checkpoints', type=int, default=MAX_TO_KEEP,
+                        help="full-state checkpoints kept per phase; older ones are deleted")
+    parser.add_argument('--precision', choices=PRECISION_POLICIES, default='float32',
+                        help="'auto' uses mixed_float16 on GPUs, mixed_bfloat16 on CPUs with bf16 support, "
+                             "float32 otherwise")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='none',
+                        help="'mirrored' trains one replica per GPU (or per group of CPU cores), "
+                             "'multi_worker' trains across worker processes")
+    parser.add_argument('--replicas', type=int, default=None,
+                        help="logical CPU replicas for 'mirrored' without a GPU (default: one per 4 cores)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="with 'multi_worker' and no TF_CONFIG, start this many local worker processes")
+    parser.add_argument('--per-replica-batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--lr-scaling', choices=LR_SCALING_RULES, default='linear',
+                        help="'linear' multiplies the learning rate by the number of replicas")
+    args = parser.parse_args()
+    if args.strategy == 'multi_worker' and 'TF_CONFIG' not in os.environ:
+        raise SystemExit(launch_local_workers(args.workers or 2))
+    train_model(input_pipeline=args.input_pipeline, head_training=args.head_training, precision=args.precision,
+                strategy_name=args.strategy, replicas=args.replicas,
+                per_replica_batch_size=args.per_replica_batch_size, lr_scaling=args.lr_scaling,
+                resume=args.resume, max_to_keep=args.max_checkpoints, head=args.head, head_units=args.head_units,
+                alpha=args.alpha, max_params=args.max_params, max_mflops=args.max_mflops)
\ No newline at end of file
@@ -0,0 +1,185 @@
+import tensorflow as tf
+import math
+import os
+from data_preprocessing import TRAIN_DIR, VALID_DIR, TEST_DIR, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE
+
+# --- 1. CACHE AND SHUFFLE SETTINGS ---
+# Decoded, resized uint8 images are written here during the first epoch and
+# read back on every later epoch instead of decoding JPEGs again.
+CACHE_DIR = 'tf_data_cache'
+SHUFFLE_BUFFER = 1024
+
+# --- 2. AUGMENTATION SETTINGS ---
+# Same values as the ImageDataGenerator in data_preprocessing.get_data_generators().
+ROTATION_RANGE = 20         # degrees
+WIDTH_SHIFT_RANGE = 0.2     # fraction of width
+HEIGHT_SHIFT_RANGE = 0.2    # fraction of height
+SHEAR_RANGE = 0.2           # degrees (ImageDataGenerator interprets shear_range in degrees)
+ZOOM_RANGE = 0.2
+HORIZONTAL_FLIP = True
+
+# Extensions accepted by flow_from_directory.
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+
+
+# --- 3. FILE LISTING ---
+def list_image_files(directory, class_indices=None):
+    """
+    Lists image paths and integer labels under `directory`, using one
+    sub-folder per class sorted alphabetically, as flow_from_directory does.
+    """
+    if class_indices is None:
+        classes = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+        class_indices = {name: idx for idx, name in enumerate(classes)}
+
+    paths, labels = [], []
+    for name, idx in sorted(class_indices.items(), key=lambda item: item[1]):
+        class_dir = os.path.join(directory, name)
+        if not os.path.isdir(class_dir):
+            continue
+        for root, _, files in os.walk(class_dir):
+            for file_name in sorted(files):
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, file_name))
+                    labels.append(idx)
+    return paths, labels, class_indices
+
+
+def decode_and_resize(path, label, num_classes):
+    """
+    Reads and decodes one image and resizes it to the model input size.
+    Kept as uint8 so the on-disk cache stays 4x smaller than float32.
+    """
+    img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, (IMG_HEIGHT, IMG_WIDTH), method='nearest')  # load_img's default interpolation
+    img = tf.cast(img, tf.uint8)
+    img.set_shape((IMG_HEIGHT, IMG_WIDTH, 3))
+    return img, tf.one_hot(label, num_classes)
+
+
+# --- 4. VECTORISED AUGMENTATION ---
+def random_affine_transforms(batch_size):
+    """
+    Builds one random 3x3 output->input transform per image, combining rotation,
+    shift, shear, zoom and horizontal flip around the image centre (the same
+    composition ImageDataGenerator uses), flattened to the 8-parameter form
+    expected by ImageProjectiveTransformV3.
+    """
+    height, width = float(IMG_HEIGHT), float(IMG_WIDTH)
+    uniform = lambda low, high: tf.random.uniform((batch_size,), low, high)
+    zeros = tf.zeros((batch_size,))
+    ones = tf.ones((batch_size,))
+
+    def matrix(rows):
+        return tf.reshape(tf.stack([v for row in rows for v in row], axis=-1), (batch_size, 3, 3))
+
+    theta = uniform(-ROTATION_RANGE, ROTATION_RANGE) * (math.pi / 180.0)
+    rotation = matrix([[tf.cos(theta), -tf.sin(theta), zeros],
+                       [tf.sin(theta), tf.cos(theta), zeros],
+                       [zeros, zeros, ones]])
+
+    tx = uniform(-WIDTH_SHIFT_RANGE, WIDTH_SHIFT_RANGE) * width
+    ty = uniform(-HEIGHT_SHIFT_RANGE, HEIGHT_SHIFT_RANGE) * height
+    shift = matrix([[ones, zeros, tx], [zeros, ones, ty], [zeros, zeros, ones]])
+
+    shear = uniform(-SHEAR_RANGE, SHEAR_RANGE) * (math.pi / 180.0)
+    shear_m = matrix([[ones, -tf.sin(shear), zeros], [zeros, tf.cos(shear), zeros], [zeros, zeros, ones]])
+
+    zx = uniform(1.0 - ZOOM_RANGE, 1.0 + ZOOM_RANGE)
+    zy = uniform(1.0 - ZOOM_RANGE, 1.0 + ZOOM_RANGE)
+    zoom = matrix([[zx, zeros, zeros], [zeros, zy, zeros], [zeros, zeros, ones]])
+
+    cx, cy = width / 2.0 - 0.5, height / 2.0 - 0.5
+    to_center = matrix([[ones, zeros, ones * cx], [zeros, ones, ones * cy], [zeros, zeros, ones]])
+    from_center = matrix([[ones, zeros, ones * -cx], [zeros, ones, ones * -cy], [zeros, zeros, ones]])
+
+    transform = to_center @ rotation @ shift @ shear_m @ zoom @ from_center
+
+    if HORIZONTAL_FLIP:
+        flip = tf.where(tf.random.uniform((batch_size,)) < 0.5, -ones, ones)
+        flip_m = matrix([[flip, zeros, (1.0 - flip) / 2.0 * (width - 1.0)],
+                         [zeros, ones, zeros],
+                         [zeros, zeros, ones]])
+        transform = transform @ flip_m
+
+    return tf.reshape(transform, (batch_size, 9))[:, :8]
+
+
+def augment_batch(images, labels):
+    """
+    Applies the random affine augmentation to a whole float batch in one op,
+    with bilinear sampling and nearest fill like ImageDataGenerator.
+    """
+    batch_size = tf.shape(images)[0]
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=random_affine_transforms(batch_size),
+        output_shape=tf.constant([IMG_HEIGHT, IMG_WIDTH]),
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST',
+    )
+    return images, labels
+
+
+def normalize(images, labels):
+    return tf.cast(images, tf.float32) / 255.0, labels
+
+
+# --- 5. DATASET BUILDERS ---
+def build_dataset(paths, labels, num_classes, cache_name, training, batch_size=BATCH_SIZE,
+                  shuffle=None, augment=None):
+    """
+    File list -> parallel decode -> on-disk cache (unless cache_name is None)
+    -> (shuffle) -> batch -> normalise -> (augment) -> prefetch.
+    Shuffling and augmentation follow `training` unless set explicitly.
+    """
+    shuffle = training if shuffle is None else shuffle
+    augment = training if augment is None else augment
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shuffle:
+        # Shuffle the file list once so the cache itself is in random order.
+        ds = ds.shuffle(len(paths), seed=42, reshuffle_each_iteration=False)
+    ds = ds.map(lambda p, l: decode_and_resize(p, l, num_classes),
+                num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    if cache_name is not None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # The sample count is part of the cache name so a changed dataset never reuses a stale cache.
+        ds = ds.cache(os.path.join(CACHE_DIR, f"{cache_name}_{len(paths)}_{IMG_HEIGHT}x{IMG_WIDTH}"))
+    if shuffle:
+        ds = ds.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+    if augment:
+        ds = ds.map(augment_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def get_tf_datasets(batch_size=BATCH_SIZE):
+    """
+    tf.data counterpart of data_preprocessing.get_data_generators(): returns
+    (train_ds, validation_ds, test_ds or None, class_indices) with the same
+    class indices, normalisation and augmentation.
+    """
+    print(f"Listing training images in: {os.path.abspath(TRAIN_DIR)}")
+    train_paths, train_labels, class_indices = list_image_files(TRAIN_DIR)
+    num_classes = len(class_indices)
+    print(f"Found {len(train_paths)} images belonging to {num_classes} classes.")
+    train_ds = build_dataset(train_paths, train_labels, num_classes, 'train', training=True, batch_size=batch_size)
+
+    print(f"Listing validation images in: {os.path.abspath(VALID_DIR)}")
+    valid_paths, valid_labels, _ = list_image_files(VALID_DIR, class_indices)
+    print(f"Found {len(valid_paths)} images belonging to {num_classes} classes.")
+    validation_ds = build_dataset(valid_paths, valid_labels, num_classes, 'valid', training=False, batch_size=batch_size)
+
+    test_ds = None
+    if os.path.exists(TEST_DIR) and os.listdir(TEST_DIR):
+        test_paths, test_labels, _ = list_image_files(TEST_DIR, class_indices)
+        if test_paths:
+            print(f"Found {len(test_paths)} test images.")
+            test_ds = build_dataset(test_paths, test_labels, num_classes, 'test', training=False, batch_size=batch_size)
+    else:
+        print("Test directory not found or is empty. Skipping test data loading.")
+
+    return train_ds, validation_ds, test_ds, class_indices
@@ -0,0 +1,150 @@
+import tensorflow as tf
+import numpy as np
+import glob
+import json
+import os
+import shutil
+
+# --- 1. CHECKPOINT SETTINGS ---
+# Full training state (model weights, optimizer slots and step counter, the
+# learning rate, the epoch and the phase) is written here with
+# tf.train.Checkpoint, one sub-directory per phase. The best-model .h5 written
+# by ModelCheckpoint is unchanged; these checkpoints exist only to resume.
+CHECKPOINT_DIR = 'training_checkpoints'
+MAX_TO_KEEP = 3             # older checkpoints are deleted by the CheckpointManager
+SAVE_EVERY_EPOCHS = 1
+PHASES = ('head', 'fine_tune')
+PHASES_FILE = 'phases.json'
+
+# Callback attributes that make up EarlyStopping / ReduceLROnPlateau /
+# ModelCheckpoint progress. They are plain Python values, so they are saved in
+# a JSON sidecar next to each checkpoint rather than inside it.
+CALLBACK_STATE_ATTRS = ('wait', 'cooldown_counter', 'best', 'best_epoch', 'stopped_epoch')
+
+
+def callback_states(callbacks):
+    return {
+        type(callback).__name__: {
+            attr: float(getattr(callback, attr))
+            for attr in CALLBACK_STATE_ATTRS
+            if isinstance(getattr(callback, attr, None), (int, float, np.number))
+        }
+        for callback in callbacks
+    }
+
+
+def apply_callback_states(callbacks, states):
+    for callback in callbacks:
+        for attr, value in states.get(type(callback).__name__, {}).items():
+            setattr(callback, attr, value if attr == 'best' else int(value))
+
+
+# --- 2. PER-PHASE CHECKPOINT CALLBACK ---
+class PhaseCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Saves a full-state checkpoint every `save_every_epochs` epochs of one phase
+    and restores the latest one. Must be the last callback in the list so it
+    sees the state other callbacks reach at the end of an epoch, and so its
+    on_train_begin runs after they have reset themselves.
+    """
+
+    def __init__(self, directory, phase, model, tracked_callbacks=(), max_to_keep=MAX_TO_KEEP,
+                 save_every_epochs=SAVE_EVERY_EPOCHS):
+        super().__init__()
+        self.phase = phase
+        self.target_model = model
+        self.tracked_callbacks = list(tracked_callbacks)
+        self.save_every_epochs = save_every_epochs
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.phase_index = tf.Variable(PHASES.index(phase), dtype=tf.int64, trainable=False)
+        self.checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer,
+                                              epoch=self.epoch, phase=self.phase_index)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, os.path.join(directory, phase), max_to_keep)
+        self.pending_states = None
+
+    def restore(self):
+        """
+        Restores the latest checkpoint of this phase, if any, and returns the
+        epoch to pass to fit() as initial_epoch (0 when starting fresh).
+        """
+        latest = self.manager.latest_checkpoint
+        if latest is None:
+            return 0
+        optimizer = self.target_model.optimizer
+        if not optimizer.built:
+            # Create the slot variables now so they are restored immediately, not deferred.
+            optimizer.build(self.target_model.trainable_variables)
+        self.checkpoint.restore(latest).assert_existing_objects_matched()
+        sidecar = latest + '.callbacks.json'
+        if os.path.exists(sidecar):
+            with open(sidecar) as f:
+                self.pending_states = json.load(f)
+        initial_epoch = int(self.epoch.numpy())
+        print(f"Resuming {self.phase} phase from {latest} (epoch {initial_epoch})")
+        return initial_epoch
+
+    def on_train_begin(self, logs=None):
+        # EarlyStopping and ReduceLROnPlateau reset their counters here, so the
+        # restored values are applied afterwards.
+        if self.pending_states is not None:
+            apply_callback_states(self.tracked_callbacks, self.pending_states)
+            self.pending_states = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch.assign(epoch + 1)
+        if (epoch + 1) % self.save_every_epochs:
+            return
+        path = self.manager.save(checkpoint_number=epoch + 1)
+        with open(path + '.callbacks.json', 'w') as f:
+            json.dump(callback_states(self.tracked_callbacks), f, indent=4)
+        # Drop sidecars of checkpoints the manager has evicted.
+        for sidecar in glob.glob(os.path.join(self.manager.directory, '*.callbacks.json')):
+            if sidecar[:-len('.callbacks.json')] not in self.manager.checkpoints:
+                os.remove(sidecar)
+
+
+# --- 3. RUN-LEVEL STATE ---
+class TrainingCheckpoints:
+    """
+    Tracks which phases of a run have finished, so a resumed run can skip a
+    completed head phase and go straight to fine-tuning.
+    """
+
+    def __init__(self, directory=CHECKPOINT_DIR, max_to_keep=MAX_TO_KEEP, save_every_epochs=SAVE_EVERY_EPOCHS):
+        self.directory = directory
+        self.max_to_keep = max_to_keep
+        self.save_every_epochs = save_every_epochs
+        os.makedirs(directory, exist_ok=True)
+
+    def _phases_path(self):
+        return os.path.join(self.directory, PHASES_FILE)
+
+    def completed_phases(self):
+        """
+        Returns {phase: callback states at the end of that phase}.
+        """
+        if not os.path.exists(self._phases_path()):
+            return {}
+        with open(self._phases_path()) as f:
+            return json.load(f)
+
+    def mark_complete(self, phase, callbacks=()):
+        completed = self.completed_phases()
+        completed[phase] = callback_states(callbacks)
+        with open(self._phases_path(), 'w') as f:
+            json.dump(completed, f, indent=4)
+
+    def apply_completed_state(self, phase, callbacks):
+        """
+        Restores the callback state recorded when `phase` finished, e.g. the
+        best val_accuracy ModelCheckpoint has to beat during fine-tuning.
+        """
+        apply_callback_states(callbacks, self.completed_phases()[phase])
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def phase_callback(self, phase, model, tracked_callbacks=()):
+        return PhaseCheckpoint(self.directory, phase, model, tracked_callbacks,
+                               self.max_to_keep, self.save_every_epochs)
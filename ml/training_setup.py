@@ -0,0 +1,184 @@
+import tensorflow as tf
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# --- 1. PRECISION SETTINGS ---
+# 'auto' picks mixed_float16 when a GPU is present, mixed_bfloat16 on CPUs with
+# native bf16 support (AVX512-BF16 / AMX) and plain float32 everywhere else,
+# where reduced precision would only add casts.
+PRECISION_POLICIES = ('auto', 'float32', 'mixed_float16', 'mixed_bfloat16')
+BF16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+# --- 2. DISTRIBUTION SETTINGS ---
+# 'none':         the default single-device strategy (the original behaviour).
+# 'mirrored':     synchronous data parallelism over all local GPUs, or over
+#                 `replicas` logical CPU devices when there is no GPU.
+# 'multi_worker': MultiWorkerMirroredStrategy. Uses TF_CONFIG when it is set,
+#                 otherwise launch_local_workers() starts the workers on this machine.
+STRATEGIES = ('none', 'mirrored', 'multi_worker')
+# Scale the learning rate with the number of replicas ('linear') or keep it ('none').
+LR_SCALING_RULES = ('linear', 'none')
+
+
+# --- 3. PRECISION ---
+def cpu_supports_bf16():
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return any(flag in flags for flag in BF16_CPU_FLAGS)
+
+
+def configure_precision(policy='auto'):
+    """
+    Sets the global Keras dtype policy and returns its name.
+    """
+    if policy == 'auto':
+        if tf.config.list_physical_devices('GPU'):
+            policy = 'mixed_float16'
+        elif cpu_supports_bf16():
+            policy = 'mixed_bfloat16'
+        else:
+            policy = 'float32'
+    tf.keras.mixed_precision.set_global_policy(policy)
+    print(f"Precision policy: {policy}")
+    return policy
+
+
+# --- 4. STRATEGIES ---
+def split_cpu_into_replicas(replicas):
+    """
+    Splits the physical CPU into `replicas` logical devices so MirroredStrategy
+    can run one replica per group of cores. Must run before TensorFlow
+    initialises its devices.
+    """
+    cpu = tf.config.list_physical_devices('CPU')[0]
+    tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * replicas)
+    return [device.name for device in tf.config.list_logical_devices('CPU')]
+
+
+def create_strategy(name='none', replicas=None):
+    """
+    Returns the tf.distribute strategy for `name` (see STRATEGIES).
+    """
+    if name == 'none':
+        return tf.distribute.get_strategy()
+    if name == 'mirrored':
+        if tf.config.list_physical_devices('GPU'):
+            return tf.distribute.MirroredStrategy()
+        replicas = replicas or max(1, (os.cpu_count() or 1) // 4)
+        devices = split_cpu_into_replicas(replicas)
+        # NCCL (the GPU default) cannot reduce between CPU devices, so gradients are summed on one device.
+        return tf.distribute.MirroredStrategy(devices, cross_device_ops=tf.distribute.ReductionToOneDevice())
+    if name == 'multi_worker':
+        if 'TF_CONFIG' not in os.environ:
+            raise ValueError("multi_worker needs TF_CONFIG; use --workers N to start local workers")
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    raise ValueError(f"Unknown strategy '{name}'. Choose from {STRATEGIES}")
+
+
+def scale_batch_and_lr(strategy, per_replica_batch_size, learning_rate, rule='linear'):
+    """
+    Global batch = per-replica batch x replicas in sync. With the linear rule
+    the learning rate grows by the same factor so each example keeps the same
+    weight in the update.
+    """
+    replicas = strategy.num_replicas_in_sync
+    global_batch_size = per_replica_batch_size * replicas
+    if rule == 'linear':
+        learning_rate = learning_rate * replicas
+    return global_batch_size, learning_rate
+
+
+# --- 5. MULTI-WORKER HELPERS ---
+def worker_index():
+    if 'TF_CONFIG' not in os.environ:
+        return 0
+    return json.loads(os.environ['TF_CONFIG'])['task']['index']
+
+
+def is_chief():
+    return worker_index() == 0
+
+
+def output_path(path):
+    """
+    Every worker has to save checkpoints and models, but only the chief writes
+    to the real location; the others write to a per-worker scratch directory.
+    """
+    if is_chief():
+        return path
+    scratch = os.path.join(tempfile.gettempdir(), f'kisan_mitra_worker_{worker_index()}')
+    os.makedirs(scratch, exist_ok=True)
+    return os.path.join(scratch, os.path.basename(path))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def launch_local_workers(num_workers, argv=None):
+    """
+    Re-runs this script `num_workers` times with a localhost TF_CONFIG and waits
+    for all of them. CPU threads are divided between the workers so they do not
+    oversubscribe the cores. Returns the highest worker exit code.
+    """
+    argv = argv if argv is not None else sys.argv
+    cluster = {'worker': [f'localhost:{free_port()}' for _ in range(num_workers)]}
+    threads = str(max(1, (os.cpu_count() or 1) // num_workers))
+    workers = []
+    for index in range(num_workers):
+        env = dict(os.environ,
+                   TF_CONFIG=json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}}),
+                   TF_NUM_INTRAOP_THREADS=threads)
+        workers.append(subprocess.Popen([sys.executable] + argv, env=env))
+    print(f"Started {num_workers} local workers: {cluster['worker']}")
+    return max(worker.wait() for worker in workers)
+
+
+# --- 6. THROUGHPUT LOGGING ---
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Logs training images/sec and mean step time per epoch, and adds both to
+    the epoch logs (so they appear in History). The first step of an epoch is
+    excluded because it includes tracing and pipeline warm-up.
+    """
+
+    def __init__(self, global_batch_size):
+        super().__init__()
+        self.global_batch_size = global_batch_size
+        self.first_step_end = None
+        self.last_step_end = None
+        self.steps = 0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.first_step_end = None
+        self.steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        if self.first_step_end is None:
+            self.first_step_end = now
+        else:
+            self.steps += 1
+        self.last_step_end = now
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self.steps:
+            return
+        elapsed = self.last_step_end - self.first_step_end
+        step_time_ms = elapsed / self.steps * 1000.0
+        images_per_sec = self.steps * self.global_batch_size / elapsed
+        print(f"Epoch {epoch + 1}: {images_per_sec:.1f} images/sec, {step_time_ms:.1f} ms/step "
+              f"(global batch {self.global_batch_size})")
+        if logs is not None:
+            logs['images_per_sec'] = images_per_sec
+            logs['step_time_ms'] = step_time_ms